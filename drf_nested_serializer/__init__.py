@@ -1 +1,7 @@
+from .pagination import *
+from .parsers import *
 from .serializers import *
+from .plans import *
+from .signals import *
+from .values import *
+from .views import *
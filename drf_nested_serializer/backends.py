@@ -0,0 +1,180 @@
+from django.db import connections
+
+from .serializers import chunked
+
+
+__all__ = [
+    "InsertBackend",
+    "ORMInsertBackend",
+    "PostgreSQLInsertBackend",
+    "SQLiteInsertBackend",
+    "get_insert_backend",
+]
+
+
+class InsertBackend:
+    """
+    Inserts new objects of a model in bulk and assigns their primary keys
+    """
+
+    # rows per statement (or per executemany call)
+    batch_size = 1000
+
+    def __init__(self, using, batch_size=None):
+        self.using = using
+        self.connection = connections[using]
+        if batch_size is not None:
+            self.batch_size = batch_size
+
+    def can_insert(self, model):
+        """
+        Whether the objects of the given model can be inserted by this backend
+        """
+        raise NotImplementedError
+
+    def insert(self, model, instances):
+        """
+        Insert the instances and assign their primary keys
+        :param model:
+        :param instances: new instances of the model
+        :return: the inserted instances
+        """
+        raise NotImplementedError
+
+
+class ORMInsertBackend(InsertBackend):
+    """
+    Inserts with `bulk_create()` of the default manager, if the database returns the primary keys of bulk inserts
+    """
+
+    batch_size = None
+
+    def can_insert(self, model):
+        features = self.connection.features
+        return getattr(features, "can_return_rows_from_bulk_insert", False) or getattr(
+            features, "can_return_ids_from_bulk_insert", False
+        )
+
+    def insert(self, model, instances):
+        return model._default_manager.using(self.using).bulk_create(instances, batch_size=self.batch_size)
+
+
+class SQLInsertBackend(InsertBackend):
+    """
+    Inserts with plain SQL statements, for models with an auto generated primary key and no other database generated
+    values
+    """
+
+    def get_fields(self, model):
+        opts = model._meta
+        return [field for field in opts.concrete_fields if field is not opts.auto_field]
+
+    def can_insert(self, model):
+        opts = model._meta
+        if opts.parents or opts.auto_field is None or opts.pk is not opts.auto_field:
+            return False
+        fields = self.get_fields(model)
+        if not fields or len(fields) > self.get_max_query_params():
+            return False
+        return not any(
+            getattr(field, "generated", False)
+            or getattr(field, "has_db_default", lambda: False)()
+            or hasattr(field, "get_placeholder")
+            for field in fields
+        )
+
+    def get_max_query_params(self):
+        return self.connection.features.max_query_params or 65535
+
+    def get_rows(self, fields, instances):
+        return [
+            [field.get_db_prep_save(field.pre_save(instance, True), connection=self.connection) for field in fields]
+            for instance in instances
+        ]
+
+    def get_insert_sql(self, model, fields):
+        quote_name = self.connection.ops.quote_name
+        return "INSERT INTO {} ({})".format(
+            quote_name(model._meta.db_table), ", ".join(quote_name(field.column) for field in fields)
+        )
+
+    def set_pks(self, model, instances, pks):
+        pk_field = model._meta.pk
+        for instance, pk in zip(instances, pks):
+            setattr(instance, pk_field.attname, pk_field.to_python(pk))
+            instance._state.adding = False
+            instance._state.db = self.using
+
+
+class PostgreSQLInsertBackend(SQLInsertBackend):
+    """
+    Inserts with multi-row `INSERT ... RETURNING` statements, every statement stays below the parameter limit
+    """
+
+    def get_max_query_params(self):
+        return 65535
+
+    def insert(self, model, instances):
+        fields = self.get_fields(model)
+        batch_size = max(1, min(self.batch_size, self.get_max_query_params() // len(fields)))
+        sql = self.get_insert_sql(model, fields)
+        row_placeholder = "({})".format(", ".join(["%s"] * len(fields)))
+        returning = self.connection.ops.quote_name(model._meta.pk.column)
+
+        with self.connection.cursor() as cursor:
+            for batch in chunked(instances, batch_size):
+                rows = self.get_rows(fields, batch)
+                cursor.execute(
+                    "{} VALUES {} RETURNING {}".format(sql, ", ".join([row_placeholder] * len(rows)), returning),
+                    [value for row in rows for value in row],
+                )
+                # the rows are returned in the order of the VALUES list
+                self.set_pks(model, batch, [row[0] for row in cursor.fetchall()])
+        return instances
+
+
+class SQLiteInsertBackend(SQLInsertBackend):
+    """
+    Inserts with `executemany()` batches. Only a single connection writes to a SQLite database, so the rows inserted
+    by a batch within a transaction get consecutive row ids ending with `last_insert_rowid()`.
+    """
+
+    def can_insert(self, model):
+        # the write lock has to be held until the row ids are read
+        return self.connection.in_atomic_block and super().can_insert(model)
+
+    def insert(self, model, instances):
+        fields = self.get_fields(model)
+        sql = "{} VALUES ({})".format(self.get_insert_sql(model, fields), ", ".join(["%s"] * len(fields)))
+
+        with self.connection.cursor() as cursor:
+            for batch in chunked(instances, self.batch_size):
+                cursor.executemany(sql, self.get_rows(fields, batch))
+                cursor.execute("SELECT last_insert_rowid()")
+                last_pk = cursor.fetchone()[0]
+                self.set_pks(model, batch, range(last_pk - len(batch) + 1, last_pk + 1))
+        return instances
+
+
+INSERT_BACKENDS = {
+    "postgresql": PostgreSQLInsertBackend,
+    "sqlite": SQLiteInsertBackend,
+}
+
+
+def get_insert_backend(model, using, backend_class=None):
+    """
+    Get the insert backend for the objects of a model, the backend of the database vendor unless a backend class is
+    given. Falls back to `bulk_create()` if the backend cannot insert the model.
+    :param model:
+    :param using: database alias
+    :param backend_class: InsertBackend subclass, e.g. from `Meta.nested_insert_backend`
+    :return: InsertBackend or None if the objects cannot be inserted in bulk
+    """
+    if backend_class is None:
+        backend_class = INSERT_BACKENDS.get(connections[using].vendor, ORMInsertBackend)
+
+    for backend in (backend_class(using), ORMInsertBackend(using)):
+        if backend.can_insert(model):
+            return backend
+    return None
@@ -0,0 +1,116 @@
+from rest_framework.exceptions import ValidationError
+
+
+__all__ = [
+    "IdentityMap",
+]
+
+
+MISSING = object()
+
+
+class IdentityMap:
+    """
+    Objects loaded and written by a single nested write, keyed by (model, pk). Every row is represented by a single
+    instance and the data written to it, so repeated entries of the same object within a request are merged.
+    Changes are journaled to be undone when the savepoint of a batch is rolled back.
+    """
+
+    def __init__(self):
+        self.instances = {}
+        self.written = {}
+        self.journal = []
+
+    @staticmethod
+    def get_key(model, pk):
+        return model._meta.concrete_model, pk
+
+    def get(self, model, pk):
+        """
+        Get the loaded instance of the given model and pk, None if it is not loaded yet
+        """
+        return self.instances.get(self.get_key(model, pk))
+
+    def get_instances(self, model):
+        """
+        Get the loaded instances of the given model by pk
+        """
+        concrete_model = model._meta.concrete_model
+        return {pk: instance for (key_model, pk), instance in self.instances.items() if key_model is concrete_model}
+
+    def add(self, instance):
+        """
+        Add a loaded or created instance, the already known instance is returned if the row was loaded before
+        """
+        key = self.get_key(type(instance), instance.pk)
+        known_instance = self.instances.get(key)
+        if known_instance is not None:
+            return known_instance
+
+        self.journal.append((key, self.written.get(key, MISSING)))
+        self.instances[key] = instance
+        return instance
+
+    def merge(self, instance, data):
+        """
+        Merge the data to be written to an instance with the data already written to it within this nested write
+        :param instance:
+        :param data:
+        :return: merged data to write, None if the data was already written
+        """
+        key = self.get_key(type(instance), instance.pk)
+        written = self.written.get(key)
+
+        if written is None:
+            merged = dict(data)
+        else:
+            conflicts = {
+                field_name: ["Conflicting value for an object that appears more than once in the request."]
+                for field_name, value in data.items()
+                if field_name in written and written[field_name] != value
+            }
+            if conflicts:
+                raise ValidationError(conflicts, code="conflict")
+            if all(field_name in written for field_name in data):
+                return None
+            merged = dict(written, **data)
+
+        self.journal.append((key, self.written.get(key, MISSING)))
+        self.instances[key] = instance
+        self.written[key] = merged
+        return merged
+
+    def mark_written(self, instance, data):
+        """
+        Register the data a new instance was created with
+        """
+        key = self.get_key(type(instance), instance.pk)
+        self.journal.append((key, self.written.get(key, MISSING)))
+        self.instances[key] = instance
+        self.written[key] = dict(data)
+
+    def savepoint(self):
+        return len(self.journal)
+
+    def rollback(self, savepoint):
+        """
+        Undo the changes since the savepoint. Instances changed after the savepoint are dropped, they might hold
+        values of the rolled back writes and are loaded again.
+        """
+        while len(self.journal) > savepoint:
+            key, written = self.journal.pop()
+            self.instances.pop(key, None)
+            if written is MISSING:
+                self.written.pop(key, None)
+            else:
+                self.written[key] = written
+
+    def evict(self, savepoint):
+        """
+        Drop the instances and data added or changed since the savepoint once they are written, e.g. after a chunk of
+        a streamed relation. Later entries of the dropped objects are loaded again and not merged with their data.
+        """
+        while len(self.journal) > savepoint:
+            key, written = self.journal.pop()
+            self.instances.pop(key, None)
+            self.written.pop(key, None)
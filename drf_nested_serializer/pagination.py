@@ -0,0 +1,150 @@
+import base64
+import binascii
+from urllib import parse
+
+import django
+from django.db.models import Count, F, Prefetch, Window
+from django.db.models.manager import BaseManager
+from django.utils.translation import gettext_lazy as _
+from rest_framework import serializers
+from rest_framework.exceptions import NotFound
+from rest_framework.utils.urls import replace_query_param
+
+
+__all__ = [
+    "NestedPageListSerializer",
+]
+
+
+# attribute of the related objects of a page holding the total count of the related objects of their parent
+PAGE_COUNT_ATTRIBUTE = "_nested_page_count"
+
+# page list serializer classes by list serializer class
+PAGE_LIST_SERIALIZER_CLASSES = {}
+
+# sliced querysets can only be prefetched since Django 4.2, older versions prefetch the full relations
+SLICED_PREFETCH = django.VERSION >= (4, 2)
+
+
+def encode_cursor(offset):
+    return base64.b64encode(parse.urlencode({"o": offset}).encode("ascii")).decode("ascii")
+
+
+def decode_cursor(cursor):
+    """
+    Decode the offset of a cursor
+    :raise NotFound: if the cursor is invalid
+    """
+    try:
+        query = parse.parse_qs(base64.b64decode(cursor.encode("ascii")).decode("ascii"), keep_blank_values=True)
+        offset = int(query["o"][0])
+    except (TypeError, ValueError, KeyError, binascii.Error, UnicodeError):
+        raise NotFound(NestedPageListSerializer.invalid_cursor_message)
+    if offset < 0:
+        raise NotFound(NestedPageListSerializer.invalid_cursor_message)
+    return offset
+
+
+def get_page_queryset(queryset, offset, page_size, partition_by=None):
+    """
+    Slice a page of the queryset, annotated with the total count of the rows (per partition) by a window function
+    """
+    if not queryset.ordered:
+        queryset = queryset.order_by("pk")
+    queryset = queryset.annotate(**{PAGE_COUNT_ATTRIBUTE: Window(Count("pk"), partition_by=partition_by)})
+    return queryset[offset:offset + page_size]
+
+
+def get_page_list_serializer_class(list_serializer_class):
+    """
+    Get the page list serializer class of a list serializer class, custom list serializer classes are kept as base
+    """
+    if issubclass(list_serializer_class, NestedPageListSerializer):
+        return list_serializer_class
+    page_class = PAGE_LIST_SERIALIZER_CLASSES.get(list_serializer_class)
+    if page_class is None:
+        page_class = PAGE_LIST_SERIALIZER_CLASSES[list_serializer_class] = type(
+            "Page" + list_serializer_class.__name__, (NestedPageListSerializer, list_serializer_class), {}
+        )
+    return page_class
+
+
+class NestedPageListSerializer(serializers.ListSerializer):
+    """
+    List serializer of a paginated one to many relation (`Meta.nested_page_size`). The related objects are
+    represented as a page of `page_size` objects after the cursor, with their total count and the link to the next
+    page. Writes take the full list as usual.
+    """
+
+    invalid_cursor_message = _("Invalid cursor")
+
+    def __init__(self, *args, **kwargs):
+        self.page_size = kwargs.pop("page_size")
+        self.cursor_query_param = kwargs.pop("cursor_query_param")
+        super().__init__(*args, **kwargs)
+
+    def get_offset(self):
+        request = self.context.get("request")
+        if request is None:
+            return 0
+        cursor = getattr(request, "query_params", request.GET).get(self.cursor_query_param)
+        return 0 if cursor is None else decode_cursor(cursor)
+
+    def get_next_link(self, offset, count):
+        request = self.context.get("request")
+        if request is None or offset + self.page_size >= count:
+            return None
+        return replace_query_param(
+            request.build_absolute_uri(), self.cursor_query_param, encode_cursor(offset + self.page_size)
+        )
+
+    def get_prefetch_to_attr(self):
+        return "_nested_page_" + self.source_attrs[0]
+
+    def get_prefetch(self, prefix, foreign_key):
+        """
+        Prefetch the pages of all parents with a single query, sliced by a window function per parent. Sliced
+        querysets are prefetched to a list attribute of the parents. Before Django 4.2 the full relations are
+        prefetched and sliced per parent.
+        :param prefix: prefetch_related lookup of the parent serializer, e.g. "chapters__"
+        :param foreign_key: foreign key of the related model to the parent
+        :return: Prefetch
+        """
+        queryset = self.child.Meta.model._default_manager.all()
+        if SLICED_PREFETCH:
+            queryset = get_page_queryset(queryset, self.get_offset(), self.page_size, partition_by=F(foreign_key.name))
+        elif not queryset.ordered:
+            queryset = queryset.order_by("pk")
+        return Prefetch(prefix + self.source_attrs[0], queryset=queryset, to_attr=self.get_prefetch_to_attr())
+
+    def get_attribute(self, instance):
+        page = getattr(instance, self.get_prefetch_to_attr(), None)
+        if page or (page is not None and (not self.get_offset() or not SLICED_PREFETCH)):
+            return page
+        # the count is queried if the prefetched page is after the last page
+        return super().get_attribute(instance)
+
+    def to_representation(self, data):
+        offset = self.get_offset()
+        manager = data if isinstance(data, BaseManager) else None
+        if manager is not None:
+            data = manager.all()
+            if data._result_cache is None:
+                data = get_page_queryset(data, offset, self.page_size)
+
+        items = list(data)
+        if items and hasattr(items[0], PAGE_COUNT_ATTRIBUTE):
+            # page of the window query or prefetch
+            count = getattr(items[0], PAGE_COUNT_ATTRIBUTE)
+        elif not items and offset and manager is not None:
+            # the window count is not known after the last page
+            count = manager.model._default_manager.filter(**manager.core_filters).count()
+        else:
+            count = len(items)
+            items = items[offset:offset + self.page_size]
+
+        return {
+            "count": count,
+            "next": self.get_next_link(offset, count),
+            "results": super().to_representation(items),
+        }
@@ -0,0 +1,212 @@
+import codecs
+import json
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.utils import json as drf_json
+
+
+__all__ = [
+    "StreamedObject",
+    "NestedStreamingJSONParser",
+]
+
+
+WHITESPACE = " \t\n\r"
+
+
+class JSONStreamReader:
+    """
+    Incremental reader for JSON documents, decodes one value at a time from the underlying stream
+    """
+
+    def __init__(self, stream, encoding, block_size, parse_constant=None):
+        self.stream = stream
+        self.decoder = codecs.getincrementaldecoder(encoding)()
+        self.json_decoder = json.JSONDecoder(parse_constant=parse_constant)
+        self.block_size = block_size
+        self.buffer = ""
+        self.position = 0
+        self.eof = False
+
+    def _fill(self):
+        """
+        Read the next block of the stream, drop the already consumed part of the buffer. The block size grows with
+        the buffer, so values larger than a single block are decoded in linear time.
+        """
+        self.buffer = self.buffer[self.position:]
+        self.position = 0
+
+        data = self.stream.read(max(self.block_size, len(self.buffer)))
+        if data:
+            self.buffer += self.decoder.decode(data)
+        else:
+            self.buffer += self.decoder.decode(b"", final=True)
+            self.eof = True
+
+    def peek(self):
+        """
+        Skip whitespace and return the next character without consuming it ("" at the end of the stream)
+        """
+        while True:
+            while self.position < len(self.buffer) and self.buffer[self.position] in WHITESPACE:
+                self.position += 1
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+            if self.eof:
+                return ""
+            self._fill()
+
+    def expect(self, character):
+        """
+        Consume the given structural character
+        """
+        if self.peek() != character:
+            raise ParseError("JSON parse error - Expecting '{}' at position {}".format(character, self.position))
+        self.position += 1
+
+    def read_value(self):
+        """
+        Decode and consume the next complete JSON value
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = self.json_decoder.raw_decode(self.buffer, self.position)
+                # a number at the end of the buffer might continue in the next block
+                if end < len(self.buffer) or self.eof:
+                    self.position = end
+                    return value
+            except ValueError as e:
+                if self.eof:
+                    raise ParseError("JSON parse error - %s" % str(e))
+            self._fill()
+
+
+class StreamedArray:
+    """
+    Lazily decoded JSON array of a StreamedObject, every item is decoded when iterated
+    """
+
+    def __init__(self, owner):
+        self.owner = owner
+        self.items = None
+
+    def __iter__(self):
+        if self.items is None:
+            self.items = self._read_items()
+        return self.items
+
+    def _read_items(self):
+        reader = self.owner.reader
+        reader.expect("[")
+        if reader.peek() == "]":
+            reader.expect("]")
+        else:
+            while True:
+                yield reader.read_value()
+                if reader.peek() == ",":
+                    reader.expect(",")
+                else:
+                    reader.expect("]")
+                    break
+
+        self.owner.read_members(after_value=True)
+
+    def exhaust(self):
+        """
+        Skip the unread items
+        """
+        for _ in self:
+            pass
+
+
+class StreamedObject(dict):
+    """
+    Top-level JSON object parsed by NestedStreamingJSONParser. Members are decoded up to the first streamed array,
+    the streamed arrays have to be the last members of the object and are read by iterating `iter_streams()`.
+    """
+
+    def __init__(self, reader, stream_fields):
+        super().__init__()
+        self.reader = reader
+        self.stream_fields = stream_fields
+        self.pending_stream = None
+        self.stream_started = False
+
+        self.reader.expect("{")
+        self.read_members(after_value=False)
+
+    def read_members(self, after_value):
+        """
+        Decode members until the end of the object or the begin of the next streamed array
+        :param after_value: a member was read before, the next member is separated by a comma
+        :return:
+        """
+        self.pending_stream = None
+        reader = self.reader
+
+        while True:
+            if reader.peek() == "}":
+                reader.expect("}")
+                if reader.peek() != "":
+                    raise ParseError("JSON parse error - Extra data after the top-level object")
+                return
+
+            if after_value:
+                reader.expect(",")
+
+            key = reader.read_value()
+            if not isinstance(key, str):
+                raise ParseError("JSON parse error - Expecting property name")
+            reader.expect(":")
+
+            if key in self.stream_fields and reader.peek() == "[":
+                self.pending_stream = (key, StreamedArray(self))
+                self.stream_started = True
+                return
+
+            if self.stream_started:
+                raise ParseError("Streamed fields have to be the last members of the object.")
+
+            self[key] = reader.read_value()
+            after_value = True
+
+    def iter_streams(self):
+        """
+        Yield (field name, item iterator) of the streamed arrays in document order. Every iterator has to be consumed
+        before the next one is available, unread items are skipped.
+        """
+        while self.pending_stream is not None:
+            name, items = self.pending_stream
+            yield name, items
+            items.exhaust()
+
+
+class NestedStreamingJSONParser(JSONParser):
+    """
+    JSON parser reading the arrays listed in the `Meta.nested_stream_fields` of the view serializer incrementally.
+    Every other request body is parsed by the regular JSONParser.
+    """
+
+    block_size = 64 * 1024
+
+    def get_stream_fields(self, parser_context):
+        view = parser_context.get("view")
+        if view is None or not hasattr(view, "get_serializer_class"):
+            return []
+
+        serializer_class = view.get_serializer_class()
+        return getattr(getattr(serializer_class, "Meta", None), "nested_stream_fields", [])
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        stream_fields = self.get_stream_fields(parser_context)
+        if not stream_fields:
+            return super().parse(stream, media_type=media_type, parser_context=parser_context)
+
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+        parse_constant = drf_json.strict_constant if self.strict else None
+        reader = JSONStreamReader(stream, encoding, self.block_size, parse_constant=parse_constant)
+        return StreamedObject(reader, stream_fields)
@@ -0,0 +1,739 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Model, signals
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+
+from .backends import get_insert_backend
+from .serializers import (
+    BaseNestedSerializer,
+    NestedCreateSerializer,
+    NestedUpdateSerializer,
+    create_instance,
+    get_lookup_key,
+    get_serializer_path,
+    is_removal,
+    needs_lookup,
+    set_position,
+)
+
+
+__all__ = [
+    "NestedWritePlan",
+    "ObjectPlan",
+    "RelationPlan",
+]
+
+
+CREATE = "create"
+UPDATE = "update"
+
+
+class RelationPlan:
+    """
+    Changes of a relation of a single object
+    """
+
+    def __init__(self, relation_type, relation_name):
+        self.relation_type = relation_type
+        self.relation_name = relation_name
+        # ObjectPlan of every related object to create or update
+        self.objects = []
+        # primary keys of the related objects to release (set null/blank) or to delete
+        self.unlink_pks = []
+        self.delete_pks = []
+        # primary keys of the currently linked objects (many to many relations)
+        self.linked_pks = set()
+        # unprocessed related data, for relations applied by the nested write itself
+        self.entries = []
+
+
+class ObjectPlan:
+    """
+    Create or update of a single object together with the changes of its relations
+    """
+
+    def __init__(self, serializer, data, instance=None):
+        self.serializer = serializer
+        self.data = data
+        self.instance = instance
+        self.action = UPDATE if instance is not None else CREATE
+        self.relations = {}
+
+
+class NestedWritePlan(ObjectPlan):
+    """
+    Changeset of a nested write, computed by `BaseNestedSerializer.plan()` and executed by
+    `BaseNestedSerializer.apply(plan)`
+    """
+
+    def summary(self):
+        """
+        Number of created, updated, unlinked and deleted objects per relation path (e.g. `chapters.pages`)
+        """
+        counts = {}
+
+        def count(object_plan, prefix):
+            for relation_name, relation_plan in object_plan.relations.items():
+                path = prefix + relation_name
+                relation_counts = counts.setdefault(path, {CREATE: 0, UPDATE: 0, "unlink": 0, "delete": 0})
+                relation_counts["unlink"] += len(relation_plan.unlink_pks)
+                relation_counts["delete"] += len(relation_plan.delete_pks)
+                for child_plan in relation_plan.objects:
+                    relation_counts[child_plan.action] += 1
+                    count(child_plan, path + ".")
+
+        count(self, "")
+        return counts
+
+
+def iter_object_plans(object_plan):
+    """
+    Iterate an object plan and the plans of its related objects, depth first
+    """
+    yield object_plan
+    for relation_plan in object_plan.relations.values():
+        for child_plan in relation_plan.objects:
+            yield from iter_object_plans(child_plan)
+
+
+def get_write_method(serializer, action):
+    """
+    Get the overwritten create/update method of the serializer, None for the default model serializer behaviour
+    """
+    defaults = {
+        CREATE: (serializers.ModelSerializer.create, NestedCreateSerializer.create),
+        UPDATE: (serializers.ModelSerializer.update, NestedUpdateSerializer.update),
+    }
+    if getattr(type(serializer), action) in defaults[action]:
+        return None
+    return getattr(serializer, action)
+
+
+def has_only_concrete_fields(model, data):
+    for key in data:
+        if key == "pk":
+            continue
+        try:
+            field = model._meta.get_field(key)
+        except FieldDoesNotExist:
+            return False
+        if not field.concrete or field.many_to_many:
+            return False
+    return True
+
+
+class Relation:
+    """
+    Planning and execution of the relations of one Meta relation type
+    """
+
+    relation_type = None
+    # the relation is written before the object itself (the object refers to the related object)
+    before_store = False
+
+    def __init__(self, serializer, relation_name):
+        self.serializer = serializer
+        self.relation_name = relation_name
+        field = serializer.fields[relation_name]
+        self.child_serializer = getattr(field, "child", field)
+        self.partial = serializer.is_partial_relation(relation_name)
+        self.path = get_serializer_path(self.child_serializer)
+
+    def take_entries(self, object_plans):
+        """
+        Remove the related data from the object plans
+        :return: list of (object plan, related data, relation plan)
+        """
+        taken = []
+        for object_plan in object_plans:
+            if self.relation_name in object_plan.data:
+                relation_plan = RelationPlan(self.relation_type, self.relation_name)
+                object_plan.relations[self.relation_name] = relation_plan
+                taken.append((object_plan, object_plan.data.pop(self.relation_name), relation_plan))
+        return taken
+
+    def get_relation_plans(self, object_plans):
+        return [
+            (object_plan, object_plan.relations[self.relation_name])
+            for object_plan in object_plans
+            if self.relation_name in object_plan.relations
+        ]
+
+    def match_lookup_fields(self, taken, queryset, parent_lookup):
+        """
+        Match entries without pk on the `Meta.nested_lookup_fields` of the relation, with a single query for the
+        related objects of all parents
+        :param taken: list of (object plan, related data, relation plan)
+        :param queryset: existing related objects of the parents
+        :param parent_lookup: lookup of the parent pk on the related model
+        :return: taken, the matched entries with the pk of the existing related object
+        """
+        lookup_fields = getattr(self.serializer.Meta, "nested_lookup_fields", {}).get(self.relation_name)
+        if not lookup_fields or not any(
+            needs_lookup(entry, lookup_fields) for _, related_data, _ in taken for entry in related_data
+        ):
+            return taken
+
+        attnames = [queryset.model._meta.get_field(field_name).attname for field_name in lookup_fields]
+        # the oldest object wins if the lookup fields are not unique
+        existing_pks = {}
+        for row in queryset.order_by("-pk").values_list("pk", parent_lookup, *attnames):
+            existing_pks[tuple(row[1:])] = row[0]
+
+        def match(entry, parent_pk):
+            if needs_lookup(entry, lookup_fields):
+                lookup_key = (parent_pk,) + get_lookup_key(entry, lookup_fields)
+                if lookup_key in existing_pks:
+                    return dict(entry, pk=existing_pks[lookup_key])
+            return entry
+
+        return [
+            (object_plan, [match(entry, object_plan.instance.pk) for entry in related_data], relation_plan)
+            if object_plan.instance is not None else (object_plan, related_data, relation_plan)
+            for object_plan, related_data, relation_plan in taken
+        ]
+
+    def plan(self, object_plans, using):
+        raise NotImplementedError()
+
+    def apply(self, object_plans, using):
+        raise NotImplementedError()
+
+
+class InverseForeignKeyRelation(Relation):
+    """
+    Relation stored on the related model (one to many and one to one)
+    """
+
+    def __init__(self, serializer, relation_name, related_model, inverse_relation_name):
+        super().__init__(serializer, relation_name)
+        self.related_model = related_model
+        self.inverse_relation_name = inverse_relation_name
+        self.inverse_field = related_model._meta.get_field(inverse_relation_name)
+
+    def get_entries(self, related_data):
+        return related_data
+
+    def get_existing_pks(self, object_plans, using):
+        """
+        Primary keys of the current related objects by parent primary key
+        """
+        parents = [object_plan.instance for object_plan in object_plans if object_plan.instance is not None]
+        existing_pks = {}
+        if parents:
+            queryset = self.related_model._default_manager.using(using).filter(
+                **{self.inverse_relation_name + "__in": parents}
+            ).values_list("pk", self.inverse_field.attname)
+            for pk, parent_pk in queryset:
+                existing_pks.setdefault(parent_pk, set()).add(pk)
+        return existing_pks
+
+    def get_deletable_pks(self, pks, using):
+        return pks
+
+    def match_entries(self, taken, using):
+        return taken
+
+    def plan(self, object_plans, using):
+        taken = self.take_entries(object_plans)
+        if not taken:
+            return []
+
+        taken = self.match_entries(taken, using)
+        existing_pks = self.get_existing_pks([object_plan for object_plan, _, _ in taken], using)
+
+        # Load the related objects to update in a single query
+        matched_pks = set()
+        for object_plan, related_data, _ in taken:
+            parent_pks = existing_pks.get(object_plan.instance.pk, set()) if object_plan.instance else set()
+            matched_pks.update(
+                entry["pk"] for entry in self.get_entries(related_data)
+                if isinstance(entry, dict) and not is_removal(entry) and entry.get("pk") in parent_pks
+            )
+        order_field = self.serializer.get_order_field(self.relation_name)
+        instances = {}
+        if matched_pks:
+            queryset = self.serializer._only_written_fields(
+                self.related_model._default_manager.using(using),
+                [entry for _, related_data, _ in taken for entry in self.get_entries(related_data)],
+                *filter(None, [self.inverse_relation_name, order_field]),
+            )
+            instances = queryset.in_bulk(list(matched_pks))
+
+        child_plans = []
+        released_pks = []
+        for object_plan, related_data, relation_plan in taken:
+            parent_pks = existing_pks.get(object_plan.instance.pk, set()) if object_plan.instance else set()
+            entries = self.get_entries(related_data)
+            removed_pks = {entry["pk"] for entry in entries if is_removal(entry)}
+            kept_pks = set()
+
+            for position, entry in enumerate(entry for entry in entries if not is_removal(entry)):
+                if isinstance(entry, Model):
+                    data = {order_field: position} if order_field else {}
+                    child_plan = ObjectPlan(self.child_serializer, data, entry)
+                    kept_pks.add(entry.pk)
+                else:
+                    data = dict(entry)
+                    instance = None
+                    if "pk" in data and data["pk"] in parent_pks:
+                        instance = instances[data["pk"]]
+                        kept_pks.add(data["pk"])
+                    else:
+                        # if pk is given, but object is gone/belongs to another parent, create a new one
+                        data.pop("pk", None)
+                    if order_field and not set_position(data, instance, position, order_field):
+                        # unchanged object at its position
+                        continue
+                    child_plan = ObjectPlan(self.child_serializer, data, instance)
+                relation_plan.objects.append(child_plan)
+                child_plans.append(child_plan)
+
+            if self.partial:
+                released = parent_pks & removed_pks
+            else:
+                released = parent_pks - kept_pks
+
+            if self.inverse_field.null or self.inverse_field.blank:
+                relation_plan.unlink_pks = sorted(released)
+            else:
+                released_pks.append((relation_plan, released))
+
+        # Restrict the deletion to the one_to_many_fields_filters of the related serializer
+        all_released = set().union(*(released for _, released in released_pks)) if released_pks else set()
+        deletable_pks = self.get_deletable_pks(all_released, using) if all_released else set()
+        for relation_plan, released in released_pks:
+            relation_plan.delete_pks = sorted(released & deletable_pks)
+
+        return child_plans
+
+    def apply(self, object_plans, using):
+        relation_plans = self.get_relation_plans(object_plans)
+        queryset = self.related_model._default_manager.using(using)
+
+        unlink_pks = [pk for _, relation_plan in relation_plans for pk in relation_plan.unlink_pks]
+        if unlink_pks:
+            value = None if self.inverse_field.null else ""
+            queryset.filter(pk__in=unlink_pks).update(**{self.inverse_relation_name: value})
+            self.serializer.record_nested_change(self.path, "unlinked", model=self.related_model, pks=unlink_pks)
+
+        delete_pks = [pk for _, relation_plan in relation_plans for pk in relation_plan.delete_pks]
+        if delete_pks:
+            queryset.filter(pk__in=delete_pks).delete()
+            self.serializer.record_nested_change(self.path, "deleted", model=self.related_model, pks=delete_pks)
+
+        child_plans = []
+        for object_plan, relation_plan in relation_plans:
+            for child_plan in relation_plan.objects:
+                child_plan.data[self.inverse_relation_name] = object_plan.instance
+                child_plans.append(child_plan)
+        apply_plans(child_plans, using)
+
+
+class OneToManyRelation(InverseForeignKeyRelation):
+    relation_type = "one_to_many_fields"
+
+    def __init__(self, serializer, relation_name):
+        descriptor = getattr(serializer.Meta.model, relation_name)
+        super().__init__(
+            serializer, relation_name, descriptor.rel.related_model, descriptor.rel.remote_field.name
+        )
+
+    def apply(self, object_plans, using):
+        counter_field = self.serializer.get_counter_field(self.relation_name)
+        if counter_field:
+            # count before the related objects are linked to their parent
+            for object_plan, relation_plan in self.get_relation_plans(object_plans):
+                parent = object_plan.instance
+                created_count = 0
+                for child_plan in relation_plan.objects:
+                    previous_parent_pk = None
+                    if child_plan.instance is not None:
+                        previous_parent_pk = getattr(child_plan.instance, self.inverse_field.attname)
+                    if child_plan.action == CREATE or previous_parent_pk != parent.pk:
+                        created_count += 1
+                        self.serializer.add_counter_delta(type(parent), previous_parent_pk, counter_field, -1)
+                released_count = len(relation_plan.unlink_pks) + len(relation_plan.delete_pks)
+                self.serializer.add_counter_delta(
+                    type(parent), parent.pk, counter_field, created_count - released_count, instance=parent
+                )
+        super().apply(object_plans, using)
+
+    def match_entries(self, taken, using):
+        parents = [object_plan.instance for object_plan, _, _ in taken if object_plan.instance is not None]
+        if not parents:
+            return taken
+        return self.match_lookup_fields(
+            taken,
+            self.related_model._default_manager.using(using).filter(**{self.inverse_relation_name + "__in": parents}),
+            self.inverse_field.attname,
+        )
+
+    def get_deletable_pks(self, pks, using):
+        filters = getattr(getattr(self.child_serializer, "Meta", None), "one_to_many_fields_filters", {})
+        if self.relation_name not in filters:
+            return pks
+        return set(
+            self.related_model._default_manager.using(using).filter(
+                pk__in=list(pks), **filters[self.relation_name]
+            ).values_list("pk", flat=True)
+        )
+
+
+class OneToOneRelation(InverseForeignKeyRelation):
+    relation_type = "one_to_one_fields"
+
+    def __init__(self, serializer, relation_name):
+        descriptor = getattr(serializer.Meta.model, relation_name)
+        super().__init__(
+            serializer, relation_name, descriptor.related.related_model, descriptor.related.remote_field.name
+        )
+
+    def get_entries(self, related_data):
+        return [related_data] if related_data else []
+
+
+class ManyToOneRelation(Relation):
+    relation_type = "many_to_one_fields"
+    before_store = True
+
+    def plan(self, object_plans, using):
+        taken = self.take_entries(object_plans)
+        related_model = self.child_serializer.Meta.model
+        pks = [related_data["pk"] for _, related_data, _ in taken if related_data and "pk" in related_data]
+        instances = related_model._default_manager.using(using).in_bulk(pks) if pks else {}
+
+        child_plans = []
+        for _, related_data, relation_plan in taken:
+            if not related_data:
+                continue
+            data = dict(related_data)
+            instance = instances.get(data.get("pk"))
+            if instance is None:
+                # if pk is given, but object is gone, create a new one
+                data.pop("pk", None)
+            child_plan = ObjectPlan(self.child_serializer, data, instance)
+            relation_plan.objects.append(child_plan)
+            child_plans.append(child_plan)
+        return child_plans
+
+    def apply(self, object_plans, using):
+        relation_plans = self.get_relation_plans(object_plans)
+        apply_plans([child_plan for _, relation_plan in relation_plans for child_plan in relation_plan.objects], using)
+
+        for object_plan, relation_plan in relation_plans:
+            child_plans = relation_plan.objects
+            object_plan.data[self.relation_name] = child_plans[0].instance if child_plans else None
+
+
+class ManyToManyDirectRelation(Relation):
+    relation_type = "many_to_many_direct_fields"
+
+    def __init__(self, serializer, relation_name):
+        super().__init__(serializer, relation_name)
+        field = serializer.Meta.model._meta.get_field(relation_name)
+        self.related_model = field.related_model
+        self.through = field.remote_field.through
+        self.related_query_name = field.related_query_name()
+        self.source_field = self.through._meta.get_field(field.m2m_field_name())
+        self.target_field = self.through._meta.get_field(field.m2m_reverse_field_name())
+
+    def plan(self, object_plans, using):
+        taken = self.take_entries(object_plans)
+        if not taken:
+            return []
+
+        parents = [object_plan.instance for object_plan, _, _ in taken if object_plan.instance is not None]
+        linked_pks = {}
+        if parents:
+            # Match entries without pk within the linked objects
+            taken = self.match_lookup_fields(
+                taken,
+                self.related_model._default_manager.using(using).filter(**{self.related_query_name + "__in": parents}),
+                self.related_query_name,
+            )
+            queryset = self.through._default_manager.using(using).filter(
+                **{self.source_field.name + "__in": parents}
+            ).values_list(self.source_field.attname, self.target_field.attname)
+            for parent_pk, pk in queryset:
+                linked_pks.setdefault(parent_pk, set()).add(pk)
+
+        pks = {
+            entry["pk"] for _, related_data, _ in taken for entry in related_data
+            if not is_removal(entry) and "pk" in entry
+        }
+        instances = self.related_model._default_manager.using(using).in_bulk(list(pks)) if pks else {}
+        missing_pks = pks - set(instances)
+        if missing_pks:
+            raise ValidationError(
+                {self.relation_name: ["Object with pk {} does not exist.".format(pk) for pk in sorted(missing_pks)]},
+                code="does_not_exist",
+            )
+
+        child_plans = []
+        for object_plan, related_data, relation_plan in taken:
+            relation_plan.linked_pks = linked_pks.get(object_plan.instance.pk, set()) if object_plan.instance else set()
+            removed_pks = {entry["pk"] for entry in related_data if is_removal(entry)}
+            kept_pks = set()
+
+            for entry in related_data:
+                if is_removal(entry):
+                    continue
+                data = dict(entry)
+                instance = instances[data["pk"]] if "pk" in data else None
+                if instance is not None:
+                    kept_pks.add(instance.pk)
+                child_plan = ObjectPlan(self.child_serializer, data, instance)
+                relation_plan.objects.append(child_plan)
+                child_plans.append(child_plan)
+
+            if self.partial:
+                relation_plan.unlink_pks = sorted(relation_plan.linked_pks & removed_pks)
+            else:
+                relation_plan.unlink_pks = sorted(relation_plan.linked_pks - kept_pks)
+
+        return child_plans
+
+    def apply(self, object_plans, using):
+        relation_plans = self.get_relation_plans(object_plans)
+        apply_plans([child_plan for _, relation_plan in relation_plans for child_plan in relation_plan.objects], using)
+
+        queryset = self.through._default_manager.using(using)
+        links = []
+        for object_plan, relation_plan in relation_plans:
+            if relation_plan.unlink_pks:
+                queryset.filter(
+                    **{
+                        self.source_field.name: object_plan.instance,
+                        self.target_field.name + "__in": relation_plan.unlink_pks,
+                    }
+                ).delete()
+                self.serializer.record_nested_change(
+                    self.path, "unlinked", model=self.related_model, pks=relation_plan.unlink_pks
+                )
+
+            linked_pks = set(relation_plan.linked_pks)
+            for child_plan in relation_plan.objects:
+                if child_plan.instance.pk not in linked_pks:
+                    linked_pks.add(child_plan.instance.pk)
+                    links.append(
+                        self.through(
+                            **{
+                                self.source_field.attname: object_plan.instance.pk,
+                                self.target_field.attname: child_plan.instance.pk,
+                            }
+                        )
+                    )
+
+        if links:
+            links.sort(
+                key=lambda link: (getattr(link, self.source_field.attname), getattr(link, self.target_field.attname))
+            )
+            queryset.bulk_create(links)
+
+
+class ManyToManyThroughRelation(Relation):
+    """
+    Many to many relations with an intermediate model are planned by primary key and applied by the nested write
+    """
+
+    relation_type = "many_to_many_through_fields"
+
+    def __init__(self, serializer, relation_name):
+        super().__init__(serializer, relation_name)
+        model_meta = getattr(serializer.Meta.model, relation_name)
+        self.related_model = model_meta.rel.related_model
+        m2m_fields = serializer._get_m2m_fields(self.related_model, model_meta.field)
+        self.intermediate_relation_name = m2m_fields["right"]["field"]
+        self.intermediate_inverse_relation_name = m2m_fields["left"]["field"]
+
+    def get_existing_pks(self, taken, using):
+        """
+        Primary keys of the current intermediate objects by parent primary key
+        """
+        parents = [object_plan.instance for object_plan, _, _ in taken if object_plan.instance is not None]
+        existing_pks = {}
+        if parents:
+            inverse_field = self.related_model._meta.get_field(self.intermediate_inverse_relation_name)
+            queryset = self.related_model._default_manager.using(using).filter(
+                **{self.intermediate_inverse_relation_name + "__in": parents}
+            ).values_list("pk", inverse_field.attname)
+            for pk, parent_pk in queryset:
+                existing_pks.setdefault(parent_pk, set()).add(pk)
+        return existing_pks
+
+    def plan(self, object_plans, using):
+        taken = self.take_entries(object_plans)
+        all_existing_pks = self.get_existing_pks(taken, using)
+        for object_plan, related_data, relation_plan in taken:
+            relation_plan.entries = related_data
+            existing_pks = set()
+            if object_plan.instance is not None:
+                existing_pks = all_existing_pks.get(object_plan.instance.pk, set())
+
+            removed_pks = {entry["pk"] for entry in related_data if is_removal(entry)}
+            kept_pks = set()
+            for entry in related_data:
+                if is_removal(entry):
+                    continue
+                child_plan = ObjectPlan(self.child_serializer, dict(entry))
+                if "pk" in entry and entry["pk"] in existing_pks:
+                    child_plan.action = UPDATE
+                    kept_pks.add(entry["pk"])
+                relation_plan.objects.append(child_plan)
+
+            released = existing_pks & removed_pks if self.partial else existing_pks - kept_pks
+            inverse_field = self.related_model._meta.get_field(self.intermediate_inverse_relation_name)
+            if inverse_field.null or inverse_field.blank:
+                relation_plan.unlink_pks = sorted(released)
+            else:
+                relation_plan.delete_pks = sorted(released)
+
+        # the related objects are written by the nested write, there is nothing to plan below them
+        return []
+
+    def apply(self, object_plans, using):
+        for object_plan, relation_plan in self.get_relation_plans(object_plans):
+            errors = {}
+            self.serializer._manage_many_to_many_assignment(
+                object_plan.instance,
+                relation_plan.entries,
+                related_model=self.related_model,
+                related_serializer=self.child_serializer,
+                intermediate_relation_name=self.intermediate_relation_name,
+                intermediate_inverse_relation_name=self.intermediate_inverse_relation_name,
+                errors=errors,
+                partial=self.partial,
+            )
+            if errors:
+                raise ValidationError(
+                    {self.relation_name: self.serializer.format_relation_errors(errors)}, code="invalid"
+                )
+
+
+RELATIONS = [
+    ManyToOneRelation,
+    OneToManyRelation,
+    ManyToManyThroughRelation,
+    ManyToManyDirectRelation,
+    OneToOneRelation,
+]
+
+
+def get_relations(serializer):
+    """
+    Get the relations defined on the serializer Meta class
+    """
+    if not isinstance(serializer, BaseNestedSerializer):
+        return []
+
+    return [
+        relation_class(serializer, relation_name)
+        for relation_class in RELATIONS
+        for relation_name in getattr(serializer.Meta, relation_class.relation_type, [])
+    ]
+
+
+def build_plans(object_plans, using):
+    """
+    Plan the relations of object plans of the same serializer, every relation is loaded with a few queries for all
+    object plans at once
+    """
+    if not object_plans:
+        return
+
+    for relation in get_relations(object_plans[0].serializer):
+        build_plans(relation.plan(object_plans, using), using)
+
+
+def can_use_bulk_operations(serializer, model):
+    """
+    Bulk operations do not send pre_save/post_save, they are only used for models without receivers or if the
+    per-row signals are suppressed with `Meta.nested_suppress_row_signals` of the root serializer
+    """
+    if getattr(serializer.root.Meta, "nested_suppress_row_signals", False):
+        return True
+    return not (signals.pre_save.has_listeners(model) or signals.post_save.has_listeners(model))
+
+
+def store_objects(object_plans, using):
+    """
+    Create and update the objects of object plans of the same serializer, with bulk operations unless the serializer
+    overwrites create/update or the data contains many to many relations
+    """
+    serializer = object_plans[0].serializer
+    model = serializer.Meta.model
+    manager = model._default_manager.using(using)
+    bulk = can_use_bulk_operations(serializer, model)
+    insert_backend = None
+    if bulk:
+        insert_backend = get_insert_backend(model, using, getattr(serializer.root.Meta, "nested_insert_backend", None))
+
+    create_plans = [object_plan for object_plan in object_plans if object_plan.action == CREATE]
+    create_method = get_write_method(serializer, CREATE)
+    bulk_create_plans = []
+    for object_plan in create_plans:
+        if insert_backend is not None and create_method is None and has_only_concrete_fields(model, object_plan.data):
+            bulk_create_plans.append(object_plan)
+        elif create_method is not None:
+            object_plan.instance = create_method(object_plan.data)
+        else:
+            object_plan.instance = create_instance(serializer, object_plan.data, using)
+
+    if bulk_create_plans:
+        instances = insert_backend.insert(model, [model(**object_plan.data) for object_plan in bulk_create_plans])
+        for object_plan, instance in zip(bulk_create_plans, instances):
+            object_plan.instance = instance
+
+    update_plans = [object_plan for object_plan in object_plans if object_plan.action == UPDATE]
+    for object_plan in update_plans:
+        # the instances might be loaded from the read alias
+        object_plan.instance._state.db = using
+    update_method = get_write_method(serializer, UPDATE)
+    bulk_update_instances = []
+    bulk_update_fields = set()
+    for object_plan in update_plans:
+        if bulk and update_method is None and has_only_concrete_fields(model, object_plan.data):
+            for key, value in object_plan.data.items():
+                if key != "pk":
+                    setattr(object_plan.instance, key, value)
+                    bulk_update_fields.add(model._meta.get_field(key).name)
+            bulk_update_instances.append(object_plan.instance)
+        elif update_method is not None:
+            object_plan.instance = update_method(object_plan.instance, object_plan.data)
+        else:
+            if isinstance(serializer, BaseNestedSerializer):
+                serializer.defer_aggregated_fields(object_plan.instance, object_plan.data)
+            object_plan.instance = serializers.ModelSerializer.update(
+                serializer, object_plan.instance, object_plan.data
+            )
+
+    if bulk_update_instances and bulk_update_fields:
+        # update in pk order, like the nested write
+        bulk_update_instances.sort(key=lambda instance: instance.pk)
+        manager.bulk_update(bulk_update_instances, sorted(bulk_update_fields))
+
+    path = get_serializer_path(serializer)
+    for object_plan in object_plans:
+        serializer.root.record_nested_change(
+            path, "created" if object_plan.action == CREATE else "updated", object_plan.instance
+        )
+
+
+def apply_plans(object_plans, using):
+    """
+    Execute object plans of the same serializer: the many to one relations, the objects and then the other relations
+    """
+    if not object_plans:
+        return
+
+    relations = get_relations(object_plans[0].serializer)
+    for relation in relations:
+        if relation.before_store:
+            relation.apply(object_plans, using)
+
+    store_objects(object_plans, using)
+
+    for relation in relations:
+        if not relation.before_store:
+            relation.apply(object_plans, using)
@@ -0,0 +1,221 @@
+from collections.abc import Mapping
+from operator import attrgetter
+
+from django.db.models.manager import BaseManager
+from django.urls import NoReverseMatch
+from rest_framework import fields, relations, reverse, serializers
+from rest_framework.fields import SkipField
+from rest_framework.relations import Hyperlink, PKOnlyObject
+
+
+__all__ = [
+    "compile_representation",
+]
+
+
+# to_representation of plain field types and the equivalent conversion of a non-null value
+SCALAR_CONVERSIONS = {
+    fields.CharField.to_representation: str,
+    fields.IntegerField.to_representation: int,
+    fields.FloatField.to_representation: float,
+}
+
+# lookup value the url of an identity field is reversed with once, the lookup values of the instances are put in its
+# place
+URL_LOOKUP_SENTINEL = 987654321
+
+
+def get_model_attribute(serializer, field):
+    """
+    Get the attribute of a model field the given serializer field reads from, None if the field reads anything else
+    (methods, properties, related objects, nested sources)
+    """
+    if len(field.source_attrs) != 1:
+        return None
+
+    source = field.source_attrs[0]
+    if source == "pk":
+        return source
+    for model_field in serializer.Meta.model._meta.concrete_fields:
+        if source == model_field.name:
+            if isinstance(field, relations.PrimaryKeyRelatedField):
+                return model_field.attname if model_field.is_relation else None
+            return None if model_field.is_relation else source
+    return None
+
+
+def compile_scalar_field(serializer, field):
+    """
+    Read a plain field with an attribute getter and convert the value like the field does
+    """
+    if isinstance(field, relations.PrimaryKeyRelatedField):
+        if (
+            type(field).to_representation is not relations.PrimaryKeyRelatedField.to_representation
+            or type(field).get_attribute is not relations.RelatedField.get_attribute
+            or field.pk_field is not None
+            or not field.use_pk_only_optimization()
+        ):
+            return None
+        convert = None
+    else:
+        convert = SCALAR_CONVERSIONS.get(type(field).to_representation)
+        if convert is None or type(field).get_attribute is not fields.Field.get_attribute:
+            return None
+
+    attribute = get_model_attribute(serializer, field)
+    if attribute is None:
+        return None
+    get_value = attrgetter(attribute)
+
+    if convert is None:
+        return get_value
+
+    def represent(instance):
+        value = get_value(instance)
+        return None if value is None else convert(value)
+
+    return represent
+
+
+def get_url_parts(field):
+    """
+    Reverse the url of an identity field once, split at the lookup value
+    :return: tuple of the url before and after the lookup value, None if the url cannot be split
+    """
+    format = field.context.get("format")
+    if format and field.format and field.format != format:
+        format = field.format
+
+    try:
+        url = field.reverse(
+            field.view_name,
+            kwargs={field.lookup_url_kwarg: URL_LOOKUP_SENTINEL},
+            request=field.context["request"],
+            format=format,
+        )
+    except NoReverseMatch:
+        return None
+    parts = url.split(str(URL_LOOKUP_SENTINEL))
+    return tuple(parts) if len(parts) == 2 else None
+
+
+def compile_identity_field(field):
+    """
+    Build the url of an identity field with integer lookup values from the url reversed once, instead of reversing
+    it for every instance
+    """
+    if (
+        not isinstance(field, relations.HyperlinkedIdentityField)
+        or type(field).to_representation is not relations.HyperlinkedRelatedField.to_representation
+        or type(field).get_url is not relations.HyperlinkedRelatedField.get_url
+        or field.reverse is not reverse.reverse
+        or "request" not in field.context
+    ):
+        return None
+    represent_field = compile_field(field)
+    url_parts = []
+
+    def represent(instance):
+        if instance.pk in (None, ""):
+            return None
+        lookup_value = getattr(instance, field.lookup_field)
+        if type(lookup_value) is not int or lookup_value < 0:
+            return represent_field(instance)
+
+        if not url_parts:
+            url_parts.append(get_url_parts(field))
+        if url_parts[0] is None:
+            return represent_field(instance)
+        return Hyperlink(url_parts[0][0] + str(lookup_value) + url_parts[0][1], instance)
+
+    return represent
+
+
+def get_child_representation(child):
+    """
+    Get the compiled representation of a nested serializer, None if it has a custom `to_representation`
+    """
+    if hasattr(child, "get_compiled_representation"):
+        return child.get_compiled_representation()
+    if type(child).to_representation is not serializers.Serializer.to_representation:
+        return None
+
+    represent = child.__dict__.get("_compiled_representation")
+    if represent is None:
+        represent = child._compiled_representation = compile_representation(child)
+    return represent
+
+
+def compile_nested_field(field):
+    """
+    Represent a nested (list) serializer with the compiled representation of its child. The child is compiled on
+    first use, recursive serializers would never be done otherwise.
+    """
+    many = isinstance(field, serializers.ListSerializer)
+    if many and type(field).to_representation is not serializers.ListSerializer.to_representation:
+        return None
+    child = field.child if many else field
+    represent_field = compile_field(field)
+
+    def represent(instance):
+        represent_child = get_child_representation(child)
+        if represent_child is None:
+            return represent_field(instance)
+
+        attribute = field.get_attribute(instance)
+        if attribute is None:
+            return None
+        if not many:
+            return represent_child(attribute)
+        if isinstance(attribute, BaseManager):
+            attribute = attribute.all()
+        return [represent_child(item) for item in attribute]
+
+    return represent
+
+
+def compile_field(field):
+    """
+    Represent any other field the way `Serializer.to_representation` does
+    """
+    def represent(instance):
+        attribute = field.get_attribute(instance)
+        check_for_none = attribute.pk if isinstance(attribute, PKOnlyObject) else attribute
+        return None if check_for_none is None else field.to_representation(attribute)
+
+    return represent
+
+
+def compile_representation(serializer):
+    """
+    Compile the representation of model instances by a serializer to a function with a precomputed list of the
+    readable fields. Plain model fields are read with attribute getters, identity urls are reversed once, nested
+    serializers are compiled as well and the other fields are represented by the field itself. The output is
+    identical to `to_representation`.
+    :param serializer: bound serializer, the compiled function uses its fields
+    :return: function representing an instance
+    """
+    model = serializer.Meta.model
+    steps = []
+    for field in serializer._readable_fields:
+        if isinstance(field, serializers.BaseSerializer):
+            represent = compile_nested_field(field)
+        elif isinstance(field, relations.HyperlinkedIdentityField):
+            represent = compile_identity_field(field)
+        else:
+            represent = compile_scalar_field(serializer, field)
+        steps.append((field.field_name, represent or compile_field(field)))
+
+    def represent_instance(instance):
+        if isinstance(instance, Mapping) or not isinstance(instance, model):
+            return serializers.Serializer.to_representation(serializer, instance)
+
+        ret = {}
+        for field_name, represent in steps:
+            try:
+                ret[field_name] = represent(instance)
+            except SkipField:
+                continue
+        return ret
+
+    return represent_instance
@@ -1,17 +1,1329 @@
-from django.core.exceptions import ValidationError as CoreValidationError
+import copy
+import json
+import random
+import time
+
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured, ValidationError as CoreValidationError
+from django.db import DatabaseError, router, transaction
+from django.db.models import CharField, F, Model, TextField, signals
+from django.urls import get_script_prefix
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
+from rest_framework.fields import empty
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils import model_meta
+
+from .identity import IdentityMap
+from .pagination import NestedPageListSerializer, get_page_list_serializer_class
+from .parsers import StreamedObject
+from .representation import compile_representation
+from .signals import nested_write_completed
+
+try:
+    from asgiref.sync import sync_to_async
+except ImportError:
+    sync_to_async = None
 
 
 __all__ = [
+    "DELETE_MARKER",
     "BaseNestedSerializer",
     "NestedCreateSerializer",
     "NestedUpdateSerializer",
     "NestedSerializer",
 ]
 
+# ModelSerializer methods the fields are built with, the fields of serializers overriding one of them are not cached
+FIELD_BUILDING_METHODS = [
+    "get_field_names",
+    "get_default_field_names",
+    "build_field",
+    "build_standard_field",
+    "build_relational_field",
+    "build_nested_field",
+    "build_property_field",
+    "build_url_field",
+    "build_unknown_field",
+    "include_extra_kwargs",
+    "get_extra_kwargs",
+    "get_uniqueness_extra_kwargs",
+]
+
+# Query parameters of sparse fieldsets (`Meta.nested_sparse_fieldsets`), e.g. ?fields=title,chapters.title
+FIELDS_PARAM = "fields"
+EXPAND_PARAM = "expand"
+
+# Key of a child entry that requests the removal of the referenced object, e.g. {"pk": 7, "_delete": true}
+DELETE_MARKER = "_delete"
+
+# Meta attributes of relations holding a list of related objects
+COLLECTION_RELATION_TYPES = [
+    "one_to_many_fields",
+    "many_to_many_through_fields",
+    "many_to_many_direct_fields",
+]
+
+# Number of streamed child entries validated and written at once
+DEFAULT_STREAM_CHUNK_SIZE = 1000
+
+# Number of child entries written within a single savepoint
+DEFAULT_SAVEPOINT_BATCH_SIZE = 100
+
+# Initial and maximum delay in seconds between retries of a nested write
+DEFAULT_RETRY_BACKOFF = 0.05
+DEFAULT_RETRY_MAX_BACKOFF = 2.0
+
+# SQLSTATE codes of serialization failures and deadlocks (PostgreSQL)
+RETRYABLE_SQLSTATES = {"40001", "40P01"}
+
+# Error codes of deadlocks and lock wait timeouts (MySQL/MariaDB)
+RETRYABLE_MYSQL_ERRORS = {1213, 1205}
+
+
+# fail-fast list serializer classes by list serializer class
+FAIL_FAST_LIST_SERIALIZER_CLASSES = {}
+
+
+def get_fail_fast_list_serializer_class(list_serializer_class):
+    """
+    Get the fail-fast list serializer class of a list serializer class, custom list serializer classes are kept as base
+    """
+    if issubclass(list_serializer_class, NestedFailFastListSerializer):
+        return list_serializer_class
+    fail_fast_class = FAIL_FAST_LIST_SERIALIZER_CLASSES.get(list_serializer_class)
+    if fail_fast_class is None:
+        fail_fast_class = FAIL_FAST_LIST_SERIALIZER_CLASSES[list_serializer_class] = type(
+            "FailFast" + list_serializer_class.__name__, (NestedFailFastListSerializer, list_serializer_class), {}
+        )
+    return fail_fast_class
+
+
+class NestedFailFastListSerializer(serializers.ListSerializer):
+    """
+    List serializer of a collection relation in fail-fast mode (`Meta.nested_fail_fast`). The related objects after
+    the first invalid one are not validated, whatever the class of the child serializer, the relation is rejected
+    anyway.
+    """
+
+    def to_internal_value(self, data):
+        run_child_validation = self.child.run_validation
+        failed = []
+
+        def run_validation(data=empty):
+            if failed:
+                return {}
+            try:
+                return run_child_validation(data)
+            except ValidationError:
+                failed.append(data)
+                raise
+
+        # the child is validated through run_validation by all versions of ListSerializer
+        self.child.run_validation = run_validation
+        try:
+            return super().to_internal_value(data)
+        finally:
+            del self.child.run_validation
+
+
+def chunked(iterable, size):
+    """
+    Split an iterable into lists of at most size items
+    """
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def sparse_errors(detail):
+    """
+    Convert the error detail of a ListSerializer (list or {index: error} mapping) to a mapping of the errors by index,
+    without the entries of valid related objects
+    """
+    if isinstance(detail, dict) and detail and all(isinstance(index, int) for index in detail):
+        return {index: error for index, error in detail.items() if error}
+    if isinstance(detail, list):
+        return {index: error for index, error in enumerate(detail) if error}
+    return {0: detail}
+
+
+def is_list_error_detail(detail):
+    """
+    Check if an error detail holds the errors of the single related objects, not the errors of the list itself
+    """
+    if isinstance(detail, dict):
+        return bool(detail) and all(isinstance(index, int) for index in detail)
+    return isinstance(detail, list) and bool(detail) and all(isinstance(error, dict) for error in detail)
+
+
+def get_error_detail(exception):
+    """
+    Get the error detail of an exception raised while writing a related object, None if the exception is not a
+    validation error
+    """
+    if hasattr(exception, "message_dict"):
+        return exception.message_dict
+    if hasattr(exception, "detail"):
+        return exception.detail
+    return None
+
+
+def is_retryable_error(exception):
+    """
+    Check if a database error is a serialization failure, deadlock or lock timeout, after which the whole
+    transaction can be run again
+    """
+    cause = exception.__cause__ or exception
+
+    # PostgreSQL: psycopg2 provides pgcode, psycopg 3 sqlstate
+    sqlstate = getattr(cause, "pgcode", None) or getattr(cause, "sqlstate", None)
+    if sqlstate is not None:
+        return sqlstate in RETRYABLE_SQLSTATES
+
+    # MySQL/MariaDB: the error code is the first argument
+    if cause.args and cause.args[0] in RETRYABLE_MYSQL_ERRORS:
+        return True
+
+    # SQLite: the database file is locked by another connection
+    return "database is locked" in str(cause) or "database table is locked" in str(cause)
+
+
+def get_retry_delay(retry, backoff, max_backoff):
+    """
+    Exponential backoff with full jitter
+    """
+    return random.uniform(0, min(max_backoff, backoff * 2 ** retry))
+
+
+def create_instance(serializer, validated_data, alias):
+    """
+    Create the instance of a model serializer on the given database alias, like `ModelSerializer.create`
+    """
+    model = serializer.Meta.model
+    if alias == router.db_for_write(model):
+        return serializers.ModelSerializer.create(serializer, validated_data)
+
+    info = model_meta.get_field_info(model)
+    many_to_many = {}
+    for field_name, relation_info in info.relations.items():
+        if relation_info.to_many and field_name in validated_data:
+            many_to_many[field_name] = validated_data.pop(field_name)
+
+    instance = model._default_manager.db_manager(alias).create(**validated_data)
+    for field_name, value in many_to_many.items():
+        getattr(instance, field_name).set(value)
+    return instance
+
+
+def get_snapshot_origin(request):
+    """
+    Get the scheme, host and script prefix the hyperlinks of a representation are built with for a request, snapshots
+    are only served to requests of the same origin
+    """
+    return request.build_absolute_uri(get_script_prefix())
+
+
+def get_serializer_path(serializer):
+    """
+    Get the relation path of a nested serializer from the root serializer, e.g. "chapters.pages"
+    """
+    field_names = []
+    while serializer.parent is not None:
+        if serializer.field_name:
+            field_names.append(serializer.field_name)
+        serializer = serializer.parent
+    return ".".join(reversed(field_names))
+
+
+def parse_field_paths(value):
+    """
+    Parse a comma separated list of dotted field paths to a tree, e.g. "title,chapters.title" to
+    {"title": {}, "chapters": {"title": {}}}
+    """
+    tree = {}
+    for path in value.split(","):
+        node = tree
+        for field_name in path.strip().split("."):
+            if field_name:
+                node = node.setdefault(field_name, {})
+    return tree
+
+
+def get_written_field_names(model, entries, *field_names):
+    """
+    Get the concrete fields to load of the existing objects written with the given entries: the fields of the
+    entries, the primary key, the given fields (e.g. the inverse relation), the foreign keys (the parents of the rows
+    in the identity map) and the fields set on save (`auto_now`). Deferred fields are not saved, other fields are
+    loaded when they are accessed.
+    :param model:
+    :param entries: validated data of the related objects
+    :param field_names:
+    :return: list of field names, None if all fields are loaded
+    """
+    written = {"pk", *field_names}
+    for entry in entries:
+        if not isinstance(entry, dict):
+            return None
+        written.update(entry)
+
+    concrete_fields = model._meta.concrete_fields
+    loaded = {
+        field.name for field in concrete_fields
+        if field.name in written or field.primary_key or field.many_to_one or getattr(field, "auto_now", False)
+    }
+    if len(loaded) == len(concrete_fields):
+        return None
+    return sorted(loaded)
+
+
+def set_position(entry, instance, position, order_field):
+    """
+    Set the position of a related object in its entry (`Meta.nested_order_field`), the position of an existing object
+    is only written if it changed
+    :param entry: copy of the validated data of the related object
+    :param instance: existing related object, None for new objects
+    :param position: index of the related object in the request
+    :param order_field:
+    :return: False if there is nothing to write, the existing object is at its position and the entry has no other
+        changes
+    """
+    entry.pop(order_field, None)
+    if instance is None or getattr(instance, order_field) != position:
+        entry[order_field] = position
+    return instance is None or order_field in entry or not is_unchanged(entry, instance, order_field)
+
+
+def is_unchanged(entry, instance, *ignored_fields):
+    """
+    Check if the validated data of an existing related object only holds values equal to the loaded ones, e.g. a full
+    entry of an object that is only moved. Values of fields that are not loaded, of relations other than foreign keys
+    or of fields that are not model fields are taken as changes.
+    :param entry: validated data of the related object
+    :param instance: existing related object
+    :param ignored_fields: names of fields that are not compared, e.g. the order field
+    :return:
+    """
+    opts = instance._meta
+    for key, value in entry.items():
+        if key == "pk" or key in ignored_fields:
+            continue
+        try:
+            field = opts.get_field(key)
+        except FieldDoesNotExist:
+            return False
+        if not field.concrete or field.many_to_many or field.attname not in instance.__dict__:
+            return False
+        if field.is_relation and isinstance(value, Model):
+            value = getattr(value, field.target_field.attname)
+        if getattr(instance, field.attname) != value:
+            return False
+    return True
+
+
+def needs_lookup(related_object, lookup_fields):
+    """
+    Check if a validated child entry without pk can be matched on the given lookup fields
+    """
+    return (
+        isinstance(related_object, dict)
+        and not is_removal(related_object)
+        and related_object.get("pk") is None
+        and all(field_name in related_object for field_name in lookup_fields)
+    )
+
+
+def get_lookup_key(related_object, lookup_fields):
+    """
+    Get the values of the lookup fields of a validated child entry, related objects by pk
+    """
+    return tuple(
+        related_object[field_name].pk if isinstance(related_object[field_name], Model) else related_object[field_name]
+        for field_name in lookup_fields
+    )
+
+
+def is_removal(related_object):
+    """
+    Check if a validated child entry is a removal marker
+    """
+    return isinstance(related_object, dict) and related_object.get(DELETE_MARKER, False)
+
 
 class BaseNestedSerializer(serializers.ModelSerializer):
+    def is_partial_relation(self, relation_name):
+        """
+        Check if the given relation is written in partial mode. Partial relations keep the related objects that are
+        not part of the request and only remove the ones marked with DELETE_MARKER.
+        Partial mode is used for partial updates (PATCH) or for relations listed in `Meta.nested_partial_fields`.
+        :param relation_name:
+        :return:
+        """
+        if getattr(self.root, "partial", False):
+            return True
+        return relation_name in getattr(self.Meta, "nested_partial_fields", [])
+
+    def get_order_field(self, relation_name):
+        """
+        Get the field the position of the related objects of a one to many relation is stored in
+        (`Meta.nested_order_field`, e.g. {"chapters": "order"}). The order values are taken from the position in the
+        request, except for partial relations.
+        :param relation_name:
+        :return: field name, None if the relation is not ordered
+        """
+        if self.is_partial_relation(relation_name):
+            return None
+        return getattr(self.Meta, "nested_order_field", {}).get(relation_name)
+
+    def get_counter_field(self, relation_name):
+        """
+        Get the field of the parent counting the related objects of a one to many relation
+        (`Meta.nested_counter_fields`, e.g. {"pages": "page_count"})
+        :param relation_name:
+        :return: field name, None if the relation is not counted
+        """
+        return getattr(self.Meta, "nested_counter_fields", {}).get(relation_name)
+
+    def add_counter_delta(self, model, pk, counter_field, delta, instance=None):
+        """
+        Add to the counter of a parent object, the counters are written by `update_counter_fields`
+        :param model: model of the parent
+        :param pk: primary key of the parent
+        :param counter_field:
+        :param delta: number of added (positive) or removed (negative) related objects
+        :param instance: parent instance, its counter is updated as well
+        :return:
+        """
+        if not delta or pk is None:
+            return
+        counter = self.root._nested_counter_deltas.setdefault((model._meta.concrete_model, pk), [instance, {}])
+        if instance is not None:
+            counter[0] = instance
+        counter[1][counter_field] = counter[1].get(counter_field, 0) + delta
+
+    def update_counter_fields(self):
+        """
+        Write the pending counter deltas with a single F() expression update per parent object
+        """
+        counter_deltas = self.root._nested_counter_deltas
+        for (model, pk), (instance, deltas) in counter_deltas.items():
+            deltas = {counter_field: delta for counter_field, delta in deltas.items() if delta}
+            if not deltas:
+                continue
+            self._get_write_queryset(model).filter(pk=pk).update(
+                **{counter_field: F(counter_field) + delta for counter_field, delta in deltas.items()}
+            )
+            if instance is not None:
+                # the counters of the instance are only taken from the database, never computed in memory
+                instance.refresh_from_db(using=self.root._nested_write_alias, fields=list(deltas))
+        counter_deltas.clear()
+
+    def get_aggregated_fields(self):
+        """
+        Get the fields of the instance that are only written with F() expressions by nested writes (the counter
+        fields and the version field), they are left out when the instance itself is saved
+        :return: list of field names
+        """
+        field_names = list(getattr(self.Meta, "nested_counter_fields", {}).values())
+        version_field = self.get_version_field()
+        if version_field is not None:
+            field_names.append(version_field)
+        return field_names
+
+    def defer_aggregated_fields(self, instance, validated_data):
+        """
+        Unload the aggregated fields of an instance before it is saved, unless they are written explicitly. Model.save()
+        only writes the loaded fields of an instance with deferred fields, a stale or rolled back value of the instance
+        would overwrite the increments of concurrent writes otherwise.
+        :param instance:
+        :param validated_data:
+        :return:
+        """
+        for field_name in self.get_aggregated_fields():
+            if field_name not in validated_data:
+                instance.__dict__.pop(instance._meta.get_field(field_name).attname, None)
+
+    def get_version_field(self):
+        """
+        Get the integer field of the instance that is incremented by every nested write of the instance or its related
+        objects (`Meta.nested_version_field`), None if the instance is not versioned
+        """
+        return getattr(self.Meta, "nested_version_field", None)
+
+    def bump_version(self, instance):
+        """
+        Increment the version of a written instance, together with its counter fields
+        """
+        version_field = self.get_version_field()
+        if version_field is not None:
+            self.add_counter_delta(type(instance), instance.pk, version_field, 1, instance=instance)
+
+    def get_tree_parent_attname(self):
+        """
+        Get the attname of the foreign key to the parent in a recursive tree (a one to many relation of the model to
+        itself, e.g. the children of a category), None if the serializer has no recursive relation
+        """
+        for relation_name in getattr(self.Meta, "one_to_many_fields", []):
+            rel = getattr(self.Meta.model, relation_name).rel
+            if rel.related_model is self.Meta.model:
+                return rel.remote_field.attname
+        return None
+
+    def get_ancestor_pks(self, instance):
+        """
+        Get the primary keys of the ancestors of an instance of a recursive relation (a one to many relation of the
+        model to itself, e.g. the children of a category), nearest first
+        :param instance:
+        :return: list of primary keys
+        """
+        parent_attname = self.get_tree_parent_attname()
+        if parent_attname is None:
+            return []
+
+        queryset = self._get_write_queryset(self.Meta.model)
+        ancestor_pks = []
+        pk = getattr(instance, parent_attname)
+        while pk is not None and pk not in ancestor_pks:
+            ancestor_pks.append(pk)
+            pk = queryset.filter(pk=pk).values_list(parent_attname, flat=True).first()
+        return ancestor_pks
+
+    def get_tree_ancestor_pks(self, model, parent_attname, pks):
+        """
+        Get the primary keys of the ancestors of the given objects of a recursive tree, with a query per tree level
+        :param model:
+        :param parent_attname: attname of the foreign key to the parent
+        :param pks: primary keys of the objects
+        :return: set of primary keys
+        """
+        queryset = self._get_write_queryset(model)
+        ancestor_pks = set()
+        level_pks = set(pks)
+        while level_pks:
+            level_pks = set(
+                queryset.filter(pk__in=level_pks).exclude(**{parent_attname: None}).values_list(
+                    parent_attname, flat=True
+                )
+            ) - ancestor_pks
+            ancestor_pks.update(level_pks)
+        return ancestor_pks
+
+    def has_versioned_serializers(self):
+        """
+        Check if this serializer or one of its nested serializers has a version field, the objects written by the
+        nested write are only tracked for the versions of the objects sharing them
+        """
+        serializer_classes = set()
+        nested_serializers = [self]
+        while nested_serializers:
+            serializer = nested_serializers.pop()
+            if type(serializer) in serializer_classes:
+                continue
+            serializer_classes.add(type(serializer))
+            if serializer.get_version_field() is not None:
+                return True
+            for field in serializer.fields.values():
+                field = getattr(field, "child", field)
+                if isinstance(field, BaseNestedSerializer):
+                    nested_serializers.append(field)
+        return False
+
+    def resolve_written_path(self, path):
+        """
+        Resolve the relation path of written objects to the serializer writing them and the lookup of the objects of
+        this serializer reaching them. Trailing relations of a recursive tree are left out of the lookup, the objects
+        are reached through their ancestors.
+        :param path: relation path from this serializer, e.g. "categories.children"
+        :return: tuple of the serializer, the model and the lookup (list of relation names), None if the path cannot
+            be resolved
+        """
+        serializer = self
+        model = self.Meta.model
+        lookup = []
+        tree_lookup = []
+        try:
+            for field_name in path.split("."):
+                field = serializer.fields[field_name]
+                serializer = getattr(field, "child", field)
+                related_model = model._meta.get_field(field_name).related_model
+                if related_model is model and lookup:
+                    tree_lookup.append(field_name)
+                else:
+                    lookup.extend(tree_lookup)
+                    lookup.append(field_name)
+                    tree_lookup = []
+                model = related_model
+        except (KeyError, FieldDoesNotExist):
+            return None
+
+        if not isinstance(serializer, BaseNestedSerializer) or serializer.get_tree_parent_attname() is None:
+            lookup.extend(tree_lookup)
+        return serializer, model, lookup
+
+    def bump_shared_versions(self, instance):
+        """
+        Increment the versions of the objects whose representation contains the objects written by the nested write,
+        besides the written objects themselves: the ancestors of the instance and of the written objects in recursive
+        trees, and the other objects of this serializer reaching the written objects, e.g. the other books of a shared
+        category. Every object is incremented once per nested write. Unlinking or deleting related objects only
+        changes the representation of their parents within the nested write.
+        :param instance: top-level instance of the nested write
+        :return:
+        """
+        written_rows = getattr(self.root, "_nested_written_rows", None) or {}
+        model = type(instance)._meta.concrete_model
+        version_field = self.get_version_field()
+        # objects to increment and objects incremented with their write already, by model
+        bumped = {}
+        written = {model: {instance.pk}}
+        if version_field is not None:
+            bumped[model] = (version_field, set(self.get_ancestor_pks(instance)))
+
+        for path, pks in written_rows.items():
+            resolved = self.resolve_written_path(path)
+            if resolved is None:
+                continue
+            serializer, related_model, lookup = resolved
+            related_model = related_model._meta.concrete_model
+
+            reached_pks = set(pks)
+            parent_attname = None
+            if isinstance(serializer, BaseNestedSerializer):
+                parent_attname = serializer.get_tree_parent_attname()
+            if parent_attname is not None:
+                reached_pks.update(self.get_tree_ancestor_pks(related_model, parent_attname, pks))
+
+            related_version_field = None
+            if isinstance(serializer, BaseNestedSerializer):
+                related_version_field = serializer.get_version_field()
+            if related_version_field is not None:
+                written.setdefault(related_model, set()).update(pks)
+                bumped.setdefault(related_model, (related_version_field, set()))[1].update(reached_pks)
+
+            if version_field is not None:
+                filter_lookup = "__".join(lookup + ["in"]) if lookup else "pk__in"
+                bumped[model][1].update(
+                    self._get_write_queryset(model).filter(**{filter_lookup: reached_pks}).values_list("pk", flat=True)
+                )
+
+        for bumped_model, (bumped_version_field, pks) in bumped.items():
+            pks = pks - written.get(bumped_model, set())
+            if pks:
+                self._get_write_queryset(bumped_model).filter(pk__in=pks).update(
+                    **{bumped_version_field: F(bumped_version_field) + 1}
+                )
+
+    def get_snapshot_field(self):
+        """
+        Get the JSON or text field the rendered representation of the instance is stored in after every nested write
+        (`Meta.nested_snapshot_field`), None if no snapshot is stored. Snapshots are stamped with the version of the
+        instance, `Meta.nested_version_field` is required.
+        """
+        snapshot_field = getattr(self.Meta, "nested_snapshot_field", None)
+        if snapshot_field is not None and self.get_version_field() is None:
+            raise ImproperlyConfigured(
+                "{}.Meta.nested_snapshot_field requires Meta.nested_version_field.".format(type(self).__name__)
+            )
+        return snapshot_field
+
+    def write_snapshot(self, instance):
+        """
+        Store the representation of the written instance in its snapshot field, as rendered by the JSON renderer,
+        together with the version it represents and the origin of the hyperlinks (scheme, host and script prefix of
+        the request): {"version": 2, "origin": "https://example.com/", "data": {...}}. Text fields hold the rendered
+        JSON, JSON fields the decoded snapshot. The snapshot is written within the transaction of the nested write.
+        Writes without request in the context (e.g. hyperlinks cannot be built) keep the outdated snapshot, which is not
+        served for the new version.
+        :param instance:
+        :return:
+        """
+        snapshot_field = self.get_snapshot_field()
+        request = self.context.get("request")
+        if snapshot_field is None or request is None:
+            return
+        # rendered from a fresh instance, the prefetched and cached related objects of the instance are stale
+        written_instance = self._get_write_queryset(type(instance)).get(pk=instance.pk)
+        snapshot = {
+            "version": getattr(written_instance, self.get_version_field()),
+            "origin": get_snapshot_origin(request),
+            "data": self.to_representation(written_instance),
+        }
+        snapshot = JSONRenderer().render(snapshot).decode("utf-8")
+        if not isinstance(instance._meta.get_field(snapshot_field), (CharField, TextField)):
+            snapshot = json.loads(snapshot)
+        self._get_write_queryset(type(instance)).filter(pk=instance.pk).update(**{snapshot_field: snapshot})
+        setattr(instance, snapshot_field, snapshot)
+
+    def get_root_option(self, name, default=None):
+        """
+        Get a Meta option of the root serializer, the child of a root list serializer (many=True) for lists
+        """
+        root = self.root
+        if isinstance(root, serializers.ListSerializer):
+            root = root.child
+        return getattr(getattr(root, "Meta", None), name, default)
+
+    def is_fail_fast(self):
+        """
+        With `Meta.nested_fail_fast` of the root serializer, validation of a collection relation and the nested write
+        stop at the first invalid or failing related object. The nested write is rolled back and only the first error
+        is reported.
+        """
+        return self.get_root_option("nested_fail_fast", False)
+
+    def _check_fail_fast(self, errors):
+        if errors and self.is_fail_fast():
+            raise ValidationError(errors, code="invalid")
+
+    def _split_removals(self, relation_name, related_objects):
+        """
+        Split the removal markers (child entries with DELETE_MARKER) from the related objects to be validated
+        :param relation_name:
+        :param related_objects: unvalidated child entries
+        :return: tuple of the kept entries and the primary keys to remove
+        """
+        kept_objects = []
+        removed_pks = []
+        pk_field = self.Meta.model._meta.get_field(relation_name).related_model._meta.pk
+
+        for related_object in related_objects:
+            if not isinstance(related_object, dict) or not related_object.get(DELETE_MARKER, False):
+                kept_objects.append(related_object)
+                continue
+
+            if related_object.get("pk") is None:
+                raise ValidationError(
+                    {relation_name: ["A pk is required to remove a related object."]}, code="invalid"
+                )
+
+            try:
+                removed_pks.append(pk_field.to_python(related_object["pk"]))
+            except CoreValidationError as e:
+                raise ValidationError({relation_name: e.messages}, code="invalid")
+
+        return kept_objects, removed_pks
+
+    def to_internal_value(self, data):
+        """
+        Strip removal markers from collection relations before validation (the child serializers do not know
+        DELETE_MARKER) and add them back as `{"pk": <pk>, DELETE_MARKER: True}` entries after the related objects.
+        Streamed relations of a StreamedObject are validated and written in chunks by `process_streamed_fields`.
+        :param data:
+        :return:
+        """
+        if isinstance(data, StreamedObject):
+            self._streamed_data = data
+            data = dict(data)
+
+        removals = {}
+
+        for relation_type in COLLECTION_RELATION_TYPES:
+            for relation_name in getattr(self.Meta, relation_type, []):
+                related_objects = data.get(relation_name) if hasattr(data, "get") else None
+                if not isinstance(related_objects, list):
+                    continue
+
+                kept_objects, removed_pks = self._split_removals(relation_name, related_objects)
+                if len(kept_objects) != len(related_objects):
+                    data = data.copy()
+                    data[relation_name] = kept_objects
+                    removals[relation_name] = removed_pks
+
+        try:
+            validated_data = super().to_internal_value(data)
+        except ValidationError as e:
+            if self.uses_sparse_errors() and isinstance(e.detail, dict):
+                for relation_type in COLLECTION_RELATION_TYPES:
+                    for relation_name in getattr(self.Meta, relation_type, []):
+                        if is_list_error_detail(e.detail.get(relation_name)):
+                            e.detail[relation_name] = sparse_errors(e.detail[relation_name])
+            raise e
+
+        for relation_name, removed_pks in removals.items():
+            validated_data[relation_name] = list(validated_data.get(relation_name, [])) + [
+                {"pk": pk, DELETE_MARKER: True} for pk in removed_pks
+            ]
+
+        return validated_data
+
+    def _prefetch_related_objects(self, queryset):
+        """
+        Load the existing related objects in a single query ordered by pk. With `Meta.nested_select_for_update` of the
+        root serializer the rows of every level are locked by the same query, so concurrent nested writes acquire the
+        row locks in the same order.
+        :param queryset:
+        :return: dict of the related objects by pk
+        """
+        queryset = queryset.order_by("pk")
+        if self.get_root_option("nested_select_for_update", False):
+            queryset = queryset.select_for_update()
+        return {related_object.pk: self._add_to_identity_map(related_object) for related_object in queryset}
+
+    def _only_written_fields(self, queryset, entries, *field_names):
+        """
+        Load only the fields written with the entries of the existing related objects, large columns that are not
+        changed (e.g. text or JSON) are not transferred. Can be disabled with `Meta.nested_only_written_fields = False`
+        of the root serializer.
+        :param queryset: existing related objects
+        :param entries: validated data of the related objects
+        :param field_names: additional fields to load
+        :return: queryset
+        """
+        if not self.get_root_option("nested_only_written_fields", True):
+            return queryset
+        only_fields = get_written_field_names(queryset.model, entries, *field_names)
+        return queryset if only_fields is None else queryset.only(*only_fields)
+
+    def _add_to_identity_map(self, related_instance):
+        """
+        Get the instance of the row from the identity map of the nested write, every row is represented by a single
+        instance
+        """
+        identity_map = getattr(self.root, "_nested_identity_map", None)
+        if identity_map is None:
+            return related_instance
+        return identity_map.add(related_instance)
+
+    def _get_mapped_related_objects(self, related_model, parent_attname, parent_pk, pks=None):
+        """
+        Get the related objects of a parent that are already in the identity map of the nested write, by their loaded
+        foreign key to the parent
+        :param related_model:
+        :param parent_attname: attname of the foreign key to the parent
+        :param parent_pk:
+        :param pks: primary keys to look for, None for all related objects of the parent
+        :return: dict of the related objects by pk
+        """
+        identity_map = getattr(self.root, "_nested_identity_map", None)
+        if identity_map is None or parent_pk is None:
+            return {}
+        if pks is not None:
+            pks = set(pks)
+        return {
+            pk: related_instance
+            for pk, related_instance in identity_map.get_instances(related_model).items()
+            if (pks is None or pk in pks)
+            # deferred foreign keys are not loaded, the object is queried
+            and parent_attname in related_instance.__dict__
+            and related_instance.__dict__[parent_attname] == parent_pk
+        }
+
+    def _get_related_instances(self, related_model, pks):
+        """
+        Get the related objects by pk, only the objects not loaded before within the nested write are queried
+        :param related_model:
+        :param pks:
+        :return: dict of the related objects by pk
+        """
+        identity_map = getattr(self.root, "_nested_identity_map", None)
+        related_instances = {}
+        missing_pks = []
+        for pk in pks:
+            related_instance = identity_map.get(related_model, pk) if identity_map is not None else None
+            if related_instance is not None:
+                related_instances[pk] = related_instance
+            else:
+                missing_pks.append(pk)
+
+        if missing_pks:
+            related_instances.update(
+                self._prefetch_related_objects(self._get_write_queryset(related_model).filter(pk__in=missing_pks))
+            )
+        return related_instances
+
+    def _get_related_instance(self, related_model, pk):
+        """
+        Get a related object by pk from the identity map or the database
+        :raises related_model.DoesNotExist:
+        """
+        related_instance = self._get_related_instances(related_model, [pk]).get(pk)
+        if related_instance is None:
+            raise related_model.DoesNotExist(
+                "{} matching query does not exist.".format(related_model._meta.object_name)
+            )
+        return related_instance
+
+    @staticmethod
+    def _get_write_order(related_objects):
+        """
+        Order the related objects for writing: existing objects sorted by pk, followed by the new objects in request
+        order. Rows of a table are updated in the same order by every nested write.
+        :param related_objects:
+        :return: list of indices
+        """
+        def get_pk(related_object):
+            if isinstance(related_object, dict):
+                return related_object.get("pk")
+            return related_object.pk
+
+        indices = range(len(related_objects))
+        existing = [index for index in indices if get_pk(related_objects[index]) is not None]
+        new = [index for index in indices if get_pk(related_objects[index]) is None]
+        return sorted(existing, key=lambda index: get_pk(related_objects[index])) + new
+
+    def _match_lookup_fields(self, relation_name, related_objects, queryset):
+        """
+        Match the related objects without pk with the existing related objects on the fields listed for the relation
+        in `Meta.nested_lookup_fields` (natural key, e.g. `{"chapters": ["order"]}`), with a single query.
+        Matched related objects are updated in place instead of being replaced by new objects.
+        :param relation_name:
+        :param related_objects: validated related objects
+        :param queryset: existing related objects the related objects may be matched with
+        :return: related objects, the matched ones with the pk of the existing related object
+        """
+        lookup_fields = getattr(self.Meta, "nested_lookup_fields", {}).get(relation_name)
+        if not lookup_fields:
+            return related_objects
+
+        unmatched = [
+            index for index, related_object in enumerate(related_objects)
+            if needs_lookup(related_object, lookup_fields)
+        ]
+        if not unmatched:
+            return related_objects
+
+        # Restrict the query to the requested values of every lookup field
+        attnames = [queryset.model._meta.get_field(field_name).attname for field_name in lookup_fields]
+        lookup_keys = [get_lookup_key(related_objects[index], lookup_fields) for index in unmatched]
+        for position, attname in enumerate(attnames):
+            queryset = queryset.filter(**{attname + "__in": {lookup_key[position] for lookup_key in lookup_keys}})
+
+        # the oldest object wins if the lookup fields are not unique
+        existing_pks = {}
+        for row in queryset.order_by("-pk").values_list("pk", *attnames):
+            existing_pks[tuple(row[1:])] = row[0]
+
+        related_objects = list(related_objects)
+        for index, lookup_key in zip(unmatched, lookup_keys):
+            if lookup_key in existing_pks:
+                related_objects[index] = dict(related_objects[index], pk=existing_pks[lookup_key])
+        return related_objects
+
+    def get_write_alias(self, instance=None):
+        """
+        Get the database alias of the nested write. All writes and prefetches of a nested write use the alias of the
+        root serializer: the alias the updated instance was loaded from or the routed write alias of the model.
+        :param instance: instance to be updated by the root serializer
+        :return:
+        """
+        alias = getattr(self.root, "_nested_write_alias", None)
+        if alias is not None:
+            return alias
+        if instance is not None and instance._state.db:
+            return instance._state.db
+        return router.db_for_write(self.Meta.model, instance=instance)
+
+    def get_read_alias(self):
+        """
+        Get the database alias for read-only lookups (`Meta.nested_read_alias`, e.g. a replica), None to use the
+        routed alias. The read alias is used by the querysets of related fields while validating and by `plan()`.
+        :return:
+        """
+        return self.get_root_option("nested_read_alias")
+
+    def can_cache_fields(self):
+        """
+        The fields built from the model only depend on the serializer class, unless a method building them is
+        overwritten. Caching can be disabled with `Meta.nested_cache_fields = False`.
+        """
+        if not getattr(self.Meta, "nested_cache_fields", True):
+            return False
+        serializer_class = type(self)
+        return all(
+            getattr(serializer_class, name) is getattr(serializers.ModelSerializer, name)
+            for name in FIELD_BUILDING_METHODS
+        )
+
+    def get_fields(self):
+        """
+        The fields are built once per serializer class and copied for every instance. The copies are unbound, nested
+        serializers build their own fields on first access.
+        """
+        if self.can_cache_fields():
+            serializer_class = type(self)
+            # looked up in the class itself, subclasses have fields of their own
+            fields_template = serializer_class.__dict__.get("_nested_fields_template")
+            if fields_template is None:
+                fields_template = super().get_fields()
+                serializer_class._nested_fields_template = fields_template
+            fields = copy.deepcopy(fields_template)
+        else:
+            fields = super().get_fields()
+
+        fields = self.paginate_fields(fields)
+        fields = self.prune_fields(fields)
+        fields = self.fail_fast_fields(fields)
+
+        read_alias = self.get_read_alias()
+        if read_alias is not None:
+            for field in fields.values():
+                field = getattr(field, "child_relation", field)
+                if isinstance(field, serializers.RelatedField) and field.queryset is not None:
+                    field.queryset = field.queryset.using(read_alias)
+
+        return fields
+
+    def paginate_fields(self, fields):
+        """
+        Replace the list serializers of the one to many relations in `Meta.nested_page_size` (e.g. {"pages": 100})
+        with page list serializers. The cursor of a page is taken from the `<path>.cursor` query parameter, e.g.
+        `chapters.pages.cursor`.
+        :param fields: fields of this serializer
+        :return: fields
+        """
+        page_sizes = getattr(self.Meta, "nested_page_size", {})
+        if not page_sizes:
+            return fields
+
+        path = get_serializer_path(self)
+        one_to_many_fields = getattr(self.Meta, "one_to_many_fields", [])
+        for field_name, page_size in page_sizes.items():
+            field = fields.get(field_name)
+            if field_name not in one_to_many_fields or not isinstance(field, serializers.ListSerializer):
+                raise ImproperlyConfigured(
+                    "Meta.nested_page_size of {} lists {}, which is not a nested one to many field.".format(
+                        type(self).__name__, field_name
+                    )
+                )
+            if isinstance(field, NestedPageListSerializer):
+                continue
+            # the child is bound to the list serializer already, the page list serializer binds a copy
+            kwargs = dict(field._kwargs, child=copy.deepcopy(field.child))
+            fields[field_name] = get_page_list_serializer_class(type(field))(
+                *field._args,
+                page_size=page_size,
+                cursor_query_param="{}.cursor".format(".".join(filter(None, [path, field_name]))),
+                **kwargs
+            )
+        return fields
+
+    def fail_fast_fields(self, fields):
+        """
+        Replace the list serializers of the collection relations with fail-fast list serializers in fail-fast mode
+        (`Meta.nested_fail_fast` of the root serializer), so plain model serializer children stop at the first invalid
+        related object as well
+        :param fields: fields of this serializer
+        :return: fields
+        """
+        if not self.is_fail_fast():
+            return fields
+
+        for relation_type in COLLECTION_RELATION_TYPES:
+            for field_name in getattr(self.Meta, relation_type, []):
+                field = fields.get(field_name)
+                if not isinstance(field, serializers.ListSerializer) or isinstance(field, NestedFailFastListSerializer):
+                    continue
+                # the child is bound to the list serializer already, the fail-fast list serializer binds a copy
+                kwargs = dict(field._kwargs, child=copy.deepcopy(field.child))
+                fields[field_name] = get_fail_fast_list_serializer_class(type(field))(*field._args, **kwargs)
+        return fields
+
+    def prune_fields(self, fields):
+        """
+        Prune the fields to the sparse fieldset requested with the `fields` and `expand` query parameters, if
+        `Meta.nested_sparse_fieldsets` of the root serializer is set. Only read requests are pruned.
+        `fields` lists the dotted paths of the fields to render, a nested serializer listed without fields is
+        rendered with all of its fields. With `expand`, nested serializers not listed in `expand` (or `fields`) are
+        left out.
+        :param fields: fields of this serializer
+        :return: pruned fields
+        """
+        request = self.context.get("request")
+        if (
+            not self.get_root_option("nested_sparse_fieldsets", False)
+            or request is None
+            or request.method not in SAFE_METHODS
+        ):
+            return fields
+
+        query_params = getattr(request, "query_params", request.GET)
+        path = [field_name for field_name in get_serializer_path(self).split(".") if field_name]
+
+        requested = None
+        if FIELDS_PARAM in query_params:
+            requested = parse_field_paths(query_params[FIELDS_PARAM])
+            for field_name in path:
+                # a serializer listed without fields is rendered with all of its fields
+                requested = requested.get(field_name, {}) if requested else {}
+            if requested:
+                fields = {field_name: field for field_name, field in fields.items() if field_name in requested}
+
+        if EXPAND_PARAM in query_params:
+            expanded = parse_field_paths(query_params[EXPAND_PARAM])
+            for field_name in path:
+                expanded = expanded.get(field_name, {})
+            fields = {
+                field_name: field for field_name, field in fields.items()
+                if not isinstance(field, serializers.BaseSerializer)
+                or field_name in expanded
+                or (requested and field_name in requested)
+            }
+        return fields
+
+    def get_prefetch_lookups(self, prefix="", path=()):
+        """
+        Get the prefetch_related lookups of the nested serializers of the readable fields. Recursive serializers are
+        prefetched for one level, deeper levels are loaded when they are represented.
+        :param prefix: lookup of this serializer, e.g. "chapters"
+        :param path: serializer classes of the parent serializers
+        :return: list of lookups
+        """
+        lookups = []
+        path = path + (type(self),)
+        for field in self._readable_fields:
+            nested_serializer = getattr(field, "child", field)
+            if not isinstance(nested_serializer, serializers.ModelSerializer) or len(field.source_attrs) != 1:
+                continue
+            try:
+                model_field = self.Meta.model._meta.get_field(field.source_attrs[0])
+            except FieldDoesNotExist:
+                continue
+
+            if isinstance(field, NestedPageListSerializer):
+                lookups.append(field.get_prefetch(prefix, model_field.field))
+                lookup = prefix + field.get_prefetch_to_attr()
+            else:
+                lookup = prefix + field.source_attrs[0]
+                lookups.append(lookup)
+            if isinstance(nested_serializer, BaseNestedSerializer) and type(nested_serializer) not in path:
+                lookups.extend(nested_serializer.get_prefetch_lookups(lookup + "__", path))
+        return lookups
+
+    def uses_compiled_representation(self):
+        """
+        With `Meta.nested_compiled_representation` of the root serializer the output is built by a function compiled
+        from the fields, once per serializer instance (the child of a list serializer is shared by all items)
+        """
+        return self.get_root_option("nested_compiled_representation", False)
+
+    def get_compiled_representation(self):
+        """
+        Get the compiled representation of this serializer, None if `to_representation` is overwritten
+        """
+        if type(self).to_representation is not BaseNestedSerializer.to_representation:
+            return None
+        represent = self.__dict__.get("_compiled_representation")
+        if represent is None:
+            represent = self._compiled_representation = compile_representation(self)
+        return represent
+
+    def to_representation(self, instance):
+        represent = self.get_compiled_representation() if self.uses_compiled_representation() else None
+        if represent is not None:
+            return represent(instance)
+        return super().to_representation(instance)
+
+    def _get_write_queryset(self, model):
+        return model.objects.using(self.get_write_alias())
+
+    def _create_instance(self, validated_data):
+        return create_instance(self, validated_data, self.get_write_alias())
+
+    def _create_related_object(self, related_serializer, validated_data):
+        """
+        Create a related object with the related serializer. Objects of serializers without a custom create method
+        are created on the write alias of the nested write.
+        :param related_serializer:
+        :param validated_data:
+        :return:
+        """
+        if type(related_serializer).create is serializers.ModelSerializer.create:
+            related_instance = create_instance(related_serializer, dict(validated_data), self.get_write_alias())
+        else:
+            related_instance = related_serializer.create(validated_data=validated_data)
+
+        identity_map = getattr(self.root, "_nested_identity_map", None)
+        if identity_map is not None:
+            identity_map.mark_written(related_instance, validated_data)
+
+        self.record_nested_change(get_serializer_path(related_serializer), "created", related_instance)
+        return related_instance
+
+    def _insert_related_objects(self, related_serializer, related_model, entries):
+        """
+        Insert new related objects with the insert backend of the write alias (`Meta.nested_insert_backend` of the root
+        serializer), like `apply(plan)`. Only objects of serializers without a custom create method, with concrete
+        fields only and without row signal receivers are inserted, the others are created one by one. If the insert
+        fails, it is rolled back and the objects are created one by one to report the failing object.
+        :param related_serializer:
+        :param related_model:
+        :param entries: dict of the validated data of the new related objects by index
+        :return: indices of the inserted related objects
+        """
+        # imported here, the plans and backends modules build on this module
+        from .backends import get_insert_backend
+        from .plans import has_only_concrete_fields
+
+        if len(entries) < 2 or related_serializer is None:
+            return set()
+        if type(related_serializer).create is not serializers.ModelSerializer.create:
+            return set()
+        if not self.get_root_option("nested_suppress_row_signals", False) and (
+            signals.pre_save.has_listeners(related_model) or signals.post_save.has_listeners(related_model)
+        ):
+            return set()
+        if not all(has_only_concrete_fields(related_model, entry) for entry in entries.values()):
+            return set()
+
+        using = self.get_write_alias()
+        insert_backend = get_insert_backend(related_model, using, self.get_root_option("nested_insert_backend"))
+        if insert_backend is None:
+            return set()
+
+        try:
+            with transaction.atomic(using=using):
+                related_instances = insert_backend.insert(
+                    related_model, [related_model(**entry) for entry in entries.values()]
+                )
+        except DatabaseError:
+            return set()
+
+        identity_map = getattr(self.root, "_nested_identity_map", None)
+        for related_instance, entry in zip(related_instances, entries.values()):
+            if identity_map is not None:
+                identity_map.mark_written(related_instance, entry)
+        self.record_nested_change(get_serializer_path(related_serializer), "created", *related_instances)
+        return set(entries)
+
+    def _update_related_object(self, related_serializer, related_instance, validated_data):
+        """
+        Update a related object with the related serializer. Objects appearing more than once within the nested
+        write are written with the merged data of all entries, entries without new data are skipped.
+        Conflicting values raise a ValidationError.
+        :param related_serializer:
+        :param related_instance:
+        :param validated_data:
+        :return:
+        """
+        identity_map = getattr(self.root, "_nested_identity_map", None)
+        if identity_map is not None:
+            related_instance = identity_map.add(related_instance)
+            validated_data = identity_map.merge(related_instance, validated_data)
+            if validated_data is None:
+                return related_instance
+
+        related_instance = related_serializer.update(instance=related_instance, validated_data=validated_data)
+        self.record_nested_change(get_serializer_path(related_serializer), "updated", related_instance)
+        return related_instance
+
+    def record_nested_change(self, path, action, *related_instances, model=None, pks=None):
+        """
+        Record created, updated, unlinked or deleted objects for the `nested_write_completed` summary, and the
+        created and updated objects for the versions of the objects sharing them. Nothing is recorded if the signal has
+        no receivers and no serializer is versioned.
+        :param path: relation path of the objects, e.g. "chapters.pages"
+        :param action: "created", "updated", "unlinked" or "deleted"
+        :param related_instances: changed objects
+        :param model: model of the changed objects, if given by pks
+        :param pks: primary keys of the changed objects
+        :return:
+        """
+        changes = getattr(self.root, "_nested_write_changes", None)
+        written_rows = getattr(self.root, "_nested_written_rows", None)
+        if changes is None and written_rows is None:
+            return
+
+        for related_instance in related_instances:
+            self.record_nested_change(path, action, model=type(related_instance), pks=[related_instance.pk])
+
+        if model is not None and pks and written_rows is not None and path and action in ("created", "updated"):
+            written_rows.setdefault(path, set()).update(pks)
+
+        if model is not None and pks and changes is not None:
+            summary = changes.setdefault(path, {
+                "model": model,
+                "created": set(),
+                "updated": set(),
+                "unlinked": set(),
+                "deleted": set(),
+            })
+            summary[action].update(pks)
+
+    def _record_released(self, queryset, path, action):
+        """
+        Record the objects of a queryset before unlinking or deleting them
+        """
+        if getattr(self.root, "_nested_write_changes", None) is not None:
+            pks = list(queryset.values_list("pk", flat=True))
+            self.record_nested_change(path, action, model=queryset.model, pks=pks)
+
+    def _run_in_batches(self, indices, write):
+        """
+        Call write(index) for the given indices of the related objects. The writes run in savepoints of
+        `Meta.nested_savepoint_batch_size` related objects, a failing batch is rolled back and bisected to find the
+        failing indices, the other writes of the batch are applied again.
+        :param indices:
+        :param write: callable writing the related object of the given index
+        :return: dict of the errors by index (empty if all writes succeeded)
+        """
+        indices = list(indices)
+        batch_size = getattr(self.Meta, "nested_savepoint_batch_size", DEFAULT_SAVEPOINT_BATCH_SIZE)
+        errors = {}
+
+        for start in range(0, len(indices), batch_size):
+            self._run_batch(indices[start:start + batch_size], write, errors)
+            if errors and self.is_fail_fast():
+                break
+
+        return errors
+
+    def uses_sparse_errors(self):
+        """
+        Errors of collection relations are reported as {index: error} mapping with `Meta.nested_sparse_errors` of the
+        root serializer, otherwise as list of errors by index up to the last error
+        """
+        return self.get_root_option("nested_sparse_errors", False)
+
+    def format_relation_errors(self, errors):
+        """
+        Format the errors of a collection relation by index according to `uses_sparse_errors()`
+        :param errors: dict of errors by index
+        :return:
+        """
+        if self.uses_sparse_errors():
+            return dict(sorted(errors.items()))
+        if not errors:
+            return []
+        return [errors.get(index, {}) for index in range(max(errors) + 1)]
+
+    def _add_relation_errors(self, errors, related_errors):
+        """
+        Add the errors by index of written related objects to a dict of errors by index, or to a list of errors
+        """
+        if isinstance(errors, dict):
+            errors.update(related_errors)
+        elif related_errors:
+            errors.extend(related_errors.get(index, {}) for index in range(max(related_errors) + 1))
+
+    def _run_batch(self, indices, write, errors):
+        identity_map = getattr(self.root, "_nested_identity_map", None)
+        savepoint = identity_map.savepoint() if identity_map is not None else None
+        index = indices[0]
+        try:
+            with transaction.atomic(using=self.get_write_alias()):
+                for index in indices:
+                    write(index)
+        except Exception as e:
+            if identity_map is not None:
+                identity_map.rollback(savepoint)
+
+            error = get_error_detail(e)
+            if error is None:
+                raise e
+
+            if len(indices) == 1 or self.is_fail_fast():
+                # in fail-fast mode the batch is not bisected, the failing write is the one that raised
+                errors[index] = error
+            else:
+                middle = len(indices) // 2
+                self._run_batch(indices[:middle], write, errors)
+                self._run_batch(indices[middle:], write, errors)
+
     def _manage_one_to_many_assignment(
         self,
         instance,
@@ -21,6 +1333,8 @@ class BaseNestedSerializer(serializers.ModelSerializer):
         relation_name=None,
         inverse_relation_name=None,
         errors=None,
+        partial=False,
+        position_offset=None,
     ):
         """
         Update previous relations (set null/blank or remove unwanted, depending on the related model.field definition),
@@ -32,11 +1346,27 @@ class BaseNestedSerializer(serializers.ModelSerializer):
         :param relation_name:
         :param inverse_relation_name:
         :param errors:
+        :param partial: keep related objects not specified in the request, only remove the marked ones
+        :param position_offset: position of the first related object within the whole relation, for the chunks of a
+        streamed relation. Partial writes without offset do not number the related objects.
         :return:
         """
         if errors is None:
             errors = []
 
+        relation_path = get_serializer_path(self) + "." + relation_name if self.parent else relation_name
+
+        # Split the removal markers from the related objects to be kept
+        removed_pks = [related_object["pk"] for related_object in related_objects if is_removal(related_object)]
+        related_objects = [related_object for related_object in related_objects if not is_removal(related_object)]
+
+        # Match related objects without pk on `Meta.nested_lookup_fields`
+        related_objects = self._match_lookup_fields(
+            relation_name,
+            related_objects,
+            self._get_write_queryset(related_model).filter(**{inverse_relation_name: instance}),
+        )
+
         # Get common assignments (existing and still wanted related objects)
         related_object_pks = []
         for related_object in related_objects:
@@ -53,25 +1383,53 @@ class BaseNestedSerializer(serializers.ModelSerializer):
             if field.name == inverse_relation_name
         ][0]
 
-        if inverse_field.null:
+        queryset = self._get_write_queryset(related_model).filter(**{inverse_relation_name: instance})
+
+        order_field = self.get_order_field(relation_name) if not partial or position_offset is not None else None
+        counter_field = self.get_counter_field(relation_name)
+        released_count = 0
+
+        # Prefetch (and lock) the existing related objects before releasing or updating any of them. Objects loaded
+        # before within the nested write (e.g. pages of the book and of its chapters) are taken from the identity map.
+        existing_queryset = self._only_written_fields(
+            queryset, related_objects, *filter(None, [inverse_relation_name, order_field])
+        )
+        mapped_objects = self._get_mapped_related_objects(
+            related_model, inverse_field.attname, instance.pk, related_object_pks + removed_pks if partial else None
+        )
+        if mapped_objects:
+            existing_queryset = existing_queryset.exclude(pk__in=list(mapped_objects))
+        if partial:
+            existing_queryset = existing_queryset.filter(pk__in=related_object_pks + removed_pks)
+        if not partial or set(related_object_pks + removed_pks) - set(mapped_objects):
+            existing_objects = self._prefetch_related_objects(existing_queryset)
+        else:
+            existing_objects = {}
+        if mapped_objects:
+            existing_objects = dict(sorted({**existing_objects, **mapped_objects}.items()))
+
+        if partial:
+            # only the related objects marked for removal are released, skip the scan for orphans
+            queryset = queryset.filter(pk__in=removed_pks)
+        else:
+            queryset = queryset.exclude(pk__in=related_object_pks)
+
+        if partial and not removed_pks:
+            # nothing to release, the related objects not specified in the request are kept
+            pass
+        elif inverse_field.null:
             # unset (set blank) the inverse relation to all currently related_objects
             # not supposed to be kept (not specified in the request)
-            related_model.objects.filter(**{inverse_relation_name: instance}).exclude(
-                pk__in=related_object_pks
-            ).update(**{inverse_relation_name: None})
+            self._record_released(queryset, relation_path, "unlinked")
+            released_count = queryset.update(**{inverse_relation_name: None})
         elif inverse_field.blank:
             # unset (set blank) the inverse relation to all currently related_objects
             # not supposed to be kept (not specified in the request)
-            related_model.objects.filter(**{inverse_relation_name: instance}).exclude(
-                pk__in=related_object_pks
-            ).update(**{inverse_relation_name: ""})
+            self._record_released(queryset, relation_path, "unlinked")
+            released_count = queryset.update(**{inverse_relation_name: ""})
         else:
             # delete all currently related_objects
             # not supposed to be kept (not specified in the request)
-            queryset = related_model.objects.filter(
-                **{inverse_relation_name: instance}
-            ).exclude(pk__in=related_object_pks,)
-
             if hasattr(related_serializer.Meta, "one_to_many_fields_filters"):
                 if relation_name in related_serializer.Meta.one_to_many_fields_filters:
                     queryset = queryset.filter(
@@ -80,64 +1438,105 @@ class BaseNestedSerializer(serializers.ModelSerializer):
                         ]
                     )
 
-            queryset.delete()
+            self._record_released(queryset, relation_path, "deleted")
+            released_count = queryset.delete()[1].get(related_model._meta.label, 0)
+
+        # Count the created related objects and the ones moved from another parent before they are written
+        created_count = 0
+        previous_parent_pks = []
+        if counter_field:
+            for related_object in related_objects:
+                if isinstance(related_object, related_model):
+                    previous_parent_pk = getattr(related_object, inverse_field.attname)
+                    if previous_parent_pk != instance.pk:
+                        created_count += 1
+                        previous_parent_pks.append(previous_parent_pk)
+                elif related_object.get("pk") not in existing_objects:
+                    created_count += 1
+
+        # Number the related objects by their position, existing objects without other changes are moved with a
+        # single statement
+        skipped_indices = set()
+        moved_objects = []
+        if order_field:
+            related_objects = list(related_objects)
+            for index, related_object in enumerate(related_objects):
+                position = index + (position_offset or 0)
+                if isinstance(related_object, related_model):
+                    setattr(related_object, order_field, position)
+                    continue
+                existing_object = existing_objects.get(related_object.get("pk"))
+                related_object = related_objects[index] = dict(related_object)
+                if not set_position(related_object, existing_object, position, order_field):
+                    skipped_indices.add(index)
+                elif existing_object is not None and is_unchanged(related_object, existing_object, order_field):
+                    skipped_indices.add(index)
+                    setattr(existing_object, order_field, position)
+                    moved_objects.append(existing_object)
+
+        # Insert the new related objects of a plain model serializer at once
+        inserted_indices = self._insert_related_objects(
+            related_serializer,
+            related_model,
+            {
+                index: dict(related_object, **{inverse_relation_name: instance})
+                for index, related_object in enumerate(related_objects)
+                if index not in skipped_indices and isinstance(related_object, dict) and "pk" not in related_object
+            },
+        )
+        if inserted_indices:
+            skipped_indices.update(inserted_indices)
+            # the related objects prefetched for the parent are stale
+            getattr(instance, "_prefetched_objects_cache", {}).pop(relation_name, None)
 
         # Set the new relations (create if not exist yet)
         # TODO: make unittest to prove and explain behaviour!
         # (if pk is given, but object is gone/belongs to another template, create a new one)
-        related_errors = []
-        related_error_found = False
-        for related_object in related_objects:
-            try:
-                if isinstance(related_object, related_model):
-                    setattr(related_object, inverse_relation_name, instance)
-                    related_object.save()
+        def write_related_object(index):
+            if index in skipped_indices:
+                return
+            related_object = related_objects[index]
+            if isinstance(related_object, related_model):
+                setattr(related_object, inverse_relation_name, instance)
+                related_object.save()
+                self.record_nested_change(relation_path, "updated", related_object)
 
-                    # add the new related child to the parent instance
-                    getattr(instance, relation_name).add(related_object)
-                else:
-                    related_object[inverse_relation_name] = instance
-
-                    if related_serializer:
-                        self._manage_one_to_many_child(
-                            instance=instance,
-                            child=related_object,
-                            child_model=related_model,
-                            child_serializer=related_serializer,
-                            relation_name=relation_name,
-                        )
+                # add the new related child to the parent instance
+                getattr(instance, relation_name).add(related_object)
+            else:
+                # work on a copy, the entry is written again if its batch is rolled back
+                related_object = dict(related_object)
+                related_object[inverse_relation_name] = instance
+
+                if related_serializer:
+                    self._manage_one_to_many_child(
+                        instance=instance,
+                        child=related_object,
+                        child_model=related_model,
+                        child_serializer=related_serializer,
+                        relation_name=relation_name,
+                        child_instance=existing_objects.get(related_object.get("pk")),
+                    )
 
-                related_errors.append({})
-            except CoreValidationError as e:
-                if hasattr(e, "message_dict"):
-                    related_errors.append(e.message_dict)
-                    related_error_found = True
-                else:
-                    raise e
-            except ValidationError as e:
-                if hasattr(e, "detail"):
-                    related_errors.append(e.detail)
-                    related_error_found = True
-                else:
-                    raise e
-            except Exception as e:
-                if hasattr(e, "message_dict"):
-                    related_errors.append(e.message_dict)
-                    related_error_found = True
-                elif hasattr(e, "detail"):
-                    related_errors.append(e.detail)
-                    related_error_found = True
-                else:
-                    raise e
+        related_errors = self._run_in_batches(self._get_write_order(related_objects), write_related_object)
+        self._add_relation_errors(errors, related_errors)
 
-        if related_error_found:
-            last_err = next(s for s in reversed(related_errors) if s)
-            for rel_err in related_errors:
-                errors.append(rel_err)
-                if rel_err == last_err:
-                    break
+        if moved_objects and not related_errors:
+            moved_objects.sort(key=lambda related_instance: related_instance.pk)
+            self._get_write_queryset(related_model).bulk_update(moved_objects, [order_field])
+            self.record_nested_change(relation_path, "updated", *moved_objects)
 
-    def _manage_one_to_many_child(self, instance, child, child_serializer, child_model, relation_name):
+        # The counters are written once the parent is done, after the nested writes of the related objects
+        if counter_field and not related_errors:
+            for previous_parent_pk in previous_parent_pks:
+                self.add_counter_delta(type(instance), previous_parent_pk, counter_field, -1)
+            self.add_counter_delta(
+                type(instance), instance.pk, counter_field, created_count - released_count, instance=instance
+            )
+
+    def _manage_one_to_many_child(
+        self, instance, child, child_serializer, child_model, relation_name, child_instance=None
+    ):
         """
         Outsourced update/creation of the child object to allow for custom behaviour in certain Serializers,
         e.g. SubTemplateGroupSerializer(special behaviour for nested bulk management of TemplateGroups within a
@@ -147,19 +1546,21 @@ class BaseNestedSerializer(serializers.ModelSerializer):
         :param child_serializer:
         :param child_model:
         :param relation_name:
-        :param inverse_relation_name:
+        :param child_instance: prefetched existing child object, looked up by pk if not given
         :return:
         """
         if "pk" not in child:
-            child_instance = child_serializer.create(validated_data=child)
+            child_instance = self._create_related_object(child_serializer, child)
             getattr(instance, relation_name).add(child_instance)
+        elif child_instance is not None:
+            self._update_related_object(child_serializer, child_instance, child)
         else:
             try:
                 child_instance = getattr(instance, relation_name).get(pk=child["pk"])
-                child_serializer.update(instance=child_instance, validated_data=child)
+                self._update_related_object(child_serializer, child_instance, child)
             except child_model.DoesNotExist:
                 child.pop("pk")
-                child_instance = child_serializer.create(validated_data=child)
+                child_instance = self._create_related_object(child_serializer, child)
                 getattr(instance, relation_name).add(child_instance)
 
     def _manage_many_to_one_assignment(self, related_object, related_model=None, related_serializer=None, errors=None):
@@ -180,23 +1581,16 @@ class BaseNestedSerializer(serializers.ModelSerializer):
         try:
             if related_serializer:
                 if "pk" not in related_object:
-                    related_instance = related_serializer.create(
-                        validated_data=related_object
-                    )
+                    related_instance = self._create_related_object(related_serializer, related_object)
                 else:
                     try:
-                        related_object_instance = related_model.objects.get(
-                            pk=related_object["pk"]
-                        )
-                        related_instance = related_serializer.update(
-                            instance=related_object_instance,
-                            validated_data=related_object,
+                        related_object_instance = self._get_related_instance(related_model, related_object["pk"])
+                        related_instance = self._update_related_object(
+                            related_serializer, related_object_instance, related_object
                         )
                     except related_model.DoesNotExist:
                         related_object.pop("pk")
-                        related_instance = related_serializer.create(
-                            validated_data=related_object
-                        )
+                        related_instance = self._create_related_object(related_serializer, related_object)
         except CoreValidationError as e:
             if hasattr(e, "message_dict"):
                 errors.append(e.message_dict)
@@ -226,6 +1620,7 @@ class BaseNestedSerializer(serializers.ModelSerializer):
         intermediate_relation_name=None,
         intermediate_inverse_relation_name=None,
         errors=None,
+        partial=False,
     ):
         """
         Update previous relations (set null/blank or delete unwanted, depending on the related model.field definition),
@@ -237,11 +1632,18 @@ class BaseNestedSerializer(serializers.ModelSerializer):
         :param intermediate_relation_name:
         :param intermediate_inverse_relation_name:
         :param errors:
+        :param partial: keep related objects not specified in the request, only remove the marked ones
         :return:
         """
         if errors is None:
             errors = []
 
+        relation_path = get_serializer_path(related_serializer)
+
+        # Split the removal markers from the related objects to be kept
+        removed_pks = [related_object["pk"] for related_object in related_objects if is_removal(related_object)]
+        related_objects = [related_object for related_object in related_objects if not is_removal(related_object)]
+
         # Get common assignments (existing and still wanted related objects)
         related_object_pks = []
         for related_object in related_objects:
@@ -255,110 +1657,104 @@ class BaseNestedSerializer(serializers.ModelSerializer):
             if field.name == intermediate_inverse_relation_name
         ][0]
 
-        if inverse_field.null:
+        queryset = self._get_write_queryset(related_model).filter(**{intermediate_inverse_relation_name: instance})
+
+        # Lock the existing intermediate objects in pk order before releasing or updating any of them
+        if self.get_root_option("nested_select_for_update", False):
+            if partial:
+                self._prefetch_related_objects(queryset.filter(pk__in=related_object_pks + removed_pks))
+            else:
+                self._prefetch_related_objects(queryset)
+
+        if partial:
+            # only the related objects marked for removal are released, skip the scan for orphans
+            queryset = queryset.filter(pk__in=removed_pks)
+        else:
+            queryset = queryset.exclude(pk__in=related_object_pks)
+
+        if partial and not removed_pks:
+            # nothing to release, the related objects not specified in the request are kept
+            pass
+        elif inverse_field.null:
             # unset (set null) the inverse relation to all currently related_objects
             # not supposed to be kept (not specified in the request)
-            related_model.objects.filter(
-                **{intermediate_inverse_relation_name: instance}
-            ).exclude(pk__in=related_object_pks).update(
-                **{intermediate_inverse_relation_name: None}
-            )
+            self._record_released(queryset, relation_path, "unlinked")
+            queryset.update(**{intermediate_inverse_relation_name: None})
         elif inverse_field.blank:
             # unset (set blank) the inverse relation to all currently related_objects
             # not supposed to be kept (not specified in the request)
-            related_model.objects.filter(
-                **{intermediate_inverse_relation_name: instance}
-            ).exclude(pk__in=related_object_pks).update(
-                **{intermediate_inverse_relation_name: ""}
-            )
+            self._record_released(queryset, relation_path, "unlinked")
+            queryset.update(**{intermediate_inverse_relation_name: ""})
         else:
             # delete all currently related_objects
             # not supposed to be kept (not specified in the request)
-            related_model.objects.filter(
-                **{intermediate_inverse_relation_name: instance}
-            ).exclude(pk__in=related_object_pks).delete()
+            self._record_released(queryset, relation_path, "deleted")
+            queryset.delete()
+
+        # Insert the new related objects of a plain model serializer at once
+        inserted_indices = self._insert_related_objects(
+            related_serializer,
+            related_model,
+            {
+                index: dict(related_object, **{inverse_relation_name: instance})
+                for index, related_object in enumerate(related_objects)
+                if index not in skipped_indices and isinstance(related_object, dict) and "pk" not in related_object
+            },
+        )
+        if inserted_indices:
+            skipped_indices.update(inserted_indices)
+            # the related objects prefetched for the parent are stale
+            getattr(instance, "_prefetched_objects_cache", {}).pop(relation_name, None)
 
         # Set the new relations (create if not exist yet)
         # TODO: make unittest to prove and explain behaviour!
-        related_errors = []
-        related_error_found = False
-        for related_object in related_objects:
-            try:
-                related_object[intermediate_inverse_relation_name] = instance
+        def write_related_object(index):
+            # work on a copy, the entry is written again if its batch is rolled back
+            related_object = dict(related_objects[index])
+            related_object[intermediate_inverse_relation_name] = instance
 
-                if "pk" in related_object:
-                    existing = related_model.objects.filter(
-                        pk=related_object["pk"]
-                    ).exists()
-                else:
-                    existing = related_model.objects.filter(
-                        **{
-                            intermediate_relation_name: related_object[
-                                intermediate_relation_name
-                            ],
-                            intermediate_inverse_relation_name: related_object[
-                                intermediate_inverse_relation_name
-                            ],
-                        }
-                    ).exists()
-
-                if not existing:
-                    related_object_instance = related_model.objects.create(
-                        **related_object
-                    )
-                else:
-                    try:
-                        if "pk" in related_object:
-                            related_object_instance = related_model.objects.get(
-                                pk=related_object["pk"]
-                            )
-                        else:
-                            related_object_instance = related_model.objects.filter(
-                                **{
-                                    intermediate_relation_name: related_object[
-                                        intermediate_relation_name
-                                    ],
-                                    intermediate_inverse_relation_name: instance,
-                                }
-                            ).first()
-
-                        related_serializer.update(
-                            instance=related_object_instance,
-                            validated_data=related_object,
+            if "pk" in related_object:
+                existing = self._get_write_queryset(related_model).filter(
+                    pk=related_object["pk"]
+                ).exists()
+            else:
+                existing = self._get_write_queryset(related_model).filter(
+                    **{
+                        intermediate_relation_name: related_object[
+                            intermediate_relation_name
+                        ],
+                        intermediate_inverse_relation_name: related_object[
+                            intermediate_inverse_relation_name
+                        ],
+                    }
+                ).exists()
+
+            if not existing:
+                related_instance = self._get_write_queryset(related_model).create(**related_object)
+                self.record_nested_change(relation_path, "created", related_instance)
+            else:
+                try:
+                    if "pk" in related_object:
+                        related_object_instance = self._get_write_queryset(related_model).get(
+                            pk=related_object["pk"]
                         )
-                    except related_model.DoesNotExist:
-                        related_object.pop("pk")
-                        related_serializer.create(validated_data=related_object)
-
-                related_errors.append({})
-            except CoreValidationError as e:
-                if hasattr(e, "message_dict"):
-                    related_errors.append(e.message_dict)
-                    related_error_found = True
-                else:
-                    raise e
-            except ValidationError as e:
-                if hasattr(e, "detail"):
-                    related_errors.append(e.detail)
-                    related_error_found = True
-                else:
-                    raise e
-            except Exception as e:
-                if hasattr(e, "message_dict"):
-                    related_errors.append(e.message_dict)
-                    related_error_found = True
-                elif hasattr(e, "detail"):
-                    related_errors.append(e.detail)
-                    related_error_found = True
-                else:
-                    raise e
-
-        if related_error_found:
-            last_err = next(s for s in reversed(related_errors) if s)
-            for rel_err in related_errors:
-                errors.append(rel_err)
-                if rel_err == last_err:
-                    break
+                    else:
+                        related_object_instance = self._get_write_queryset(related_model).filter(
+                            **{
+                                intermediate_relation_name: related_object[
+                                    intermediate_relation_name
+                                ],
+                                intermediate_inverse_relation_name: instance,
+                            }
+                        ).first()
+
+                    self._update_related_object(related_serializer, related_object_instance, related_object)
+                except related_model.DoesNotExist:
+                    related_object.pop("pk")
+                    self._create_related_object(related_serializer, related_object)
+
+        related_errors = self._run_in_batches(self._get_write_order(related_objects), write_related_object)
+        self._add_relation_errors(errors, related_errors)
 
     def _manage_one_to_one_assignment(
         self,
@@ -390,41 +1786,26 @@ class BaseNestedSerializer(serializers.ModelSerializer):
             if field.name == inverse_relation_name
         ][0]
 
+        queryset = self._get_write_queryset(related_model).filter(**{inverse_relation_name: instance})
+        if related_object and "pk" in related_object:
+            queryset = queryset.exclude(pk=related_object["pk"])
+        relation_path = get_serializer_path(related_serializer) if related_serializer else ""
+
         if inverse_field.null:
             # unset (set null) the inverse relation to the currently related_object
             # not supposed to be kept (not specified in the request)
-            if related_object and "pk" in related_object:
-                related_model.objects.filter(
-                    **{inverse_relation_name: instance}
-                ).exclude(pk=related_object["pk"]).update(
-                    **{inverse_relation_name: None}
-                )
-            else:
-                related_model.objects.filter(
-                    **{inverse_relation_name: instance}
-                ).update(**{inverse_relation_name: None})
+            self._record_released(queryset, relation_path, "unlinked")
+            queryset.update(**{inverse_relation_name: None})
         elif inverse_field.blank:
             # unset (set blank) the inverse relation to the currently related_object
             # not supposed to be kept (not specified in the request)
-            if related_object and "pk" in related_object:
-                related_model.objects.filter(
-                    **{inverse_relation_name: instance}
-                ).exclude(pk=related_object["pk"]).update(**{inverse_relation_name: ""})
-            else:
-                related_model.objects.filter(
-                    **{inverse_relation_name: instance}
-                ).update(**{inverse_relation_name: ""})
+            self._record_released(queryset, relation_path, "unlinked")
+            queryset.update(**{inverse_relation_name: ""})
         else:
             # delete the currently related_object
             # not supposed to be kept (not specified in the request)
-            if not related_object or "pk" not in related_object:
-                related_model.objects.filter(
-                    **{inverse_relation_name: instance}
-                ).delete()
-            else:
-                related_model.objects.filter(
-                    **{inverse_relation_name: instance}
-                ).exclude(pk=related_object["pk"]).delete()
+            self._record_released(queryset, relation_path, "deleted")
+            queryset.delete()
 
         # Set the new relation (create if not exists yet)
         # TODO: make unittest to prove and explain behaviour!
@@ -435,20 +1816,17 @@ class BaseNestedSerializer(serializers.ModelSerializer):
             if related_serializer:
                 try:
                     if "pk" not in related_object:
-                        related_serializer.create(validated_data=related_object)
+                        self._create_related_object(related_serializer, related_object)
                     else:
                         try:
-                            related_object_instance = related_model.objects.get(
+                            related_object_instance = self._get_write_queryset(related_model).get(
                                 pk=related_object["pk"],
                                 **{inverse_relation_name: instance}
                             )
-                            related_serializer.update(
-                                instance=related_object_instance,
-                                validated_data=related_object,
-                            )
+                            self._update_related_object(related_serializer, related_object_instance, related_object)
                         except related_model.DoesNotExist:
                             related_object.pop("pk")
-                            related_serializer.create(validated_data=related_object)
+                            self._create_related_object(related_serializer, related_object)
                 except CoreValidationError as e:
                     if hasattr(e, "message_dict"):
                         errors.update(e.message_dict)
@@ -510,8 +1888,8 @@ class BaseNestedSerializer(serializers.ModelSerializer):
                 raise ValidationError(errors, code="invalid")
 
     def process_one_to_many_fields(self, instance, one_to_many_fields, errors):
-        relation_errors = []
         for relation_name, related_objects in one_to_many_fields.items():
+            relation_errors = {}
             related_model = getattr(self.Meta.model, relation_name).rel.related_model
             related_serializer = None
             if hasattr(self.fields[relation_name], "child"):
@@ -527,14 +1905,108 @@ class BaseNestedSerializer(serializers.ModelSerializer):
                 relation_name=relation_name,
                 inverse_relation_name=inverse_relation_name,
                 errors=relation_errors,
+                partial=self.is_partial_relation(relation_name),
             )
 
             if relation_errors:
-                errors[relation_name] = relation_errors
+                errors[relation_name] = self.format_relation_errors(relation_errors)
+                self._check_fail_fast(errors)
+
+    def process_streamed_fields(self, instance, errors):
+        """
+        Validate and write the streamed one to many relations of a StreamedObject in chunks of
+        `Meta.nested_stream_chunk_size` entries, so only a single chunk of the relation is held in memory.
+        Once an error is found, the remaining chunks are only validated.
+        """
+        streamed_data = getattr(self, "_streamed_data", None)
+        if streamed_data is None:
+            return
+        self._streamed_data = None
+
+        chunk_size = getattr(self.Meta, "nested_stream_chunk_size", DEFAULT_STREAM_CHUNK_SIZE)
+        identity_map = getattr(self.root, "_nested_identity_map", None)
+
+        for relation_name, related_objects in streamed_data.iter_streams():
+            relation_errors = {}
+            related_model = getattr(self.Meta.model, relation_name).rel.related_model
+            related_list_serializer = self.fields[relation_name]
+            inverse_relation_name = getattr(
+                self.Meta.model, relation_name
+            ).rel.remote_field.name
+
+            # Related objects not specified in the request are removed after the last chunk (full replacement)
+            remaining_pks = None
+            if not self.is_partial_relation(relation_name):
+                remaining_pks = set(
+                    self._get_write_queryset(related_model).filter(
+                        **{inverse_relation_name: instance}
+                    ).values_list("pk", flat=True)
+                )
+
+            offset = 0
+            # position of the first kept object of the chunk
+            position_offset = 0
+            for chunk in chunked(related_objects, chunk_size):
+                chunk_errors = {}
+                savepoint = identity_map.savepoint() if identity_map is not None else None
+                try:
+                    kept_objects, removed_pks = self._split_removals(relation_name, chunk)
+                    validated_objects = related_list_serializer.run_validation(kept_objects)
+                except ValidationError as e:
+                    chunk_errors = sparse_errors(e.detail)
+                else:
+                    if not relation_errors:
+                        validated_objects = self._match_lookup_fields(
+                            relation_name,
+                            validated_objects,
+                            self._get_write_queryset(related_model).filter(**{inverse_relation_name: instance}),
+                        )
+                        validated_objects += [{"pk": pk, DELETE_MARKER: True} for pk in removed_pks]
+                        if remaining_pks is not None:
+                            remaining_pks.difference_update(
+                                related_object["pk"] for related_object in validated_objects if "pk" in related_object
+                            )
+
+                        self._manage_one_to_many_assignment(
+                            instance,
+                            validated_objects,
+                            related_model=related_model,
+                            related_serializer=related_list_serializer.child,
+                            relation_name=relation_name,
+                            inverse_relation_name=inverse_relation_name,
+                            errors=chunk_errors,
+                            partial=True,
+                            position_offset=position_offset,
+                        )
+                        position_offset += len(kept_objects)
+                        # the written objects of the chunk are not kept until the end of the nested write
+                        if identity_map is not None:
+                            identity_map.evict(savepoint)
+
+                relation_errors.update((offset + index, error) for index, error in chunk_errors.items())
+                offset += len(chunk)
+                if relation_errors and self.is_fail_fast():
+                    # the remaining chunks are not read
+                    break
+
+            if remaining_pks and not relation_errors:
+                self._manage_one_to_many_assignment(
+                    instance,
+                    [{"pk": pk, DELETE_MARKER: True} for pk in remaining_pks],
+                    related_model=related_model,
+                    related_serializer=related_list_serializer.child,
+                    relation_name=relation_name,
+                    inverse_relation_name=inverse_relation_name,
+                    partial=True,
+                )
+
+            if relation_errors:
+                errors[relation_name] = self.format_relation_errors(relation_errors)
+                self._check_fail_fast(errors)
 
     def process_many_to_many_through_fields(self, instance, many_to_many_through_fields, errors):
-        relation_errors = []
         for relation_name, related_objects in many_to_many_through_fields.items():
+            relation_errors = {}
             model_meta = getattr(self.Meta.model, relation_name)
             related_model = model_meta.rel.related_model
             related_field = model_meta.field
@@ -554,37 +2026,66 @@ class BaseNestedSerializer(serializers.ModelSerializer):
                 intermediate_relation_name=intermediate_relation_name,
                 intermediate_inverse_relation_name=intermediate_inverse_relation_name,
                 errors=relation_errors,
+                partial=self.is_partial_relation(relation_name),
             )
 
             if relation_errors:
-                errors[relation_name] = relation_errors
+                errors[relation_name] = self.format_relation_errors(relation_errors)
+                self._check_fail_fast(errors)
 
     def process_many_to_many_direct_fields(self, instance, many_to_many_direct_fields, errors):
-        relation_errors = []
-
         for relation_name, related_objects in many_to_many_direct_fields.items():
             if hasattr(self.fields[relation_name], "child"):
                 model_meta = getattr(self.Meta.model, relation_name)
                 related_model = model_meta.rel.model
                 related_serializer = self.fields[relation_name].child
-                added_objects = []
-                assigned_pks = []
-                for related_object in related_objects:
+                removed_pks = [related_object['pk'] for related_object in related_objects if is_removal(related_object)]
+                related_objects = [
+                    related_object for related_object in related_objects if not is_removal(related_object)
+                ]
+                # Match related objects without pk on `Meta.nested_lookup_fields`, within the linked objects
+                related_objects = self._match_lookup_fields(
+                    relation_name, related_objects, getattr(instance, relation_name).all()
+                )
+                written_objects = {}
+
+                # Prefetch (and lock) the referenced objects, they might be shared with concurrent nested writes
+                existing_objects = self._get_related_instances(
+                    related_model,
+                    [related_object['pk'] for related_object in related_objects if 'pk' in related_object],
+                )
+
+                def write_related_object(index):
+                    # work on a copy, the entry is written again if its batch is rolled back
+                    related_object = dict(related_objects[index])
                     if 'pk' in related_object:
                         # ToDo: Add meta parameter to select the behavior for non existing pk
                         # Option 1: Raise exception
                         # Option 2: Add as new object
-                        related_serializer.update(
-                            instance=related_model.objects.get(pk=related_object['pk']),
-                            validated_data=related_object
+                        if related_object['pk'] not in existing_objects:
+                            raise related_model.DoesNotExist(
+                                "{} matching query does not exist.".format(related_model._meta.object_name)
+                            )
+                        written_objects[index] = self._update_related_object(
+                            related_serializer, existing_objects[related_object['pk']], related_object
                         )
-                        assigned_pks.append(related_object['pk'])
                     else:
-                        obj = related_serializer.__class__(data=related_object)
-                        obj.is_valid()
-                        new_object = obj.save()
-                        added_objects.append(new_object)
-                        assigned_pks.append(new_object.pk)
+                        written_objects[index] = self._create_related_object(related_serializer, related_object)
+
+                related_errors = self._run_in_batches(self._get_write_order(related_objects), write_related_object)
+                if related_errors:
+                    errors[relation_name] = self.format_relation_errors(related_errors)
+                    self._check_fail_fast(errors)
+                    continue
+
+                assigned_pks = [written_objects[index].pk for index in range(len(related_objects))]
+                added_objects = sorted(
+                    (
+                        written_objects[index] for index in range(len(related_objects))
+                        if 'pk' not in related_objects[index]
+                    ),
+                    key=lambda related_object: related_object.pk,
+                )
 
                 # Add newly created objects to original instance
                 getattr(instance, relation_name).add(*added_objects)
@@ -592,12 +2093,18 @@ class BaseNestedSerializer(serializers.ModelSerializer):
                 # ToDo: Add meta parameter to select the behavior for removing items
                 # Option 1: Remove m2m relation
                 # Option 2: Remove m2m relation and related object
-                getattr(instance, relation_name).remove(
-                    *list(getattr(instance, relation_name).exclude(pk__in=assigned_pks))
-                )
-
-        if relation_errors:
-            errors[relation_name] = relation_errors
+                relation_path = get_serializer_path(related_serializer)
+                if self.is_partial_relation(relation_name):
+                    # only the related objects marked for removal are released
+                    if removed_pks:
+                        self._record_released(
+                            getattr(instance, relation_name).filter(pk__in=removed_pks), relation_path, "unlinked"
+                        )
+                        getattr(instance, relation_name).remove(*removed_pks)
+                else:
+                    released_objects = list(getattr(instance, relation_name).exclude(pk__in=assigned_pks))
+                    self.record_nested_change(relation_path, "unlinked", *released_objects)
+                    getattr(instance, relation_name).remove(*released_objects)
 
     def process_one_to_one_fields(self, instance, one_to_one_fields, errors):
         for relation_name, related_object in one_to_one_fields.items():
@@ -620,6 +2127,7 @@ class BaseNestedSerializer(serializers.ModelSerializer):
 
             if relation_errors:
                 errors[relation_name] = relation_errors
+                self._check_fail_fast(errors)
 
     def extract_relation_data(self, validated_data):
         """
@@ -660,14 +2168,160 @@ class BaseNestedSerializer(serializers.ModelSerializer):
 
         return ralations
 
+    def is_nested_write(self):
+        """
+        Check if the serializer writes within the nested write of a parent serializer
+        """
+        return getattr(self.root, "_nested_write_active", False)
+
     def manage_assignments(self, validated_data, instance=None):
         """
-        Remove the related data from validated_data and handle it separately
+        Remove the related data from validated_data and handle it separately.
+        The whole nested write runs in a single atomic block on the write alias (see `get_write_alias`), nothing is
+        stored if any related object fails. Serialization failures and deadlocks are retried up to
+        `Meta.nested_retry_attempts` times with jittered exponential backoff, the number of retries is counted in
+        `nested_write_stats`. `nested_write_completed` is sent once the nested write is done.
 
         :param validated_data:
         :param instance:
         :return:
         """
+        if self.is_nested_write():
+            return self._manage_assignments(validated_data, instance)
+
+        retry_attempts = getattr(self.Meta, "nested_retry_attempts", 0)
+        retry_backoff = getattr(self.Meta, "nested_retry_backoff", DEFAULT_RETRY_BACKOFF)
+        retry_max_backoff = getattr(self.Meta, "nested_retry_max_backoff", DEFAULT_RETRY_MAX_BACKOFF)
+
+        alias = self.get_write_alias(instance)
+
+        # The write can only be repeated if it runs its own transaction, an outer transaction is aborted anyway.
+        # Streamed relations are consumed by the first attempt.
+        if transaction.get_connection(alias).in_atomic_block or getattr(self, "_streamed_data", None) is not None:
+            retry_attempts = 0
+
+        self.nested_write_stats = {"retries": 0}
+        created = instance is None
+        while True:
+            self._begin_nested_write(alias)
+            try:
+                with transaction.atomic(using=alias):
+                    instance = self._manage_assignments(validated_data, instance)
+                    self.record_nested_change("", "created" if created else "updated", instance)
+                    self.bump_shared_versions(instance)
+                    self.write_snapshot(instance)
+                break
+            except DatabaseError as e:
+                retry = self.nested_write_stats["retries"]
+                if retry >= retry_attempts or not is_retryable_error(e):
+                    raise e
+            finally:
+                changes = self._end_nested_write()
+
+            time.sleep(get_retry_delay(retry, retry_backoff, retry_max_backoff))
+            self.nested_write_stats["retries"] += 1
+
+        self._send_nested_write_completed(instance, created, changes)
+        return instance
+
+    def _begin_nested_write(self, alias):
+        self.root._nested_write_active = True
+        self.root._nested_write_alias = alias
+        self.root._nested_identity_map = IdentityMap()
+        self.root._nested_counter_deltas = {}
+        # changes are only collected for the receivers of nested_write_completed
+        self.root._nested_write_changes = {} if nested_write_completed.has_listeners(type(self)) else None
+        self.root._nested_written_rows = {} if self.has_versioned_serializers() else None
+
+    def _end_nested_write(self):
+        changes = self.root._nested_write_changes
+        self.root._nested_write_active = False
+        self.root._nested_write_alias = None
+        self.root._nested_write_changes = None
+        self.root._nested_written_rows = None
+        self.root._nested_identity_map = None
+        self.root._nested_counter_deltas = None
+        return changes
+
+    def _send_nested_write_completed(self, instance, created, changes):
+        if changes is not None:
+            nested_write_completed.send(
+                sender=type(self), serializer=self, instance=instance, created=created, summary=changes
+            )
+
+    def plan(self):
+        """
+        Compute the changeset of the nested write for the validated data against the current database state without
+        writing anything. The related objects are loaded with a few bulk queries per relation and tree level.
+        `plan.summary()` counts the created, updated, unlinked and deleted objects per relation path.
+        :return: NestedWritePlan to be executed with `apply(plan)`
+        """
+        # imported here, the plans module builds on this module
+        from .plans import NestedWritePlan, build_plans
+
+        assert hasattr(self, "_validated_data"), "You must call `.is_valid()` before calling `.plan()`."
+        assert getattr(self, "_streamed_data", None) is None, "Streamed relations cannot be planned."
+
+        write_plan = NestedWritePlan(self, dict(self.validated_data), self.instance)
+        write_plan.using = self.get_write_alias(self.instance)
+        build_plans([write_plan], self.get_read_alias() or write_plan.using)
+        return write_plan
+
+    def apply(self, plan):
+        """
+        Execute a plan computed by `plan()` in a single atomic block. Objects of serializers without custom
+        create/update methods are written with bulk operations.
+        :param plan:
+        :return: the created or updated instance
+        """
+        from .plans import apply_plans, iter_object_plans
+
+        created = plan.instance is None
+        self._begin_nested_write(plan.using)
+        try:
+            with transaction.atomic(using=plan.using):
+                apply_plans([plan], plan.using)
+                for object_plan in iter_object_plans(plan):
+                    if isinstance(object_plan.serializer, BaseNestedSerializer):
+                        object_plan.serializer.bump_version(object_plan.instance)
+                self.update_counter_fields()
+                self.bump_shared_versions(plan.instance)
+                self.write_snapshot(plan.instance)
+        finally:
+            changes = self._end_nested_write()
+
+        self.instance = plan.instance
+        self._send_nested_write_completed(self.instance, created, changes)
+        return self.instance
+
+    async def amanage_assignments(self, validated_data, instance=None):
+        """
+        Async counterpart of `manage_assignments`. Django transactions are not available in async code, so the whole
+        atomic nested write runs in a single hop on the thread of the sync ORM instead of a hop per query.
+
+        :param validated_data:
+        :param instance:
+        :return:
+        """
+        return await self._run_async(self.manage_assignments, validated_data, instance)
+
+    async def asave(self, **kwargs):
+        """
+        Async counterpart of `save`, create/update methods of subclasses are used as they are
+        :param kwargs:
+        :return:
+        """
+        return await self._run_async(self.save, **kwargs)
+
+    @staticmethod
+    async def _run_async(method, *args, **kwargs):
+        if sync_to_async is None:
+            raise ImproperlyConfigured("Async nested writes require asgiref.")
+        return await sync_to_async(method, thread_sensitive=True)(*args, **kwargs)
+
+    def _manage_assignments(self, validated_data, instance=None):
+        # work on a copy, the related data is removed and the write might be repeated for a rolled back batch
+        validated_data = dict(validated_data)
         errors = {}
         relations = self.extract_relation_data(validated_data)
 
@@ -676,18 +2330,23 @@ class BaseNestedSerializer(serializers.ModelSerializer):
 
         # Store Instance
         if instance:
+            self.defer_aggregated_fields(instance, validated_data)
             instance = super().update(instance, validated_data)
         else:
-            instance = super().create(validated_data)
+            instance = self._create_instance(validated_data)
 
         # Fields to be processed after the instance
         self.process_one_to_many_fields(instance, relations['one_to_many_fields'], errors)
         self.process_many_to_many_through_fields(instance, relations['many_to_many_through_fields'], errors)
         self.process_many_to_many_direct_fields(instance, relations['many_to_many_direct_fields'], errors)
         self.process_one_to_one_fields(instance, relations['one_to_one_fields'], errors)
+        self.process_streamed_fields(instance, errors)
 
         if errors:
             raise ValidationError(errors, code="invalid")
+
+        self.bump_version(instance)
+        self.update_counter_fields()
         return instance
 
 
@@ -700,6 +2359,14 @@ class NestedCreateSerializer(BaseNestedSerializer):
         """
         return self.manage_assignments(validated_data)
 
+    async def acreate(self, validated_data):
+        """
+        Async counterpart of create
+        :param validated_data:
+        :return:
+        """
+        return await self._run_async(self.create, validated_data)
+
 
 class NestedUpdateSerializer(BaseNestedSerializer):
     def update(self, instance, validated_data):
@@ -712,6 +2379,16 @@ class NestedUpdateSerializer(BaseNestedSerializer):
         """
         return self.manage_assignments(validated_data, instance)
 
+    async def aupdate(self, instance, validated_data):
+        """
+        Async counterpart of update
+
+        :param instance:
+        :param validated_data:
+        :return:
+        """
+        return await self._run_async(self.update, instance, validated_data)
+
 
 class NestedSerializer(NestedCreateSerializer, NestedUpdateSerializer, serializers.ModelSerializer):
     pass
@@ -0,0 +1,13 @@
+from django.dispatch import Signal
+
+
+__all__ = [
+    "nested_write_completed",
+]
+
+
+# Sent once per top-level nested write (save or apply) after all related objects are written.
+# Arguments: sender (root serializer class), serializer, instance, created and summary, a dict of
+# {relation path: {"model": model, "created": pks, "updated": pks, "unlinked": pks, "deleted": pks}}.
+# The root object is listed under the relation path "".
+nested_write_completed = Signal()
@@ -0,0 +1,250 @@
+from collections import defaultdict
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import AutoField, FileField, IntegerField, ManyToManyField, ManyToManyRel, ManyToOneRel
+from django.db.models.manager import BaseManager
+from django.db.models.query import ModelIterable, QuerySet
+from rest_framework import fields, relations, serializers
+from rest_framework.relations import Hyperlink
+
+from .representation import SCALAR_CONVERSIONS, get_model_attribute, get_url_parts
+from .serializers import BaseNestedSerializer, chunked
+
+
+__all__ = [
+    "NestedValuesListSerializer",
+]
+
+
+# primary keys per `__in` lookup when the related objects of a level are queried
+VALUES_LOOKUP_CHUNK_SIZE = 500
+
+VALUE = "value"
+URL = "url"
+MANY = "many"
+
+
+class ValuesNotSupported(Exception):
+    pass
+
+
+class ValuesPlan:
+    """
+    Columns read with `values()` for the objects of a serializer and the steps building its output from a row
+    """
+
+    def __init__(self, serializer):
+        self.model = serializer.Meta.model
+        self.columns = ["pk"]
+        # (field_name, kind, arguments) for every readable field
+        self.steps = []
+
+    def add_column(self, column):
+        if column not in self.columns:
+            self.columns.append(column)
+
+
+def get_child_serializer(field):
+    """
+    Get the child of a nested list serializer that can be read with `values()`
+    """
+    if not isinstance(field, serializers.ListSerializer):
+        raise ValuesNotSupported()
+    child = field.child
+    if (
+        type(field).to_representation is not serializers.ListSerializer.to_representation
+        or not isinstance(child, serializers.ModelSerializer)
+        or type(child).to_representation not in (
+            serializers.Serializer.to_representation, BaseNestedSerializer.to_representation
+        )
+    ):
+        raise ValuesNotSupported()
+    return child
+
+
+def get_relation(model, field):
+    """
+    Describe the relation a nested list serializer reads
+    :return: ("reverse", related model, foreign key attname) or ("m2m", related model, through model, source attname,
+        target attname)
+    """
+    if len(field.source_attrs) != 1:
+        raise ValuesNotSupported()
+    try:
+        model_field = model._meta.get_field(field.source_attrs[0])
+    except FieldDoesNotExist:
+        raise ValuesNotSupported()
+
+    if isinstance(model_field, ManyToOneRel) and not model_field.one_to_one:
+        return "reverse", model_field.related_model, model_field.field.attname
+    if isinstance(model_field, ManyToManyField):
+        through = model_field.remote_field.through
+        return (
+            "m2m",
+            model_field.related_model,
+            through,
+            through._meta.get_field(model_field.m2m_field_name()).attname,
+            through._meta.get_field(model_field.m2m_reverse_field_name()).attname,
+        )
+    if isinstance(model_field, ManyToManyRel):
+        through = model_field.through
+        remote_field = model_field.remote_field
+        return (
+            "m2m",
+            model_field.related_model,
+            through,
+            through._meta.get_field(remote_field.m2m_reverse_field_name()).attname,
+            through._meta.get_field(remote_field.m2m_field_name()).attname,
+        )
+    raise ValuesNotSupported()
+
+
+def build_values_plan(serializer, plans):
+    """
+    Build the values plan of a serializer and its nested list serializers, once per serializer class (the fields of
+    recursive serializers are the same on every level)
+    :param serializer:
+    :param plans: dict of the plans by serializer class
+    :return: ValuesPlan
+    :raise ValuesNotSupported: if a field cannot be built from a row
+    """
+    serializer_class = type(serializer)
+    if serializer_class in plans:
+        return plans[serializer_class]
+    plan = plans[serializer_class] = ValuesPlan(serializer)
+
+    for field in serializer._readable_fields:
+        if isinstance(field, serializers.BaseSerializer):
+            child = get_child_serializer(field)
+            relation = get_relation(plan.model, field)
+            plan.steps.append((field.field_name, MANY, (relation, build_values_plan(child, plans))))
+        elif isinstance(field, relations.HyperlinkedIdentityField):
+            plan.steps.append((field.field_name, URL, get_url_step(plan, field)))
+        else:
+            plan.steps.append((field.field_name, VALUE, get_value_step(plan, serializer, field)))
+    return plan
+
+
+def get_value_step(plan, serializer, field):
+    if isinstance(field, relations.PrimaryKeyRelatedField):
+        if (
+            type(field).to_representation is not relations.PrimaryKeyRelatedField.to_representation
+            or type(field).get_attribute is not relations.RelatedField.get_attribute
+            or field.pk_field is not None
+        ):
+            raise ValuesNotSupported()
+        convert = None
+    elif (
+        isinstance(field, (relations.RelatedField, fields.FileField))
+        or type(field).get_attribute is not fields.Field.get_attribute
+    ):
+        raise ValuesNotSupported()
+    else:
+        convert = SCALAR_CONVERSIONS.get(type(field).to_representation, field.to_representation)
+
+    column = get_model_attribute(serializer, field)
+    if column is None:
+        raise ValuesNotSupported()
+    # the attribute of file fields is a file object with url and storage, values() only returns its name
+    if column != "pk" and isinstance(plan.model._meta.get_field(column), FileField):
+        raise ValuesNotSupported()
+    plan.add_column(column)
+    return column, convert
+
+
+def get_url_step(plan, field):
+    if (
+        type(field).to_representation is not relations.HyperlinkedRelatedField.to_representation
+        or type(field).get_url is not relations.HyperlinkedRelatedField.get_url
+        or "request" not in field.context
+    ):
+        raise ValuesNotSupported()
+    lookup_field = plan.model._meta.pk if field.lookup_field == "pk" else plan.model._meta.get_field(field.lookup_field)
+    if not isinstance(lookup_field, (AutoField, IntegerField)):
+        raise ValuesNotSupported()
+
+    url_parts = get_url_parts(field)
+    if url_parts is None:
+        raise ValuesNotSupported()
+    column = "pk" if field.lookup_field == "pk" else lookup_field.attname
+    plan.add_column(column)
+    return column, url_parts
+
+
+def fetch_related_rows(queryset, lookup, pks, columns):
+    rows = []
+    for chunk in chunked(pks, VALUES_LOOKUP_CHUNK_SIZE):
+        rows.extend(queryset.filter(**{lookup + "__in": chunk}).values(*columns))
+    return rows
+
+
+def represent_rows(plan, rows):
+    """
+    Build the output of the rows of a level, the related rows of the next level are queried for all rows at once
+    """
+    nested = {}
+    pks = [row["pk"] for row in rows]
+
+    for field_name, kind, arguments in plan.steps:
+        if kind != MANY or not pks:
+            continue
+        relation, child_plan = arguments
+        related_manager = relation[1]._default_manager
+        by_parent = defaultdict(list)
+
+        if relation[0] == "reverse":
+            foreign_key = relation[2]
+            columns = child_plan.columns + ([] if foreign_key in child_plan.columns else [foreign_key])
+            child_rows = fetch_related_rows(related_manager.all(), foreign_key, pks, columns)
+            for child_row, child_data in zip(child_rows, represent_rows(child_plan, child_rows)):
+                by_parent[child_row[foreign_key]].append(child_data)
+        else:
+            through, source, target = relation[2], relation[3], relation[4]
+            parents_by_target = defaultdict(list)
+            for link in fetch_related_rows(through._default_manager.all(), source, pks, [source, target]):
+                parents_by_target[link[target]].append(link[source])
+            child_rows = fetch_related_rows(related_manager.all(), "pk", list(parents_by_target), child_plan.columns)
+            for child_row, child_data in zip(child_rows, represent_rows(child_plan, child_rows)):
+                for parent_pk in parents_by_target[child_row["pk"]]:
+                    by_parent[parent_pk].append(child_data)
+
+        nested[field_name] = by_parent
+
+    represented = []
+    for row in rows:
+        ret = {}
+        for field_name, kind, arguments in plan.steps:
+            if kind == VALUE:
+                column, convert = arguments
+                value = row[column]
+                ret[field_name] = value if value is None or convert is None else convert(value)
+            elif kind == URL:
+                column, url_parts = arguments
+                ret[field_name] = Hyperlink(url_parts[0] + str(row[column]) + url_parts[1], None)
+            else:
+                ret[field_name] = nested[field_name].get(row["pk"], []) if field_name in nested else []
+        represented.append(ret)
+    return represented
+
+
+class NestedValuesListSerializer(serializers.ListSerializer):
+    """
+    List serializer reading querysets with `values()` instead of model instances. Every level of nested list
+    serializers is read with a single query (per chunk of parent objects) and attached to its parents by foreign key.
+    Used as `Meta.list_serializer_class` of serializers made of plain model fields, primary key relations, identity
+    urls and nested list serializers of reverse foreign keys and many to many relations. Other data is represented as
+    usual.
+    """
+
+    def to_representation(self, data):
+        if isinstance(data, BaseManager):
+            data = data.all()
+        if isinstance(data, QuerySet) and data._iterable_class is ModelIterable:
+            try:
+                plan = build_values_plan(self.child, {})
+            except ValuesNotSupported:
+                plan = None
+            if plan is not None:
+                rows = list(data.prefetch_related(None).values(*plan.columns))
+                return represent_rows(plan, rows)
+        return super().to_representation(data)
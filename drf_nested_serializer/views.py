@@ -0,0 +1,163 @@
+import json
+
+from django.db.models import prefetch_related_objects
+from django.http import StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from .serializers import chunked, get_snapshot_origin
+
+
+__all__ = [
+    "NestedETagMixin",
+    "NestedPrefetchMixin",
+    "NestedSnapshotRetrieveMixin",
+    "NestedStreamingListMixin",
+]
+
+
+class NestedETagMixin:
+    """
+    Conditional retrieve with the version of the object (`Meta.nested_version_field`) as ETag. Requests with a
+    matching `If-None-Match` header are answered with 304 Not Modified after loading the version of the object only,
+    without loading and rendering the nested relations.
+    """
+
+    def get_version_field(self):
+        return getattr(getattr(self.get_serializer_class(), "Meta", None), "nested_version_field", None)
+
+    def get_etag(self, obj, version_field):
+        return '"{}"'.format(getattr(obj, version_field))
+
+    def retrieve(self, request, *args, **kwargs):
+        version_field = self.get_version_field()
+        if version_field is None:
+            return super().retrieve(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset()).prefetch_related(None).only("pk", version_field)
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        obj = get_object_or_404(queryset, **{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        self.check_object_permissions(request, obj)
+
+        etag = self.get_etag(obj, version_field)
+        # weak comparison, like Django's conditional GET
+        etags = parse_etags(request.headers.get("If-None-Match", ""))
+        etags = [tag[2:] if tag.startswith("W/") else tag for tag in etags]
+        if "*" in etags or etag in etags:
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+        response = super().retrieve(request, *args, **kwargs)
+        response["ETag"] = etag
+        return response
+
+
+class NestedPrefetchMixin:
+    """
+    Prefetch the nested relations of the serializer for read requests. Only the relations of the sparse fieldset
+    requested by the client are prefetched (`Meta.nested_sparse_fieldsets`).
+    """
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.request is not None and self.request.method in SAFE_METHODS:
+            serializer = self.get_serializer()
+            if hasattr(serializer, "get_prefetch_lookups"):
+                queryset = queryset.prefetch_related(*serializer.get_prefetch_lookups())
+        return queryset
+
+
+class NestedSnapshotRetrieveMixin:
+    """
+    Retrieve action serving the snapshot of the representation stored by the serializer
+    (`Meta.nested_snapshot_field`) with a single query, without loading and rendering the nested relations.
+    Snapshots are only served while their version is the version of the object (`Meta.nested_version_field`), to
+    requests of the origin the hyperlinks of the snapshot were built with (scheme, host and script prefix).
+    Requests with query parameters or of another origin and objects without current snapshot are retrieved as usual.
+    """
+
+    def get_snapshot_fields(self):
+        """
+        Get the snapshot and version field of the serializer, None if no snapshots are stored
+        """
+        meta = getattr(self.get_serializer_class(), "Meta", None)
+        snapshot_field = getattr(meta, "nested_snapshot_field", None)
+        version_field = getattr(meta, "nested_version_field", None)
+        if snapshot_field is None or version_field is None:
+            return None
+        return snapshot_field, version_field
+
+    def get_snapshot_object(self, snapshot_field, version_field):
+        """
+        Get the object like `get_object`, with the snapshot and version field only
+        """
+        queryset = self.filter_queryset(self.get_queryset()).prefetch_related(None).only(
+            "pk", snapshot_field, version_field
+        )
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        obj = get_object_or_404(queryset, **{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        self.check_object_permissions(self.request, obj)
+        return obj
+
+    def retrieve(self, request, *args, **kwargs):
+        snapshot_fields = self.get_snapshot_fields()
+        if snapshot_fields is not None and not request.query_params:
+            snapshot_field, version_field = snapshot_fields
+            obj = self.get_snapshot_object(snapshot_field, version_field)
+            snapshot = getattr(obj, snapshot_field)
+            # snapshots in text fields are stored as rendered JSON
+            if isinstance(snapshot, str):
+                snapshot = json.loads(snapshot)
+            if (
+                snapshot is not None
+                and snapshot.get("version") == getattr(obj, version_field)
+                and snapshot.get("origin") == get_snapshot_origin(request)
+            ):
+                return Response(snapshot["data"])
+        return super().retrieve(request, *args, **kwargs)
+
+
+class NestedStreamingListMixin:
+    """
+    List action streaming the JSON array of the objects instead of building the whole response in memory. The
+    queryset is iterated in chunks of `stream_chunk_size` objects, the nested relations of the serializer are
+    prefetched per chunk. Paginated views are listed as usual.
+    """
+
+    stream_chunk_size = 1000
+
+    def get_prefetch_lookups(self, serializer):
+        """
+        Lookups prefetched for every chunk, the nested relations of the serializer by default
+        """
+        if hasattr(serializer, "get_prefetch_lookups"):
+            return serializer.get_prefetch_lookups()
+        return []
+
+    def list(self, request, *args, **kwargs):
+        if self.paginator is not None:
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        serializer = self.get_serializer()
+        return StreamingHttpResponse(self.stream_objects(queryset, serializer), content_type="application/json")
+
+    def stream_objects(self, queryset, serializer):
+        """
+        Render the objects of the queryset one by one as items of a JSON array
+        """
+        renderer = JSONRenderer()
+        lookups = self.get_prefetch_lookups(serializer)
+
+        yield b"["
+        separator = b""
+        for chunk in chunked(queryset.iterator(chunk_size=self.stream_chunk_size), self.stream_chunk_size):
+            if lookups:
+                prefetch_related_objects(chunk, *lookups)
+            for instance in chunk:
+                yield separator + renderer.render(serializer.to_representation(instance))
+                separator = b","
+        yield b"]"
@@ -22,6 +22,11 @@ from testapp import views
 
 router = routers.DefaultRouter()
 router.register(r'books', views.BookViewSet)
+router.register(r'book-imports', views.BookImportViewSet, basename='book-import')
+router.register(r'book-exports', views.BookExportViewSet, basename='book-export')
+router.register(r'sparse-books', views.BookSparseViewSet, basename='sparse-book')
+router.register(r'snapshot-books', views.BookSnapshotViewSet, basename='snapshot-book')
+router.register(r'versioned-books', views.BookVersionViewSet, basename='versioned-book')
 router.register(r'authors', views.AuthorViewSet)
 router.register(r'chapters', views.ChapterViewSet)
 router.register(r'pages', views.PageViewSet)
@@ -0,0 +1,50 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from drf_nested_serializer.backends import INSERT_BACKENDS, ORMInsertBackend
+from testapp.models import Book, Page
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Compare the insert backends by inserting pages of a book, all changes are rolled back"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--pages", type=int, default=10000, help="number of pages to insert")
+        parser.add_argument("--batch-size", type=int, default=None, help="rows per statement")
+        parser.add_argument("--repeat", type=int, default=3, help="number of runs per backend, the best is reported")
+        parser.add_argument("--database", default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        using = options["database"]
+        backend_classes = [ORMInsertBackend]
+        vendor_backend_class = INSERT_BACKENDS.get(connections[using].vendor)
+        if vendor_backend_class is not None:
+            backend_classes.append(vendor_backend_class)
+
+        for backend_class in backend_classes:
+            durations = [self.run(backend_class, using, options) for _ in range(options["repeat"])]
+            self.stdout.write(
+                "{}: {} pages in {:.3f}s".format(backend_class.__name__, options["pages"], min(durations))
+            )
+
+    def run(self, backend_class, using, options):
+        try:
+            with transaction.atomic(using=using):
+                book = Book.objects.using(using).create(title="Benchmark")
+                pages = [
+                    Page(book=book, content="Page {}".format(index), order=index) for index in range(options["pages"])
+                ]
+                backend = backend_class(using, batch_size=options["batch_size"])
+
+                start = time.perf_counter()
+                backend.insert(Page, pages)
+                duration = time.perf_counter() - start
+                raise Rollback
+        except Rollback:
+            return duration
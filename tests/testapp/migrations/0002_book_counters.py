@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('testapp', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='chapter_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='page_count',
+            field=models.IntegerField(default=0),
+        ),
+    ]
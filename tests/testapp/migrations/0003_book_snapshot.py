@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('testapp', '0002_book_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='snapshot',
+            field=models.TextField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('testapp', '0003_book_snapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='version',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='version',
+            field=models.IntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('testapp', '0004_versions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='attachment',
+            field=models.FileField(blank=True, upload_to=''),
+        ),
+    ]
@@ -16,6 +16,27 @@ class Book(models.Model):
         null=True,
     )
 
+    chapter_count = models.IntegerField(
+        default=0,
+    )
+
+    page_count = models.IntegerField(
+        default=0,
+    )
+
+    snapshot = models.TextField(
+        blank=True,
+        null=True,
+    )
+
+    version = models.IntegerField(
+        default=0,
+    )
+
+    attachment = models.FileField(
+        blank=True,
+    )
+
 
 class Chapter(models.Model):
 
@@ -81,6 +102,10 @@ class Category(models.Model):
         null=False,
     )
 
+    version = models.IntegerField(
+        default=0,
+    )
+
 
 class Author(models.Model):
 
@@ -54,6 +54,37 @@ class BookSerializer(NestedSerializer):
         many_to_many_direct_fields = ['categories']
 
 
+class BookImportSerializer(NestedSerializer):
+    chapters = BookChapterSerializer(many=True, required=False)
+    pages = BookPageSerializer(many=True, required=False, write_only=True)
+
+    class Meta:
+        model = Book
+        fields = ['pk', 'url', 'title', 'chapters', 'pages']
+        one_to_many_fields = ['chapters', 'pages']
+        nested_stream_fields = ['pages']
+        nested_stream_chunk_size = 100
+
+
+class BookSparseSerializer(BookSerializer):
+
+    class Meta(BookSerializer.Meta):
+        nested_sparse_fieldsets = True
+
+
+class BookSnapshotSerializer(BookSerializer):
+
+    class Meta(BookSerializer.Meta):
+        nested_snapshot_field = 'snapshot'
+        nested_version_field = 'version'
+
+
+class BookVersionSerializer(BookSerializer):
+
+    class Meta(BookSerializer.Meta):
+        nested_version_field = 'version'
+
+
 class AuthorSerializer(serializers.ModelSerializer):
     class Meta:
         model = Author
@@ -0,0 +1,257 @@
+from unittest import skipIf
+
+import django
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APITestCase
+
+from testapp.models import Book, Chapter, Page, Category
+from testapp.serializers import BookSerializer
+from testapp.tests.test_transactions import BatchedBookSerializer
+
+try:
+    from asgiref.sync import sync_to_async
+except ImportError:
+    sync_to_async = None
+
+
+@skipIf(django.VERSION < (3, 1), 'Async test methods require Django 3.1')
+class AsyncNestedWriteTests(APITestCase):
+
+    async def query(self, function):
+        """
+        Run the assertion queries outside of the event loop, the async ORM interface requires Django 4.1
+        """
+        return await sync_to_async(function)()
+
+    async def test_adding_book_with_chapters(self):
+        """
+        Tests that a nested serializer can add objects referred by a foreign key asynchronously. One level nesting.
+        """
+        serializer = BookSerializer(data={
+            'title': 'Book 1',
+            'chapters': [
+                {'title': 'Chapter 3', 'order': 3},
+                {'title': 'Chapter 1', 'order': 1},
+                {'title': 'Chapter 2', 'order': 2},
+            ],
+            'pages': [],
+        })
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        book = await serializer.asave()
+
+        # Assert data
+        self.assertEqual(await self.query(lambda: Book.objects.count()), 1)
+        self.assertEqual(await self.query(lambda: Chapter.objects.filter(book=book).count()), 3)
+        self.assertEqual(await self.query(lambda: Page.objects.count()), 0)
+
+    async def test_update_book_with_chapters(self):
+        """
+        Tests that a nested serializer can update objects referred by a foreign key asynchronously and deletes the
+        objects not sent anymore. One level nesting.
+        """
+        serializer = BookSerializer(data={
+            'title': 'Book 1',
+            'chapters': [
+                {'title': 'Chapter 1', 'order': 1},
+                {'title': 'Chapter 2', 'order': 2},
+                {'title': 'Chapter 3', 'order': 3},
+            ],
+            'pages': [],
+        })
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        book = await serializer.asave()
+        chapters = await self.query(lambda: list(Chapter.objects.filter(book=book).order_by('order')))
+
+        # Update chapter 2, replace chapter 1 with a new chapter and remove chapter 3
+        serializer = BookSerializer(instance=book, data={
+            'title': 'Book 1 update',
+            'chapters': [
+                {'title': 'Chapter 1 new', 'order': 1},
+                {'pk': chapters[1].pk, 'title': 'Chapter 2 update', 'order': 2},
+            ],
+            'pages': [],
+        })
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        book = await serializer.asave()
+
+        # Assert data
+        self.assertEqual(await self.query(lambda: Book.objects.get(pk=book.pk).title), 'Book 1 update')
+        self.assertEqual(
+            await self.query(lambda: list(Chapter.objects.order_by('order').values_list('title', flat=True))),
+            ['Chapter 1 new', 'Chapter 2 update'],
+        )
+        self.assertEqual(await self.query(lambda: Chapter.objects.get(title='Chapter 2 update').pk), chapters[1].pk)
+
+        # Assert chapter 1 and chapter 3 where deleted
+        self.assertFalse(await self.query(lambda: Chapter.objects.filter(pk=chapters[0].pk).exists()))
+        self.assertFalse(await self.query(lambda: Chapter.objects.filter(pk=chapters[2].pk).exists()))
+
+    async def test_update_book_with_chapters_with_pages(self):
+        """
+        Tests that a nested serializer can update objects referred by a foreign key asynchronously. Two level nesting.
+        """
+        serializer = BookSerializer(data={
+            'title': 'Book 1',
+            'chapters': [
+                {'title': 'Chapter 1', 'order': 1, 'pages': [{'content': 'Page 1', 'order': 1}]},
+                {'title': 'Chapter 2', 'order': 2, 'pages': []},
+            ],
+            'pages': [],
+        })
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        book = await serializer.acreate(serializer.validated_data)
+        chapter = await self.query(lambda: Chapter.objects.get(book=book, order=1))
+        page = await self.query(lambda: Page.objects.get(chapter=chapter))
+
+        serializer = BookSerializer(instance=book, data={
+            'title': 'Book 1 update',
+            'chapters': [
+                {'pk': chapter.pk, 'title': 'Chapter 1 update', 'order': 1, 'pages': [{'content': 'Page 2', 'order': 2}]},
+            ],
+            'pages': [],
+        })
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        book = await serializer.aupdate(book, serializer.validated_data)
+
+        # Assert data
+        self.assertEqual(await self.query(lambda: Book.objects.get(pk=book.pk).title), 'Book 1 update')
+        self.assertEqual(await self.query(lambda: Chapter.objects.count()), 1)
+        self.assertEqual(await self.query(lambda: Chapter.objects.get(pk=chapter.pk).title), 'Chapter 1 update')
+        self.assertEqual(await self.query(lambda: Page.objects.get(chapter=chapter).content), 'Page 2')
+
+        # Assert the page not sent anymore was unlinked from the chapter
+        self.assertIsNone(await self.query(lambda: Page.objects.get(pk=page.pk).chapter_id))
+
+    async def test_adding_book_with_categories_with_children(self):
+        """
+        Tests that a nested serializer can add objects referred by a many to many relation asynchronously.
+        """
+        serializer = BookSerializer(data={
+            'title': 'Book 1',
+            'categories': [
+                {'name': 'Category 1', 'children': [{'name': 'Category 11', 'children': []}]},
+                {'name': 'Category 2', 'children': []},
+            ],
+        })
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        book = await serializer.amanage_assignments(serializer.validated_data)
+
+        # Assert data
+        self.assertEqual(await self.query(lambda: Category.objects.count()), 3)
+        self.assertEqual(await self.query(lambda: book.categories.count()), 2)
+        self.assertTrue(
+            await self.query(lambda: Category.objects.filter(name='Category 11', parent__name='Category 1').exists())
+        )
+
+    async def test_update_book_with_categories_with_children(self):
+        """
+        Tests that a nested serializer can update objects referred by a many to many relation asynchronously and
+        unlinks the objects not sent anymore.
+        """
+        serializer = BookSerializer(data={
+            'title': 'Book 1',
+            'categories': [
+                {'name': 'Category 1', 'children': [{'name': 'Category 11', 'children': []}]},
+                {'name': 'Category 2', 'children': []},
+            ],
+        })
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        book = await serializer.asave()
+        category_1 = await self.query(lambda: Category.objects.get(name='Category 1'))
+        category_11 = await self.query(lambda: Category.objects.get(name='Category 11'))
+
+        serializer = BookSerializer(instance=book, data={
+            'title': 'Book 1',
+            'categories': [
+                {
+                    'pk': category_1.pk,
+                    'name': 'Category 1 update',
+                    'children': [
+                        {'pk': category_11.pk, 'name': 'Category 11 update', 'children': []},
+                        {'name': 'Category 12', 'children': []},
+                    ],
+                },
+            ],
+        })
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        book = await serializer.asave()
+
+        # Assert data
+        self.assertEqual(
+            await self.query(lambda: list(book.categories.values_list('name', flat=True))), ['Category 1 update']
+        )
+        self.assertEqual(
+            await self.query(lambda: sorted(Category.objects.filter(parent=category_1).values_list('name', flat=True))),
+            ['Category 11 update', 'Category 12'],
+        )
+
+        # Assert category 2 was unlinked from the book
+        self.assertFalse(await self.query(lambda: Category.objects.get(name='Category 2').books.exists()))
+
+    async def test_failing_write_rolls_back_nested_write(self):
+        """
+        Tests that an asynchronous nested write is rolled back if a related object fails while writing.
+        """
+        serializer = BatchedBookSerializer(data={
+            'title': 'Book 1',
+            'chapters': [{'title': 'Chapter 1', 'order': 1}, {'title': 'Rejected 2', 'order': 2}],
+            'pages': [],
+        })
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+
+        with self.assertRaises(ValidationError) as context:
+            await serializer.asave()
+
+        self.assertIn('title', context.exception.detail['chapters'][1])
+        self.assertEqual(await self.query(lambda: Book.objects.count()), 0)
+        self.assertEqual(await self.query(lambda: Chapter.objects.count()), 0)
+
+    async def test_failing_update_keeps_data(self):
+        """
+        Tests that an asynchronous nested update failing on a related object keeps the stored objects unchanged.
+        """
+        serializer = BatchedBookSerializer(data={
+            'title': 'Book 1',
+            'chapters': [{'title': 'Chapter 1', 'order': 1}],
+            'pages': [],
+        })
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        book = await serializer.asave()
+        chapter = await self.query(lambda: Chapter.objects.get())
+
+        serializer = BatchedBookSerializer(instance=book, data={
+            'title': 'Book 1 update',
+            'chapters': [{'title': 'Rejected 2', 'order': 2}],
+            'pages': [],
+        })
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+
+        with self.assertRaises(ValidationError) as context:
+            await serializer.asave()
+
+        # Assert errors, the removed chapter is kept
+        self.assertIn('title', context.exception.detail['chapters'][0])
+        self.assertEqual(await self.query(lambda: Book.objects.get(pk=book.pk).title), 'Book 1')
+        self.assertEqual(await self.query(lambda: list(Chapter.objects.values_list('pk', flat=True))), [chapter.pk])
+
+    async def test_invalid_removal_is_rejected(self):
+        """
+        Tests that an asynchronous nested write rejects a removal marker without pk.
+        """
+        serializer = BookSerializer(data={
+            'title': 'Book 1',
+            'chapters': [{'title': 'Chapter 1', 'order': 1}],
+            'pages': [],
+        })
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        book = await serializer.asave()
+
+        serializer = BookSerializer(instance=book, data={
+            'title': 'Book 1',
+            'chapters': [{'_delete': True}],
+            'pages': [],
+        }, partial=True)
+
+        self.assertFalse(await self.query(serializer.is_valid))
+        self.assertIn('chapters', serializer.errors)
+        self.assertEqual(await self.query(lambda: Chapter.objects.count()), 1)
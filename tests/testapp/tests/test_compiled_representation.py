@@ -0,0 +1,83 @@
+from unittest import mock
+
+from rest_framework.fields import get_attribute
+from rest_framework.test import APIRequestFactory, APITestCase
+
+from testapp.models import Book, Category, Chapter, Page
+from testapp.serializers import BookSerializer, BookChapterSerializer
+
+
+class CompiledBookSerializer(BookSerializer):
+
+    class Meta(BookSerializer.Meta):
+        nested_compiled_representation = True
+
+
+class CustomChapterSerializer(BookChapterSerializer):
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        data['title'] = data['title'].upper()
+        return data
+
+
+class CustomCompiledBookSerializer(CompiledBookSerializer):
+    chapters = CustomChapterSerializer(many=True, required=False)
+
+
+class CompiledRepresentationTests(APITestCase):
+
+    def setUp(self):
+        self.context = {'request': APIRequestFactory().get('/')}
+        for book_index in range(3):
+            book = Book.objects.create(title='Book {}'.format(book_index))
+            for chapter_index in range(3):
+                chapter = Chapter.objects.create(
+                    book=book, title='Chapter {}'.format(chapter_index), order=chapter_index
+                )
+                Page.objects.create(book=book, chapter=chapter, content='Page', order=chapter_index)
+            Page.objects.create(book=book, content='Loose page', order=10)
+            category = Category.objects.create(name='Category {}'.format(book_index))
+            Category.objects.create(name='Category {}.1'.format(book_index), parent=category)
+            book.categories.add(category)
+
+    def test_output_identical(self):
+        """
+        Tests that the compiled representation produces the same output as `to_representation`.
+        """
+        books = Book.objects.order_by('pk')
+        expected = BookSerializer(books, many=True, context=self.context).data
+        data = CompiledBookSerializer(books, many=True, context=self.context).data
+
+        self.assertEqual(data, expected)
+        self.assertEqual(data[0]['chapters'][0]['pages'][0]['content'], 'Page')
+        self.assertEqual(data[0]['categories'][0]['children'][0]['name'], 'Category 0.1')
+        self.assertIsNone(data[0]['pages'][-1]['chapter'])
+        self.assertEqual(data[2]['url'], 'http://testserver/api/books/{}/'.format(Book.objects.order_by('pk')[2].pk))
+
+    def test_fields_not_used_for_plain_values(self):
+        """
+        Tests that plain model fields are read with attribute getters instead of the field objects.
+        """
+        books = Book.objects.order_by('pk')
+        with mock.patch('rest_framework.fields.get_attribute', side_effect=get_attribute) as default_get_attribute:
+            BookSerializer(books, many=True, context=self.context).data
+        with mock.patch('rest_framework.fields.get_attribute', side_effect=get_attribute) as compiled_get_attribute:
+            CompiledBookSerializer(books, many=True, context=self.context).data
+
+        # only the nested serializers are read through their fields
+        self.assertEqual(
+            sorted({tuple(call.args[1]) for call in compiled_get_attribute.call_args_list}),
+            [('categories',), ('chapters',), ('children',), ('pages',)],
+        )
+        self.assertLess(compiled_get_attribute.call_count, default_get_attribute.call_count / 5)
+
+    def test_custom_to_representation(self):
+        """
+        Tests that nested serializers with a custom `to_representation` are represented by it.
+        """
+        book = Book.objects.order_by('pk').first()
+        data = CustomCompiledBookSerializer(book, context=self.context).data
+
+        self.assertEqual(data['chapters'][0]['title'], 'CHAPTER 0')
+        self.assertEqual(data['chapters'][0]['pages'][0]['content'], 'Page')
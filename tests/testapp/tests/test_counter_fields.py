@@ -0,0 +1,139 @@
+from unittest import mock
+
+from django.db import OperationalError, connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase, APITransactionTestCase
+
+from testapp.models import Book, Chapter, Page
+from testapp.serializers import BookSerializer
+
+
+class CountedBookSerializer(BookSerializer):
+
+    class Meta(BookSerializer.Meta):
+        nested_counter_fields = {'chapters': 'chapter_count', 'pages': 'page_count'}
+
+
+class RetryingCountedBookSerializer(CountedBookSerializer):
+
+    class Meta(CountedBookSerializer.Meta):
+        nested_retry_attempts = 1
+        nested_retry_backoff = 0.01
+
+
+class CounterFieldTestMixin:
+
+    def get_data(self, chapters=3, pages=2):
+        return {
+            'title': 'Book 1',
+            'chapters': [{'title': 'Chapter {}'.format(index), 'order': index} for index in range(chapters)],
+            'pages': [{'content': 'Page {}'.format(index), 'order': index} for index in range(pages)],
+            'categories': [],
+        }
+
+    def assert_counters(self, book, chapter_count, page_count):
+        self.assertEqual((book.chapter_count, book.page_count), (chapter_count, page_count))
+        book.refresh_from_db()
+        self.assertEqual((book.chapter_count, book.page_count), (chapter_count, page_count))
+        self.assertEqual((book.chapters.count(), book.pages.count()), (chapter_count, page_count))
+
+    def add_chapter(self, book, serializer_class=CountedBookSerializer):
+        serializer = serializer_class(book, data={'chapters': [{'title': 'Chapter new', 'order': 0}]}, partial=True)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        return serializer.save()
+
+
+class CounterFieldTests(CounterFieldTestMixin, APITestCase):
+
+    def test_create(self):
+        """
+        Tests that the counters are written with a single update of the parent.
+        """
+        serializer = CountedBookSerializer(data=self.get_data())
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+
+        with CaptureQueriesContext(connection) as queries:
+            book = serializer.save()
+
+        # Assert queries
+        updates = [
+            query['sql'] for query in queries.captured_queries if query['sql'].startswith('UPDATE "testapp_book"')
+        ]
+        self.assertEqual(len(updates), 1)
+        self.assertIn('"chapter_count" = ("testapp_book"."chapter_count" + 3)', updates[0])
+
+        # Assert data
+        self.assert_counters(book, 3, 2)
+
+    def test_update(self):
+        """
+        Tests that created, deleted and unlinked related objects are counted.
+        """
+        serializer = CountedBookSerializer(data=self.get_data())
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        book = serializer.save()
+
+        data = self.get_data(chapters=0, pages=0)
+        data['chapters'] = [{'pk': book.chapters.order_by('pk').first().pk, 'title': 'Chapter 0', 'order': 0}]
+        data['chapters'] += [{'title': 'Chapter new', 'order': index} for index in range(4)]
+        data['pages'] = [{'pk': book.pages.order_by('pk').first().pk, 'content': 'Page 0', 'order': 0}]
+        serializer = CountedBookSerializer(book, data=data)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        book = serializer.save()
+
+        # Assert data: two chapters deleted, one page unlinked
+        self.assert_counters(book, 5, 1)
+        self.assertEqual(Page.objects.filter(book__isnull=True).count(), 1)
+
+        # Assert partial removal
+        serializer = CountedBookSerializer(
+            book, data={'chapters': [{'pk': book.chapters.order_by('pk').first().pk, '_delete': True}]}, partial=True
+        )
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        self.assert_counters(serializer.save(), 4, 1)
+
+    def test_apply(self):
+        """
+        Tests that `apply(plan)` keeps the counters up to date.
+        """
+        serializer = CountedBookSerializer(data=self.get_data())
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        book = serializer.apply(serializer.plan())
+        self.assert_counters(book, 3, 2)
+
+        data = self.get_data(chapters=1, pages=4)
+        data['chapters'][0]['pk'] = Chapter.objects.filter(book=book).order_by('pk').first().pk
+        serializer = CountedBookSerializer(book, data=data)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        self.assert_counters(serializer.apply(serializer.plan()), 1, 4)
+
+    def test_stale_instances(self):
+        """
+        Tests that writes of stale instances do not overwrite the counters written by other writes.
+        """
+        serializer = CountedBookSerializer(data=self.get_data(chapters=0, pages=0))
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        book = serializer.save()
+        stale_books = [Book.objects.get(pk=book.pk), Book.objects.get(pk=book.pk)]
+
+        self.assert_counters(self.add_chapter(stale_books[0]), 1, 0)
+        self.assert_counters(self.add_chapter(stale_books[1]), 2, 0)
+
+
+class CounterFieldRetryTests(CounterFieldTestMixin, APITransactionTestCase):
+
+    @mock.patch('drf_nested_serializer.serializers.time.sleep')
+    def test_retry(self, sleep):
+        """
+        Tests that the counters of a rolled back attempt are not kept by the instance of the retried write.
+        """
+        serializer = CountedBookSerializer(data=self.get_data(chapters=1, pages=0))
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        book = serializer.save()
+
+        side_effect = [OperationalError('database is locked'), None]
+        with mock.patch.object(RetryingCountedBookSerializer, 'bump_shared_versions', side_effect=side_effect):
+            book = self.add_chapter(book, serializer_class=RetryingCountedBookSerializer)
+
+        self.assertEqual(sleep.call_count, 1)
+        self.assert_counters(book, 2, 0)
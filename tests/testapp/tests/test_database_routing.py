@@ -0,0 +1,114 @@
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+
+from testapp.models import Book, Chapter, Page, Category
+from testapp.serializers import BookSerializer, CategorySerializer
+
+
+class ReplicaCategorySerializer(CategorySerializer):
+
+    class Meta(CategorySerializer.Meta):
+        nested_read_alias = 'other'
+
+
+class ReplicaBookSerializer(BookSerializer):
+
+    class Meta(BookSerializer.Meta):
+        nested_read_alias = 'other'
+
+
+class DatabaseRoutingTests(APITestCase):
+    databases = {'default', 'other'}
+
+    def test_update_uses_alias_of_instance(self):
+        """
+        Tests that all writes of a nested update go to the database the updated instance was loaded from.
+        """
+        book = Book.objects.using('other').create(title='Book 1')
+        chapter = Chapter.objects.using('other').create(book=book, title='Chapter 1', order=1)
+        Chapter.objects.using('other').create(book=book, title='Chapter 2', order=2)
+        category = Category.objects.using('other').create(name='Category 1')
+        book.categories.add(category)
+
+        serializer = BookSerializer(instance=Book.objects.using('other').get(pk=book.pk), data={
+            'title': 'Book 1 update',
+            'chapters': [
+                {'pk': chapter.pk, 'title': 'Chapter 1 update', 'order': 1, 'pages': [{'content': 'Page 1'}]},
+                {'title': 'Chapter 3', 'order': 3, 'pages': []},
+            ],
+            'pages': [],
+            'categories': [
+                {'pk': category.pk, 'name': 'Category 1 update', 'children': [{'name': 'Category 11', 'children': []}]},
+                {'name': 'Category 2', 'children': []},
+            ],
+        })
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        serializer.save()
+
+        # Assert data, nothing is written to the default database
+        self.assertEqual(Book.objects.count(), 0)
+        self.assertEqual(Chapter.objects.count(), 0)
+        self.assertEqual(Page.objects.count(), 0)
+        self.assertEqual(Category.objects.count(), 0)
+
+        self.assertEqual(Book.objects.using('other').get(pk=book.pk).title, 'Book 1 update')
+        self.assertEqual(
+            sorted(Chapter.objects.using('other').values_list('title', flat=True)), ['Chapter 1 update', 'Chapter 3']
+        )
+        self.assertEqual(Page.objects.using('other').get().chapter_id, chapter.pk)
+        self.assertEqual(Category.objects.using('other').get(name='Category 11').parent_id, category.pk)
+        self.assertEqual(Book.objects.using('other').get(pk=book.pk).categories.count(), 2)
+
+    def test_apply_plan_uses_alias_of_instance(self):
+        """
+        Tests that a planned update is applied on the database the updated instance was loaded from.
+        """
+        book = Book.objects.using('other').create(title='Book 1')
+
+        serializer = BookSerializer(instance=Book.objects.using('other').get(pk=book.pk), data={
+            'title': 'Book 1 update',
+            'chapters': [{'title': 'Chapter 1', 'order': 1, 'pages': []}],
+            'pages': [],
+            'categories': [],
+        })
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        serializer.apply(serializer.plan())
+
+        self.assertEqual(Book.objects.using('other').get(pk=book.pk).title, 'Book 1 update')
+        self.assertEqual(Chapter.objects.using('other').filter(book_id=book.pk).count(), 1)
+        self.assertEqual(Chapter.objects.count(), 0)
+
+    def test_read_alias_for_related_field_lookups(self):
+        """
+        Tests that the querysets of related fields are evaluated on `Meta.nested_read_alias`.
+        """
+        serializer = ReplicaCategorySerializer(data={'name': 'Category 1', 'children': [], 'books': []})
+
+        self.assertEqual(serializer.fields['books'].child_relation.queryset.db, 'other')
+        self.assertEqual(serializer.fields['children'].child.fields['books'].child_relation.queryset.db, 'other')
+
+        # Assert list root
+        serializer = ReplicaCategorySerializer(data=[{'name': 'Category 1', 'children': [], 'books': []}], many=True)
+        self.assertEqual(serializer.child.fields['books'].child_relation.queryset.db, 'other')
+
+    def test_plan_reads_from_read_alias(self):
+        """
+        Tests that `plan()` looks up the related objects on `Meta.nested_read_alias`.
+        """
+        book = Book.objects.create(title='Book 1')
+        serializer = ReplicaBookSerializer(instance=book, data={
+            'title': 'Book 1',
+            'chapters': [{'title': 'Chapter 1', 'order': 1, 'pages': []}],
+            'pages': [],
+            'categories': [],
+        })
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+
+        with CaptureQueriesContext(connections['default']) as default_queries, \
+                CaptureQueriesContext(connections['other']) as other_queries:
+            plan = serializer.plan()
+
+        self.assertEqual(plan.using, 'default')
+        self.assertEqual(len(default_queries.captured_queries), 0)
+        self.assertGreater(len(other_queries.captured_queries), 0)
@@ -0,0 +1,88 @@
+from unittest import mock
+
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APITestCase
+
+from testapp.models import Book, Chapter
+from testapp.serializers import BookPageSerializer
+from testapp.tests.test_transactions import BatchedBookSerializer, RejectingChapterSerializer
+
+
+class FailFastBookSerializer(BatchedBookSerializer):
+
+    class Meta(BatchedBookSerializer.Meta):
+        nested_fail_fast = True
+        nested_sparse_errors = True
+
+
+class FailFastTests(APITestCase):
+
+    def get_data(self, rejected_indices, count=10):
+        return {
+            'title': 'Book 1',
+            'chapters': [
+                {
+                    'title': 'Rejected {}'.format(index) if index in rejected_indices else 'Chapter {}'.format(index),
+                    'order': index,
+                    'pages': [],
+                }
+                for index in range(count)
+            ],
+            'pages': [],
+            'categories': [],
+        }
+
+    def test_write_stops_at_first_error(self):
+        """
+        Tests that the nested write stops at the first failing related object, reports only its error and stores
+        nothing.
+        """
+        serializer = FailFastBookSerializer(data=self.get_data([2, 7], count=100))
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+
+        with mock.patch.object(
+            RejectingChapterSerializer, 'create', autospec=True, side_effect=RejectingChapterSerializer.create
+        ) as create:
+            with self.assertRaises(ValidationError) as context:
+                serializer.save()
+
+        # Assert errors, the chapters after the failing one are not written
+        self.assertEqual(list(context.exception.detail['chapters']), [2])
+        self.assertEqual(create.call_count, 3)
+
+        # Assert data
+        self.assertEqual(Book.objects.count(), 0)
+        self.assertEqual(Chapter.objects.count(), 0)
+
+    def test_validation_stops_at_first_error(self):
+        """
+        Tests that the related objects after the first invalid one are not validated.
+        """
+        data = self.get_data([])
+        data['chapters'][3]['order'] = 'invalid'
+        data['chapters'][8]['order'] = 'invalid'
+        serializer = FailFastBookSerializer(data=data)
+
+        self.assertFalse(serializer.is_valid())
+        self.assertEqual(list(serializer.errors['chapters']), [3])
+        self.assertIn('order', serializer.errors['chapters'][3])
+
+    def test_plain_validation_stops_at_first_error(self):
+        """
+        Tests that the related objects of a plain model serializer after the first invalid one are not validated.
+        """
+        data = self.get_data([], count=0)
+        data['pages'] = [{'content': 'Page {}'.format(index), 'order': index} for index in range(10)]
+        data['pages'][3]['order'] = 'invalid'
+        data['pages'][8]['order'] = 'invalid'
+        serializer = FailFastBookSerializer(data=data)
+
+        with mock.patch.object(
+            BookPageSerializer, 'validate', autospec=True, side_effect=lambda self, attrs: attrs
+        ) as validate:
+            self.assertFalse(serializer.is_valid())
+
+        # Assert errors, the pages after the invalid one are not validated
+        self.assertEqual(list(serializer.errors['pages']), [3])
+        self.assertIn('order', serializer.errors['pages'][3])
+        self.assertEqual(validate.call_count, 3)
@@ -0,0 +1,57 @@
+from unittest import mock
+
+from rest_framework import serializers
+from rest_framework.test import APITestCase
+
+from testapp.serializers import BookChapterSerializer
+
+
+class CachedChapterSerializer(BookChapterSerializer):
+
+    class Meta(BookChapterSerializer.Meta):
+        pass
+
+
+class CustomFieldChapterSerializer(BookChapterSerializer):
+
+    def build_field(self, field_name, info, model_class, nested_depth):
+        return super().build_field(field_name, info, model_class, nested_depth)
+
+    class Meta(BookChapterSerializer.Meta):
+        pass
+
+
+class FieldCacheTests(APITestCase):
+
+    def test_fields_built_once_per_class(self):
+        """
+        Tests that the fields of a serializer class are built from the model once and copied for every instance.
+        """
+        with mock.patch.object(
+            serializers.ModelSerializer, 'get_fields', autospec=True, side_effect=serializers.ModelSerializer.get_fields
+        ) as get_fields:
+            first = CachedChapterSerializer()
+            second = CachedChapterSerializer()
+            self.assertEqual(list(first.fields), ['pk', 'url', 'title', 'order', 'pages'])
+            self.assertEqual(list(second.fields), ['pk', 'url', 'title', 'order', 'pages'])
+
+        self.assertEqual(get_fields.call_count, 1)
+
+        # Assert the instances have fields of their own
+        self.assertIsNot(first.fields['title'], second.fields['title'])
+        self.assertIs(first.fields['title'].parent, first)
+        self.assertIs(second.fields['pages'].child.parent, second.fields['pages'])
+        first.fields['title'].validators.append(lambda value: None)
+        self.assertNotEqual(len(first.fields['title'].validators), len(second.fields['title'].validators))
+
+    def test_custom_field_building_not_cached(self):
+        """
+        Tests that the fields of serializers overwriting a method building the fields are built for every instance.
+        """
+        with mock.patch.object(
+            serializers.ModelSerializer, 'get_fields', autospec=True, side_effect=serializers.ModelSerializer.get_fields
+        ) as get_fields:
+            CustomFieldChapterSerializer().fields
+            CustomFieldChapterSerializer().fields
+
+        self.assertEqual(get_fields.call_count, 2)
@@ -0,0 +1,156 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APITestCase
+
+from drf_nested_serializer.identity import IdentityMap
+from testapp.models import Book, Chapter, Page, Category
+from testapp.serializers import BookSerializer
+
+
+class IdentityMapTests(APITestCase):
+
+    def create_book(self):
+        serializer = BookSerializer(data={
+            'title': 'Book 1',
+            'chapters': [{'title': 'Chapter 1', 'order': 1, 'pages': [{'content': 'Page 1', 'order': 1}]}],
+            'pages': [],
+            'categories': [{'name': 'Category 1', 'children': []}],
+        })
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        return serializer.save()
+
+    def get_updates(self, context, table, column):
+        return [
+            query['sql'] for query in context.captured_queries
+            if query['sql'].startswith('UPDATE "{}"'.format(table)) and '"{}" = '.format(column) in query['sql']
+        ]
+
+    def test_repeated_entry_written_once(self):
+        """
+        Tests that an object appearing more than once with the same data is loaded and written once.
+        """
+        book = self.create_book()
+        category = Category.objects.get()
+        chapter = Chapter.objects.get()
+
+        serializer = BookSerializer(instance=book, data={
+            'title': 'Book 1',
+            'chapters': [{'pk': chapter.pk, 'title': 'Chapter 1', 'order': 1, 'pages': []}],
+            'pages': [],
+            'categories': [
+                {'pk': category.pk, 'name': 'Category 1 update', 'children': []},
+                {'pk': category.pk, 'name': 'Category 1 update', 'children': []},
+            ],
+        })
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+
+        with CaptureQueriesContext(connection) as context:
+            serializer.save()
+
+        self.assertEqual(len(self.get_updates(context, 'testapp_category', 'name')), 1)
+        self.assertEqual(Category.objects.get().name, 'Category 1 update')
+        self.assertEqual(Book.objects.get(pk=book.pk).categories.count(), 1)
+
+    def test_repeated_entries_merged(self):
+        """
+        Tests that a page reachable through the book and its chapter is written with the merged data of both entries.
+        """
+        book = self.create_book()
+        chapter = Chapter.objects.get()
+        page = Page.objects.get()
+        Page.objects.filter(pk=page.pk).update(book=book)
+
+        serializer = BookSerializer(instance=book, data={
+            'title': 'Book 1',
+            'chapters': [
+                {'pk': chapter.pk, 'title': 'Chapter 1', 'order': 1, 'pages': [{'pk': page.pk, 'content': 'Page 1'}]},
+            ],
+            'pages': [{'pk': page.pk, 'order': 5, 'chapter': chapter.pk}],
+            'categories': [],
+        })
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        serializer.save()
+
+        page = Page.objects.get()
+        self.assertEqual(page.content, 'Page 1')
+        self.assertEqual(page.order, 5)
+        self.assertEqual(page.book_id, book.pk)
+        self.assertEqual(page.chapter_id, chapter.pk)
+
+    def test_conflicting_entries(self):
+        """
+        Tests that conflicting values of repeated entries are reported as validation error of the later entry.
+        """
+        book = self.create_book()
+        category = Category.objects.get()
+
+        serializer = BookSerializer(instance=book, data={
+            'title': 'Book 1',
+            'categories': [
+                {'pk': category.pk, 'name': 'Category A', 'children': []},
+                {'pk': category.pk, 'name': 'Category B', 'children': []},
+            ],
+        })
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+
+        with self.assertRaises(ValidationError) as context:
+            serializer.save()
+
+        errors = context.exception.detail['categories']
+        self.assertEqual(len(errors), 2)
+        self.assertFalse(errors[0])
+        self.assertIn('name', errors[1])
+        self.assertEqual(Category.objects.get().name, 'Category 1')
+
+    def test_rollback_to_savepoint(self):
+        """
+        Tests that the changes after a savepoint are undone by a rollback.
+        """
+        category = Category.objects.create(name='Category 1')
+        identity_map = IdentityMap()
+
+        self.assertIs(identity_map.add(category), category)
+        self.assertEqual(identity_map.merge(category, {'name': 'Category 1'}), {'name': 'Category 1'})
+
+        savepoint = identity_map.savepoint()
+        self.assertEqual(
+            identity_map.merge(category, {'parent': None}), {'name': 'Category 1', 'parent': None}
+        )
+        self.assertIsNone(identity_map.merge(category, {'parent': None}))
+        identity_map.rollback(savepoint)
+
+        # the instance might hold rolled back values and is loaded again, the data written before the savepoint is kept
+        self.assertIsNone(identity_map.get(Category, category.pk))
+        self.assertEqual(identity_map.merge(category, {'parent': None}), {'name': 'Category 1', 'parent': None})
+
+    def test_mapped_entry_loaded_once(self):
+        """
+        Tests that a page reachable through the book and its chapter is loaded once.
+        """
+        book = self.create_book()
+        chapter = Chapter.objects.get()
+        page = Page.objects.get()
+        Page.objects.filter(pk=page.pk).update(book=book)
+
+        serializer = BookSerializer(instance=book, data={
+            'title': 'Book 1',
+            'chapters': [
+                {'pk': chapter.pk, 'title': 'Chapter 1', 'order': 1, 'pages': [{'pk': page.pk, 'content': 'Page 1'}]},
+            ],
+            'pages': [{'pk': page.pk, 'order': 5, 'chapter': chapter.pk}],
+            'categories': [],
+        })
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+
+        with CaptureQueriesContext(connection) as context:
+            serializer.save()
+
+        # Assert the other pages of the book are still selected, without the page loaded for the chapter
+        selects = [
+            query['sql'] for query in context.captured_queries
+            if query['sql'].startswith('SELECT') and 'FROM "testapp_page"' in query['sql']
+        ]
+        self.assertEqual(len(selects), 2, selects)
+        self.assertIn('NOT ("testapp_page"."id" IN ({}))'.format(page.pk), selects[1])
+        self.assertEqual(Page.objects.get().order, 5)
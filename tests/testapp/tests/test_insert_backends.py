@@ -0,0 +1,148 @@
+from unittest import mock
+
+from django.db import DatabaseError, connection
+from rest_framework.test import APITestCase
+
+from drf_nested_serializer.backends import (
+    InsertBackend,
+    ORMInsertBackend,
+    SQLiteInsertBackend,
+    get_insert_backend,
+)
+from testapp.models import Book, Chapter, Page
+from testapp.serializers import BookSerializer
+
+
+class ORMBookSerializer(BookSerializer):
+
+    class Meta(BookSerializer.Meta):
+        nested_insert_backend = ORMInsertBackend
+
+
+class RejectingInsertBackend(InsertBackend):
+
+    def can_insert(self, model):
+        return False
+
+
+class InsertBackendTests(APITestCase):
+
+    def get_data(self):
+        return {
+            'title': 'Book 1',
+            'chapters': [
+                {
+                    'title': 'Chapter {}'.format(index),
+                    'order': index,
+                    'pages': [{'content': 'Page {}.{}'.format(index, order), 'order': order} for order in range(3)],
+                }
+                for index in range(4)
+            ],
+            'pages': [],
+            'categories': [],
+        }
+
+    def test_backend_assigns_primary_keys(self):
+        """
+        Tests that the primary keys assigned by the insert backend are the ones of the inserted rows, over several
+        batches.
+        """
+        book = Book.objects.create(title='Book 1')
+        Page.objects.create(book=book, content='Existing', order=0)
+        pages = [Page(book=book, content='Page {}'.format(index), order=index) for index in range(7)]
+
+        backend = SQLiteInsertBackend(connection.alias, batch_size=3)
+        self.assertTrue(backend.can_insert(Page))
+        backend.insert(Page, pages)
+
+        # Assert instances
+        for page in pages:
+            self.assertIsNotNone(page.pk)
+            self.assertFalse(page._state.adding)
+            self.assertEqual(Page.objects.get(pk=page.pk).content, page.content)
+
+    def test_apply_uses_vendor_backend(self):
+        """
+        Tests that applying a plan inserts the new objects with the backend of the database vendor and links the
+        nested objects to the assigned primary keys.
+        """
+        serializer = BookSerializer(data=self.get_data())
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+
+        with mock.patch.object(SQLiteInsertBackend, 'insert', autospec=True, side_effect=SQLiteInsertBackend.insert) \
+                as insert:
+            instance = serializer.apply(serializer.plan())
+
+        # Assert backend
+        self.assertEqual(sorted(call.args[1].__name__ for call in insert.call_args_list), ['Book', 'Chapter', 'Page'])
+
+        # Assert data
+        self.assertEqual(Chapter.objects.filter(book=instance).count(), 4)
+        for chapter in Chapter.objects.filter(book=instance):
+            self.assertEqual(
+                sorted(chapter.pages.values_list('content', flat=True)),
+                ['Page {}.{}'.format(chapter.order, order) for order in range(3)],
+            )
+
+    def test_save_uses_vendor_backend(self):
+        """
+        Tests that a nested write inserts the new objects of plain model serializers with the backend of the database
+        vendor.
+        """
+        serializer = BookSerializer(data=self.get_data())
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+
+        with mock.patch.object(SQLiteInsertBackend, 'insert', autospec=True, side_effect=SQLiteInsertBackend.insert) \
+                as insert:
+            instance = serializer.save()
+
+        # Assert backend, the pages of every chapter are inserted at once
+        self.assertEqual([call.args[1].__name__ for call in insert.call_args_list], ['Page'] * 4)
+        self.assertEqual([len(call.args[2]) for call in insert.call_args_list], [3] * 4)
+
+        # Assert data
+        for chapter in Chapter.objects.filter(book=instance):
+            self.assertEqual(
+                sorted(chapter.pages.values_list('content', flat=True)),
+                ['Page {}.{}'.format(chapter.order, order) for order in range(3)],
+            )
+
+    def test_failing_insert_falls_back_to_single_creates(self):
+        """
+        Tests that the new objects are created one by one if the insert backend fails.
+        """
+        serializer = BookSerializer(data=self.get_data())
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+
+        with mock.patch.object(SQLiteInsertBackend, 'insert', side_effect=DatabaseError):
+            instance = serializer.save()
+
+        # Assert data
+        self.assertEqual(Page.objects.filter(chapter__book=instance).count(), 12)
+
+    def test_backend_from_meta(self):
+        """
+        Tests that the insert backend can be chosen with `nested_insert_backend`.
+        """
+        serializer = ORMBookSerializer(data=self.get_data())
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+
+        with mock.patch.object(SQLiteInsertBackend, 'insert') as insert:
+            instance = serializer.apply(serializer.plan())
+
+        # Assert data
+        insert.assert_not_called()
+        self.assertEqual(Page.objects.filter(chapter__book=instance).count(), 12)
+
+    def test_fallback_to_orm(self):
+        """
+        Tests that models the backend cannot insert are inserted with `bulk_create()`, if the database returns the
+        primary keys of bulk inserts.
+        """
+        with mock.patch.object(ORMInsertBackend, 'can_insert', return_value=True):
+            backend = get_insert_backend(Page, connection.alias, RejectingInsertBackend)
+        self.assertIsInstance(backend, ORMInsertBackend)
+
+        # Assert no bulk insert
+        with mock.patch.object(ORMInsertBackend, 'can_insert', return_value=False):
+            self.assertIsNone(get_insert_backend(Page, connection.alias, RejectingInsertBackend))
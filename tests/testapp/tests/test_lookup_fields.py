@@ -0,0 +1,105 @@
+from rest_framework.test import APITestCase
+
+from testapp.models import Book, Chapter, Category
+from testapp.serializers import BookSerializer
+
+
+class LookupBookSerializer(BookSerializer):
+
+    class Meta(BookSerializer.Meta):
+        nested_lookup_fields = {
+            'chapters': ['order'],
+            'categories': ['name'],
+        }
+
+
+class LookupFieldsTests(APITestCase):
+
+    def create_book(self):
+        serializer = LookupBookSerializer(data={
+            'title': 'Book 1',
+            'chapters': [
+                {'title': 'Chapter 1', 'order': 1, 'pages': []},
+                {'title': 'Chapter 2', 'order': 2, 'pages': []},
+                {'title': 'Chapter 3', 'order': 3, 'pages': []},
+            ],
+            'pages': [],
+            'categories': [{'name': 'Category 1', 'children': []}],
+        })
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        return serializer.save()
+
+    def get_sync_data(self):
+        return {
+            'title': 'Book 1',
+            'chapters': [
+                {'title': 'Chapter 1 update', 'order': 1, 'pages': []},
+                {'title': 'Chapter 2 update', 'order': 2, 'pages': []},
+                {'title': 'Chapter 4', 'order': 4, 'pages': []},
+            ],
+            'pages': [],
+            'categories': [
+                {'name': 'Category 1', 'children': []},
+                {'name': 'Category 2', 'children': []},
+            ],
+        }
+
+    def test_children_matched_on_lookup_fields(self):
+        """
+        Tests that children without pk are matched with the existing children on `Meta.nested_lookup_fields` and
+        updated in place.
+        """
+        book = self.create_book()
+        chapters = {chapter.order: chapter.pk for chapter in Chapter.objects.all()}
+        category = Category.objects.get()
+
+        # a category with the same name, but not linked to the book
+        Category.objects.create(name='Category 2')
+
+        serializer = LookupBookSerializer(instance=book, data=self.get_sync_data())
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        serializer.save()
+
+        # Assert data, chapter 1 and 2 keep their identity, chapter 3 is removed
+        self.assertEqual(Chapter.objects.get(pk=chapters[1]).title, 'Chapter 1 update')
+        self.assertEqual(Chapter.objects.get(pk=chapters[2]).title, 'Chapter 2 update')
+        self.assertFalse(Chapter.objects.filter(pk=chapters[3]).exists())
+        self.assertTrue(Chapter.objects.filter(order=4, book=book).exists())
+
+        # Category 1 is matched within the linked categories, Category 2 is created
+        book_categories = Book.objects.get(pk=book.pk).categories.all()
+        self.assertIn(category, book_categories)
+        self.assertEqual(Category.objects.filter(name='Category 2').count(), 2)
+        self.assertEqual(Category.objects.count(), 3)
+
+    def test_children_without_lookup_fields_are_replaced(self):
+        """
+        Tests that children without pk are created without `Meta.nested_lookup_fields`.
+        """
+        book = self.create_book()
+        chapters = set(Chapter.objects.values_list('pk', flat=True))
+
+        serializer = BookSerializer(instance=book, data=self.get_sync_data())
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        serializer.save()
+
+        self.assertFalse(set(Chapter.objects.values_list('pk', flat=True)) & chapters)
+
+    def test_plan_matches_lookup_fields(self):
+        """
+        Tests that `plan()` matches children on `Meta.nested_lookup_fields`.
+        """
+        book = self.create_book()
+        chapters = {chapter.order: chapter.pk for chapter in Chapter.objects.all()}
+
+        serializer = LookupBookSerializer(instance=book, data=self.get_sync_data())
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        plan = serializer.plan()
+
+        summary = plan.summary()
+        self.assertEqual(summary['chapters'], {'create': 1, 'update': 2, 'unlink': 0, 'delete': 1})
+        self.assertEqual(summary['categories'], {'create': 1, 'update': 1, 'unlink': 0, 'delete': 0})
+
+        serializer.apply(plan)
+        self.assertEqual(Chapter.objects.get(pk=chapters[2]).title, 'Chapter 2 update')
+        self.assertFalse(Chapter.objects.filter(pk=chapters[3]).exists())
@@ -0,0 +1,130 @@
+from unittest import mock
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.exceptions import NotFound
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, APITestCase
+
+from drf_nested_serializer.pagination import encode_cursor
+from testapp.models import Book, Chapter, Page
+from testapp.serializers import BookSerializer
+
+
+class PagedBookSerializer(BookSerializer):
+
+    class Meta(BookSerializer.Meta):
+        nested_page_size = {'pages': 2}
+
+
+class InvalidPagedBookSerializer(BookSerializer):
+
+    class Meta(BookSerializer.Meta):
+        nested_page_size = {'categories': 2}
+
+
+class NestedPaginationTests(APITestCase):
+
+    def setUp(self):
+        for book_index in range(3):
+            book = Book.objects.create(title='Book {}'.format(book_index))
+            Chapter.objects.create(book=book, title='Chapter', order=0)
+            for page_index in range(book_index + 3):
+                Page.objects.create(book=book, content='Page {}'.format(page_index), order=page_index)
+
+    def get_context(self, query=None):
+        return {'request': Request(APIRequestFactory().get('/api/books/', query or {}))}
+
+    def test_pages(self):
+        """
+        Tests that the related objects are represented as pages with the total count and the link to the next page,
+        read with a single query per page.
+        """
+        book = Book.objects.order_by('pk').last()
+
+        with CaptureQueriesContext(connection) as context:
+            data = PagedBookSerializer(book, context=self.get_context()).data
+
+        # Assert page
+        self.assertEqual(data['pages']['count'], 5)
+        self.assertEqual([page['content'] for page in data['pages']['results']], ['Page 0', 'Page 1'])
+        self.assertIn('pages.cursor=', data['pages']['next'])
+        self.assertEqual(len([query for query in context.captured_queries if '_nested_page_count' in query['sql']]), 1)
+
+        # Assert next pages
+        cursor = data['pages']['next'].split('pages.cursor=')[1]
+        data = PagedBookSerializer(book, context=self.get_context({'pages.cursor': cursor})).data
+        self.assertEqual([page['content'] for page in data['pages']['results']], ['Page 2', 'Page 3'])
+        cursor = data['pages']['next'].split('pages.cursor=')[1]
+        data = PagedBookSerializer(book, context=self.get_context({'pages.cursor': cursor})).data
+        self.assertEqual([page['content'] for page in data['pages']['results']], ['Page 4'])
+        self.assertIsNone(data['pages']['next'])
+        self.assertEqual(data['pages']['count'], 5)
+
+        # Assert invalid cursor
+        with self.assertRaises(NotFound):
+            PagedBookSerializer(book, context=self.get_context({'pages.cursor': 'invalid'})).data
+
+    def assert_prefetched_pages(self, query=None):
+        context = self.get_context(query)
+        lookups = PagedBookSerializer(context=context).get_prefetch_lookups()
+        books = Book.objects.order_by('pk').prefetch_related(*lookups)
+
+        with CaptureQueriesContext(connection) as queries:
+            data = PagedBookSerializer(books, many=True, context=context).data
+
+        # Assert queries
+        page_queries = [query for query in queries.captured_queries if '"testapp_page"."book_id" IN' in query['sql']]
+        self.assertEqual(len(page_queries), 1)
+        return data
+
+    def test_prefetched_pages(self):
+        """
+        Tests that the pages of all parents are prefetched with a single query.
+        """
+        data = self.assert_prefetched_pages()
+
+        # Assert pages
+        self.assertEqual([book['pages']['count'] for book in data], [3, 4, 5])
+        for book in data:
+            self.assertEqual([page['content'] for page in book['pages']['results']], ['Page 0', 'Page 1'])
+
+    @mock.patch('drf_nested_serializer.pagination.SLICED_PREFETCH', False)
+    def test_prefetched_relations(self):
+        """
+        Tests that the full relations are prefetched and sliced per parent if sliced querysets cannot be prefetched.
+        """
+        data = self.assert_prefetched_pages({'pages.cursor': encode_cursor(2)})
+
+        # Assert pages
+        self.assertEqual([book['pages']['count'] for book in data], [3, 4, 5])
+        self.assertEqual(
+            [[page['content'] for page in book['pages']['results']] for book in data],
+            [['Page 2'], ['Page 2', 'Page 3'], ['Page 2', 'Page 3']],
+        )
+
+    def test_writes_take_full_list(self):
+        """
+        Tests that paginated relations are written from the full list.
+        """
+        serializer = PagedBookSerializer(
+            data={
+                'title': 'Book 4',
+                'pages': [{'content': 'Page {}'.format(index), 'order': index} for index in range(3)],
+            },
+            context=self.get_context(),
+        )
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        book = serializer.save()
+
+        # Assert data
+        self.assertEqual(book.pages.count(), 3)
+        self.assertEqual(serializer.data['pages']['count'], 3)
+
+    def test_invalid_relation(self):
+        """
+        Tests that only one to many relations can be paginated.
+        """
+        with self.assertRaises(ImproperlyConfigured):
+            InvalidPagedBookSerializer().fields
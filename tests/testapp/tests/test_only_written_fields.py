@@ -0,0 +1,90 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+
+from testapp.models import Book, Page
+from testapp.serializers import BookSerializer
+
+
+class AllFieldsBookSerializer(BookSerializer):
+
+    class Meta(BookSerializer.Meta):
+        nested_only_written_fields = False
+
+
+class OnlyWrittenFieldsTests(APITestCase):
+
+    def setUp(self):
+        self.book = Book.objects.create(title='Book 1')
+        self.pages = [
+            Page.objects.create(book=self.book, content='Content {}'.format(index) * 100, order=index)
+            for index in range(3)
+        ]
+
+    def get_data(self):
+        return {'pages': [{'pk': page.pk, 'order': 10 - page.order} for page in self.pages]}
+
+    def get_page_loads(self, queries):
+        return [
+            query['sql'] for query in queries.captured_queries
+            if query['sql'].startswith('SELECT') and 'FROM "testapp_page"' in query['sql']
+            and '"testapp_page"."order"' in query['sql']
+        ]
+
+    def assert_reordered(self):
+        for index, page in enumerate(self.pages):
+            page.refresh_from_db()
+            self.assertEqual(page.order, 10 - index)
+            self.assertEqual(page.content, 'Content {}'.format(index) * 100)
+
+    def test_update(self):
+        """
+        Tests that the existing related objects are loaded without the fields that are not written.
+        """
+        serializer = BookSerializer(self.book, data=self.get_data(), partial=True)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+
+        with CaptureQueriesContext(connection) as queries:
+            serializer.save()
+
+        # Assert queries
+        page_loads = self.get_page_loads(queries)
+        self.assertTrue(page_loads)
+        for sql in page_loads:
+            self.assertNotIn('"content"', sql)
+
+        # Assert data
+        self.assert_reordered()
+
+    def test_apply(self):
+        """
+        Tests that the objects updated by `apply(plan)` are loaded without the fields that are not written.
+        """
+        serializer = BookSerializer(self.book, data=self.get_data(), partial=True)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+
+        with CaptureQueriesContext(connection) as queries:
+            serializer.apply(serializer.plan())
+
+        # Assert queries
+        page_loads = self.get_page_loads(queries)
+        self.assertTrue(page_loads)
+        for sql in page_loads:
+            self.assertNotIn('"content"', sql)
+
+        # Assert data
+        self.assert_reordered()
+
+    def test_disabled(self):
+        """
+        Tests that all fields are loaded with `nested_only_written_fields = False`.
+        """
+        serializer = AllFieldsBookSerializer(self.book, data=self.get_data(), partial=True)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+
+        with CaptureQueriesContext(connection) as queries:
+            serializer.save()
+
+        # Assert queries
+        self.assertIn('"content"', self.get_page_loads(queries)[0])
+        self.assert_reordered()
@@ -0,0 +1,168 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+
+from testapp.models import Book, Chapter
+from testapp.serializers import BookChapterSerializer, BookSerializer
+
+
+class OrderedChapterSerializer(BookChapterSerializer):
+
+    class Meta(BookChapterSerializer.Meta):
+        extra_kwargs = {'title': {'required': False}}
+
+
+class OrderedBookSerializer(BookSerializer):
+    chapters = OrderedChapterSerializer(many=True, required=False)
+
+    class Meta(BookSerializer.Meta):
+        nested_order_field = {'chapters': 'order'}
+
+
+class FullEntryBookSerializer(BookSerializer):
+
+    class Meta(BookSerializer.Meta):
+        nested_order_field = {'chapters': 'order'}
+
+
+class OrderFieldTests(APITestCase):
+
+    def setUp(self):
+        self.book = Book.objects.create(title='Book 1')
+        self.chapters = [
+            Chapter.objects.create(book=self.book, title='Chapter {}'.format(index), order=index) for index in range(10)
+        ]
+
+    def get_data(self):
+        chapters = list(self.chapters)
+        chapters[3], chapters[4] = chapters[4], chapters[3]
+        return {'title': 'Book 1', 'chapters': [{'pk': chapter.pk} for chapter in chapters]}
+
+    def get_full_data(self):
+        data = self.get_data()
+        for entry in data['chapters']:
+            chapter = Chapter.objects.get(pk=entry['pk'])
+            entry.update(title=chapter.title, order=chapter.order)
+        return data
+
+    def get_chapter_updates(self, queries):
+        return [
+            query['sql'] for query in queries.captured_queries if query['sql'].startswith('UPDATE "testapp_chapter"')
+        ]
+
+    def assert_swapped(self):
+        expected = list(range(10))
+        expected[3], expected[4] = 4, 3
+        self.assertEqual([Chapter.objects.get(pk=chapter.pk).order for chapter in self.chapters], expected)
+
+    def test_moved_objects(self):
+        """
+        Tests that only the moved related objects are written, with a single statement.
+        """
+        serializer = OrderedBookSerializer(self.book, data=self.get_data())
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+
+        with CaptureQueriesContext(connection) as queries:
+            serializer.save()
+
+        # Assert queries
+        updates = self.get_chapter_updates(queries)
+        self.assertEqual(len(updates), 1)
+        self.assertIn('CASE', updates[0])
+
+        # Assert data
+        self.assert_swapped()
+        self.assertEqual(Chapter.objects.get(pk=self.chapters[3].pk).title, 'Chapter 3')
+
+    def test_positions_of_new_and_changed_objects(self):
+        """
+        Tests that new and changed related objects are written with their position, the order values of the
+        request are ignored.
+        """
+        data = {
+            'title': 'Book 1',
+            'chapters': [
+                {'title': 'Chapter new', 'order': 99},
+                {'pk': self.chapters[1].pk, 'title': 'Chapter 1 changed', 'order': 99},
+                {'pk': self.chapters[0].pk},
+            ],
+        }
+        serializer = OrderedBookSerializer(self.book, data=data)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        serializer.save()
+
+        # Assert data
+        self.assertEqual(
+            list(Chapter.objects.filter(book=self.book).order_by('order').values_list('title', 'order')),
+            [('Chapter new', 0), ('Chapter 1 changed', 1), ('Chapter 0', 2)],
+        )
+
+    def test_apply(self):
+        """
+        Tests that `apply(plan)` writes the positions of the moved related objects only.
+        """
+        serializer = OrderedBookSerializer(self.book, data=self.get_data())
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        plan = serializer.plan()
+
+        # Assert plan
+        self.assertEqual(plan.summary()['chapters']['update'], 2)
+
+        with CaptureQueriesContext(connection) as queries:
+            serializer.apply(plan)
+
+        # Assert queries
+        self.assertEqual(len(self.get_chapter_updates(queries)), 1)
+        self.assert_swapped()
+
+    def test_moved_objects_with_full_entries(self):
+        """
+        Tests that full entries of moved related objects without other changes are written with a single statement,
+        the unchanged objects are not written.
+        """
+        serializer = FullEntryBookSerializer(self.book, data=self.get_full_data())
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+
+        with CaptureQueriesContext(connection) as queries:
+            serializer.save()
+
+        # Assert queries
+        updates = self.get_chapter_updates(queries)
+        self.assertEqual(len(updates), 1)
+        self.assertIn('CASE', updates[0])
+
+        # Assert data
+        self.assert_swapped()
+
+    def test_changed_full_entries(self):
+        """
+        Tests that full entries with changed values are written with their position.
+        """
+        data = self.get_full_data()
+        data['chapters'][3]['title'] = 'Chapter 4 changed'
+        serializer = FullEntryBookSerializer(self.book, data=data)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+
+        with CaptureQueriesContext(connection) as queries:
+            serializer.save()
+
+        # Assert queries, the changed object is updated and the other moved object is updated with the moved objects
+        self.assertEqual(len(self.get_chapter_updates(queries)), 2)
+
+        # Assert data
+        self.assert_swapped()
+        self.assertEqual(Chapter.objects.get(pk=self.chapters[4].pk).title, 'Chapter 4 changed')
+
+    def test_apply_with_full_entries(self):
+        """
+        Tests that `apply(plan)` skips the full entries of unchanged related objects at their position.
+        """
+        serializer = FullEntryBookSerializer(self.book, data=self.get_full_data())
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        plan = serializer.plan()
+
+        # Assert plan
+        self.assertEqual(plan.summary()['chapters']['update'], 2)
+
+        serializer.apply(plan)
+        self.assert_swapped()
@@ -0,0 +1,129 @@
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from testapp.models import Book, Chapter, Category
+from testapp.serializers import BookSerializer
+
+
+class PartialBookSerializer(BookSerializer):
+
+    class Meta(BookSerializer.Meta):
+        nested_partial_fields = ['chapters']
+
+
+class PartialUpdateTests(APITestCase):
+
+    def create_book(self):
+        url = reverse('book-list')
+        data = {
+            'title': 'Book 1',
+            'chapters': [
+                {'title': 'Chapter 1', 'order': 1},
+                {'title': 'Chapter 2', 'order': 2},
+                {'title': 'Chapter 3', 'order': 3},
+            ],
+            'pages': [],
+            'categories': [
+                {'name': 'Category 1', 'children': []},
+                {'name': 'Category 2', 'children': []},
+            ],
+        }
+        response = self.client.post(url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response.data
+
+    def test_patch_book_keeps_omitted_chapters(self):
+        """
+        Tests that a partial update only touches the sent chapters, omitted chapters are kept and chapters marked with
+        `_delete` are removed.
+        """
+        book = self.create_book()
+        chapters = {chapter['title']: chapter['pk'] for chapter in book['chapters']}
+
+        url = reverse('book-detail', kwargs={'pk': book['pk']})
+        data = {
+            'chapters': [
+                {'pk': chapters['Chapter 2'], 'title': 'Chapter 2 update', 'order': 2},
+                {'pk': chapters['Chapter 3'], '_delete': True},
+                {'title': 'Chapter 4', 'order': 4},
+            ],
+        }
+        response = self.client.patch(url, data, format='json')
+
+        # Assert response
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['title'], 'Book 1')
+        self.assertEqual(len(response.data['chapters']), 3)
+
+        # Assert data
+        self.assertEqual(Chapter.objects.count(), 3)
+        self.assertEqual(Chapter.objects.get(pk=chapters['Chapter 1']).title, 'Chapter 1')
+        self.assertEqual(Chapter.objects.get(pk=chapters['Chapter 2']).title, 'Chapter 2 update')
+        self.assertFalse(Chapter.objects.filter(pk=chapters['Chapter 3']).exists())
+        self.assertTrue(Chapter.objects.filter(title='Chapter 4', book_id=book['pk']).exists())
+
+    def test_patch_book_removes_marked_categories(self):
+        """
+        Tests that a partial update of a direct many to many relation only unlinks the marked objects.
+        """
+        book = self.create_book()
+        categories = {category['name']: category['pk'] for category in book['categories']}
+
+        url = reverse('book-detail', kwargs={'pk': book['pk']})
+        data = {
+            'categories': [
+                {'pk': categories['Category 1'], '_delete': True},
+            ],
+        }
+        response = self.client.patch(url, data, format='json')
+
+        # Assert response
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['categories']), 1)
+        self.assertEqual(response.data['categories'][0]['name'], 'Category 2')
+
+        # Assert data, the relation is removed but the category itself is kept
+        self.assertEqual(Category.objects.count(), 2)
+        self.assertEqual(list(Book.objects.get(pk=book['pk']).categories.values_list('pk', flat=True)),
+                         [categories['Category 2']])
+
+    def test_removal_marker_requires_pk(self):
+        """
+        Tests that a removal marker without primary key is rejected.
+        """
+        book = self.create_book()
+
+        url = reverse('book-detail', kwargs={'pk': book['pk']})
+        response = self.client.patch(url, {'chapters': [{'_delete': True}]}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('chapters', response.data)
+        self.assertEqual(Chapter.objects.count(), 3)
+
+    def test_partial_relation_configured_in_meta(self):
+        """
+        Tests that relations listed in `Meta.nested_partial_fields` are written in partial mode on a full update.
+        """
+        book = self.create_book()
+        chapters = {chapter['title']: chapter['pk'] for chapter in book['chapters']}
+
+        serializer = PartialBookSerializer(
+            instance=Book.objects.get(pk=book['pk']),
+            data={
+                'title': 'Book 1 update',
+                'chapters': [
+                    {'pk': chapters['Chapter 1'], '_delete': True},
+                ],
+                'pages': [],
+                'categories': [],
+            },
+        )
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        serializer.save()
+
+        # Chapter 2 and 3 are kept, the not partial categories relation is replaced
+        self.assertEqual(
+            set(Chapter.objects.values_list('pk', flat=True)), {chapters['Chapter 2'], chapters['Chapter 3']}
+        )
+        self.assertEqual(Book.objects.get(pk=book['pk']).categories.count(), 0)
@@ -0,0 +1,194 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APITestCase
+
+from drf_nested_serializer import NestedSerializer
+from drf_nested_serializer.plans import ManyToManyThroughRelation, ObjectPlan
+from testapp.models import Author, AuthorBook, Book, Chapter, Page, Category
+from testapp.serializers import BookSerializer
+
+
+class AuthorBookEntrySerializer(serializers.ModelSerializer):
+    pk = serializers.IntegerField(read_only=False, required=False)
+
+    class Meta:
+        model = AuthorBook
+        fields = ['pk', 'author']
+
+
+class AuthoredBookSerializer(NestedSerializer):
+    author_books = AuthorBookEntrySerializer(many=True, required=False)
+
+    class Meta:
+        model = Book
+        fields = ['pk', 'title', 'author_books']
+        many_to_many_through_fields = ['author_books']
+
+
+class PlanTests(APITestCase):
+
+    def create_book(self):
+        serializer = BookSerializer(data={
+            'title': 'Book 1',
+            'chapters': [
+                {'title': 'Chapter 1', 'order': 1, 'pages': [{'content': 'Page 1', 'order': 1}]},
+                {'title': 'Chapter 2', 'order': 2, 'pages': []},
+                {'title': 'Chapter 3', 'order': 3, 'pages': []},
+            ],
+            'pages': [],
+            'categories': [
+                {'name': 'Category 1', 'children': []},
+                {'name': 'Category 2', 'children': []},
+            ],
+        })
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        return serializer.save()
+
+    def get_update_data(self, book):
+        chapters = list(book.chapters.order_by('order'))
+        categories = list(book.categories.order_by('name'))
+        return {
+            'title': 'Book 1 update',
+            'chapters': [
+                {
+                    'pk': chapters[0].pk,
+                    'title': 'Chapter 1 update',
+                    'order': 1,
+                    'pages': [{'content': 'Page 2', 'order': 2}],
+                },
+                {'pk': chapters[1].pk, 'title': 'Chapter 2', 'order': 2, 'pages': []},
+                {'title': 'Chapter 4', 'order': 4, 'pages': [{'content': 'Page 3', 'order': 3}]},
+            ],
+            'pages': [],
+            'categories': [
+                {'pk': categories[0].pk, 'name': 'Category 1', 'children': []},
+                {'name': 'Category 3', 'children': []},
+            ],
+        }
+
+    def test_plan_does_not_write(self):
+        """
+        Tests that planning an update counts the changes per relation path without writing anything.
+        """
+        book = self.create_book()
+        serializer = BookSerializer(instance=book, data=self.get_update_data(book))
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+
+        with CaptureQueriesContext(connection) as context:
+            plan = serializer.plan()
+
+        # Assert queries, only reads
+        self.assertTrue(all(query['sql'].startswith('SELECT') for query in context.captured_queries))
+
+        # Assert plan
+        self.assertEqual(plan.action, 'update')
+        summary = plan.summary()
+        self.assertEqual(summary['chapters'], {'create': 1, 'update': 2, 'unlink': 0, 'delete': 1})
+        self.assertEqual(summary['chapters.pages'], {'create': 2, 'update': 0, 'unlink': 1, 'delete': 0})
+        self.assertEqual(summary['categories'], {'create': 1, 'update': 1, 'unlink': 1, 'delete': 0})
+        self.assertEqual(summary['pages'], {'create': 0, 'update': 0, 'unlink': 0, 'delete': 0})
+
+        # Assert data
+        self.assertEqual(Book.objects.get(pk=book.pk).title, 'Book 1')
+        self.assertEqual(Chapter.objects.count(), 3)
+        self.assertEqual(Page.objects.count(), 1)
+        self.assertEqual(Category.objects.count(), 2)
+
+    def test_apply_plan(self):
+        """
+        Tests that applying a plan results in the same data as saving the serializer.
+        """
+        book = self.create_book()
+        chapters = list(book.chapters.order_by('order'))
+        serializer = BookSerializer(instance=book, data=self.get_update_data(book))
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+
+        instance = serializer.apply(serializer.plan())
+
+        # Assert instance
+        self.assertEqual(instance.pk, book.pk)
+        self.assertIs(serializer.instance, instance)
+        self.assertEqual(instance.title, 'Book 1 update')
+        self.assertEqual(instance.chapters.count(), 3)
+
+        # Assert data
+        self.assertEqual(Book.objects.get(pk=book.pk).title, 'Book 1 update')
+        self.assertEqual(Chapter.objects.get(pk=chapters[0].pk).title, 'Chapter 1 update')
+        self.assertFalse(Chapter.objects.filter(pk=chapters[2].pk).exists())
+        self.assertEqual(
+            list(Page.objects.filter(chapter__book=book).order_by('order').values_list('content', flat=True)),
+            ['Page 2', 'Page 3'],
+        )
+        self.assertEqual(Page.objects.filter(chapter__isnull=True).count(), 1)
+        self.assertEqual(
+            sorted(Book.objects.get(pk=book.pk).categories.values_list('name', flat=True)), ['Category 1', 'Category 3']
+        )
+        self.assertEqual(Category.objects.count(), 3)
+
+    def test_apply_plan_for_create(self):
+        """
+        Tests that a planned create writes the book together with its nested objects.
+        """
+        serializer = BookSerializer(data={
+            'title': 'Book 1',
+            'chapters': [
+                {'title': 'Chapter {}'.format(index), 'order': index, 'pages': [{'content': 'Page', 'order': 1}]}
+                for index in range(5)
+            ],
+            'pages': [],
+            'categories': [{'name': 'Category 1', 'children': [{'name': 'Category 1.1', 'children': []}]}],
+        })
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+
+        plan = serializer.plan()
+        self.assertEqual(plan.summary()['chapters.pages']['create'], 5)
+        self.assertEqual(plan.summary()['categories.children']['create'], 1)
+        instance = serializer.apply(plan)
+
+        # Assert data
+        self.assertEqual(instance.chapters.count(), 5)
+        self.assertEqual(Page.objects.filter(chapter__book=instance).count(), 5)
+        self.assertEqual(Category.objects.get(name='Category 1.1').parent.name, 'Category 1')
+        self.assertEqual(list(instance.categories.values_list('name', flat=True)), ['Category 1'])
+
+    def test_plan_unknown_many_to_many_pk(self):
+        """
+        Tests that planning a direct many to many relation to a not existing object fails.
+        """
+        serializer = BookSerializer(data={
+            'title': 'Book 1',
+            'categories': [{'pk': 999, 'name': 'Category 1', 'children': []}],
+        })
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+
+        with self.assertRaises(ValidationError) as context:
+            serializer.plan()
+        self.assertIn('categories', context.exception.detail)
+
+    def test_plan_many_to_many_through_relation(self):
+        """
+        Tests that the intermediate objects of all parents are loaded with a single query.
+        """
+        author = Author.objects.create(name='Author 1')
+        books = [Book.objects.create(title='Book {}'.format(index)) for index in range(3)]
+        links = [AuthorBook.objects.create(author=author, book=book) for book in books]
+
+        object_plans = [
+            ObjectPlan(AuthoredBookSerializer(), {'author_books': [{'pk': link.pk, 'author': author}]}, book)
+            for book, link in zip(books, links)
+        ]
+        object_plans[0].data['author_books'] = []
+        relation = ManyToManyThroughRelation(AuthoredBookSerializer(), 'author_books')
+
+        with CaptureQueriesContext(connection) as context:
+            relation.plan(object_plans, connection.alias)
+
+        # Assert queries
+        self.assertEqual(len(context.captured_queries), 1)
+
+        # Assert plan
+        relation_plans = [object_plan.relations['author_books'] for object_plan in object_plans]
+        self.assertEqual([relation_plan.delete_pks for relation_plan in relation_plans], [[links[0].pk], [], []])
+        self.assertEqual([len(relation_plan.objects) for relation_plan in relation_plans], [0, 1, 1])
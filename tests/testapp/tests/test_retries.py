@@ -0,0 +1,125 @@
+from unittest import mock
+
+from django.db import OperationalError, transaction
+from rest_framework.test import APITransactionTestCase
+
+from drf_nested_serializer.serializers import is_retryable_error
+from testapp.models import Book, Chapter
+from testapp.serializers import BookSerializer, BookChapterSerializer
+
+
+class RetryingBookSerializer(BookSerializer):
+
+    class Meta(BookSerializer.Meta):
+        nested_retry_attempts = 2
+        nested_retry_backoff = 0.01
+
+
+class RetryTests(APITransactionTestCase):
+
+    def get_data(self):
+        return {
+            'title': 'Book 1',
+            'chapters': [{'title': 'Chapter 1', 'order': 1, 'pages': []}],
+            'pages': [],
+            'categories': [],
+        }
+
+    def fail_first(self, *exceptions):
+        """
+        Create the chapters after raising the given exceptions
+        """
+        create = BookChapterSerializer.create
+        side_effects = list(exceptions)
+
+        def side_effect(serializer, validated_data):
+            if side_effects:
+                raise side_effects.pop(0)
+            return create(serializer, validated_data)
+
+        return mock.patch.object(BookChapterSerializer, 'create', autospec=True, side_effect=side_effect)
+
+    @mock.patch('drf_nested_serializer.serializers.time.sleep')
+    def test_retry_locked_database(self, sleep):
+        """
+        Tests that the nested write is run again after a retryable database error.
+        """
+        serializer = RetryingBookSerializer(data=self.get_data())
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+
+        with self.fail_first(OperationalError('database is locked')):
+            serializer.save()
+
+        self.assertEqual(serializer.nested_write_stats, {'retries': 1})
+        self.assertEqual(sleep.call_count, 1)
+
+        # Assert data, the first attempt is rolled back
+        self.assertEqual(Book.objects.count(), 1)
+        self.assertEqual(Chapter.objects.count(), 1)
+
+    @mock.patch('drf_nested_serializer.serializers.time.sleep')
+    def test_retry_limit(self, sleep):
+        """
+        Tests that the error is raised once the retries are used up.
+        """
+        serializer = RetryingBookSerializer(data=self.get_data())
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+
+        with self.fail_first(*(OperationalError('database is locked') for _ in range(3))):
+            with self.assertRaises(OperationalError):
+                serializer.save()
+
+        self.assertEqual(serializer.nested_write_stats, {'retries': 2})
+        self.assertEqual(Book.objects.count(), 0)
+
+    @mock.patch('drf_nested_serializer.serializers.time.sleep')
+    def test_no_retry_of_other_errors(self, sleep):
+        """
+        Tests that database errors other than serialization failures and deadlocks are not retried.
+        """
+        serializer = RetryingBookSerializer(data=self.get_data())
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+
+        with self.fail_first(OperationalError('no such table: testapp_chapter')):
+            with self.assertRaises(OperationalError):
+                serializer.save()
+
+        self.assertEqual(serializer.nested_write_stats, {'retries': 0})
+        self.assertEqual(sleep.call_count, 0)
+
+    @mock.patch('drf_nested_serializer.serializers.time.sleep')
+    def test_no_retry_within_outer_transaction(self, sleep):
+        """
+        Tests that a nested write within an outer transaction is not retried.
+        """
+        serializer = RetryingBookSerializer(data=self.get_data())
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+
+        with self.fail_first(OperationalError('database is locked')):
+            with self.assertRaises(OperationalError):
+                with transaction.atomic():
+                    serializer.save()
+
+        self.assertEqual(sleep.call_count, 0)
+        self.assertEqual(Book.objects.count(), 0)
+
+    def test_retryable_error_classification(self):
+        """
+        Tests the classification of serialization failures and deadlocks of the supported database backends.
+        """
+        class PostgresError(Exception):
+            def __init__(self, pgcode):
+                super().__init__()
+                self.pgcode = pgcode
+
+        def wrap(cause):
+            error = OperationalError(*cause.args)
+            error.__cause__ = cause
+            return error
+
+        self.assertTrue(is_retryable_error(wrap(PostgresError('40001'))))
+        self.assertTrue(is_retryable_error(wrap(PostgresError('40P01'))))
+        self.assertFalse(is_retryable_error(wrap(PostgresError('23505'))))
+        self.assertTrue(is_retryable_error(wrap(Exception(1213, 'Deadlock found when trying to get lock'))))
+        self.assertFalse(is_retryable_error(wrap(Exception(1062, 'Duplicate entry'))))
+        self.assertTrue(is_retryable_error(OperationalError('database is locked')))
@@ -0,0 +1,138 @@
+from unittest import mock
+
+from django.db.models.signals import post_save
+from rest_framework.test import APITestCase
+
+from drf_nested_serializer import nested_write_completed
+from testapp.models import Book, Chapter, Page, Category
+from testapp.serializers import BookSerializer
+
+
+class SuppressingBookSerializer(BookSerializer):
+
+    class Meta(BookSerializer.Meta):
+        nested_suppress_row_signals = True
+
+
+class NestedWriteCompletedTests(APITestCase):
+
+    def setUp(self):
+        self.receiver = mock.Mock()
+        nested_write_completed.connect(self.receiver)
+        self.addCleanup(nested_write_completed.disconnect, self.receiver)
+
+    def create_book(self):
+        serializer = BookSerializer(data={
+            'title': 'Book 1',
+            'chapters': [
+                {'title': 'Chapter 1', 'order': 1, 'pages': [{'content': 'Page 1', 'order': 1}]},
+                {'title': 'Chapter 2', 'order': 2, 'pages': []},
+            ],
+            'pages': [],
+            'categories': [{'name': 'Category 1', 'children': []}],
+        })
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        return serializer.save()
+
+    def test_signal_sent_once_per_save(self):
+        """
+        Tests that a nested create sends a single signal with the created objects per relation path.
+        """
+        book = self.create_book()
+
+        self.assertEqual(self.receiver.call_count, 1)
+        kwargs = self.receiver.call_args.kwargs
+        self.assertEqual(kwargs['sender'], BookSerializer)
+        self.assertEqual(kwargs['instance'], book)
+        self.assertTrue(kwargs['created'])
+
+        summary = kwargs['summary']
+        self.assertEqual(summary['']['model'], Book)
+        self.assertEqual(summary['']['created'], {book.pk})
+        self.assertEqual(summary['chapters']['model'], Chapter)
+        self.assertEqual(summary['chapters']['created'], set(Chapter.objects.values_list('pk', flat=True)))
+        self.assertEqual(summary['chapters.pages']['created'], set(Page.objects.values_list('pk', flat=True)))
+        self.assertEqual(summary['categories']['created'], set(Category.objects.values_list('pk', flat=True)))
+        self.assertNotIn('pages', summary)
+
+    def test_signal_summary_of_update(self):
+        """
+        Tests that the summary of a nested update lists the updated, unlinked and deleted objects.
+        """
+        book = self.create_book()
+        chapters = list(book.chapters.order_by('order'))
+        page = Page.objects.get()
+        category = Category.objects.get()
+        self.receiver.reset_mock()
+
+        serializer = BookSerializer(instance=book, data={
+            'title': 'Book 1 update',
+            'chapters': [{'pk': chapters[0].pk, 'title': 'Chapter 1', 'order': 1, 'pages': []}],
+            'pages': [],
+            'categories': [],
+        })
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        serializer.save()
+
+        self.assertEqual(self.receiver.call_count, 1)
+        summary = self.receiver.call_args.kwargs['summary']
+        self.assertFalse(self.receiver.call_args.kwargs['created'])
+        self.assertEqual(summary['']['updated'], {book.pk})
+        self.assertEqual(summary['chapters']['updated'], {chapters[0].pk})
+        self.assertEqual(summary['chapters']['deleted'], {chapters[1].pk})
+        self.assertEqual(summary['chapters.pages']['unlinked'], {page.pk})
+        self.assertEqual(summary['categories']['unlinked'], {category.pk})
+
+    def test_signal_sent_by_apply(self):
+        """
+        Tests that applying a plan sends the signal with the changes of the bulk operations.
+        """
+        book = self.create_book()
+        chapters = list(book.chapters.order_by('order'))
+        self.receiver.reset_mock()
+
+        serializer = BookSerializer(instance=book, data={
+            'title': 'Book 1 update',
+            'chapters': [
+                {'pk': chapters[0].pk, 'title': 'Chapter 1', 'order': 1, 'pages': []},
+                {'title': 'Chapter 3', 'order': 3, 'pages': []},
+            ],
+            'pages': [],
+            'categories': [],
+        })
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        serializer.apply(serializer.plan())
+
+        self.assertEqual(self.receiver.call_count, 1)
+        summary = self.receiver.call_args.kwargs['summary']
+        self.assertEqual(summary['chapters']['updated'], {chapters[0].pk})
+        self.assertEqual(summary['chapters']['created'], {Chapter.objects.get(title='Chapter 3').pk})
+        self.assertEqual(summary['chapters']['deleted'], {chapters[1].pk})
+
+    def test_apply_keeps_row_signals_of_models_with_receivers(self):
+        """
+        Tests that models with post_save receivers are written row by row by apply, unless the per-row signals are
+        suppressed with `Meta.nested_suppress_row_signals`.
+        """
+        post_save_receiver = mock.Mock()
+        post_save.connect(post_save_receiver, sender=Chapter)
+        self.addCleanup(post_save.disconnect, post_save_receiver, sender=Chapter)
+
+        data = {
+            'title': 'Book 1',
+            'chapters': [{'title': 'Chapter {}'.format(index), 'order': index, 'pages': []} for index in range(3)],
+            'pages': [],
+            'categories': [],
+        }
+
+        serializer = BookSerializer(data=data)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        serializer.apply(serializer.plan())
+        self.assertEqual(post_save_receiver.call_count, 3)
+
+        post_save_receiver.reset_mock()
+        serializer = SuppressingBookSerializer(data=data)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        serializer.apply(serializer.plan())
+        self.assertEqual(post_save_receiver.call_count, 0)
+        self.assertEqual(Chapter.objects.count(), 6)
@@ -0,0 +1,169 @@
+import json
+
+from django.db import connection
+from django.db.models import F
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from testapp.models import Book, Category, Chapter
+from testapp.serializers import BookSnapshotSerializer
+
+
+class SnapshotTests(APITestCase):
+
+    def get_data(self, title='Book 1'):
+        return {
+            'title': title,
+            'chapters': [
+                {
+                    'title': 'Chapter {}'.format(index),
+                    'order': index,
+                    'pages': [{'content': 'Page {}'.format(index), 'order': 0}],
+                }
+                for index in range(2)
+            ],
+            'pages': [{'content': 'Loose page', 'order': 0}],
+            'categories': [],
+        }
+
+    def test_snapshot_written(self):
+        """
+        Tests that the representation is stored in the snapshot field by nested writes.
+        """
+        response = self.client.post(reverse('snapshot-book-list'), self.get_data(), format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+
+        # Assert snapshot
+        book = Book.objects.get(pk=response.data['pk'])
+        snapshot = json.loads(book.snapshot)['data']
+        self.assertEqual(snapshot, response.json())
+        self.assertEqual(snapshot['chapters'][1]['pages'][0]['content'], 'Page 1')
+        self.assertEqual(json.loads(book.snapshot)['version'], 1)
+
+        # Assert update
+        url = reverse('snapshot-book-detail', kwargs={'pk': book.pk})
+        response = self.client.put(url, self.get_data(title='Book 2'), format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        book.refresh_from_db()
+        snapshot = json.loads(book.snapshot)['data']
+        self.assertEqual(snapshot['title'], 'Book 2')
+        self.assertEqual(snapshot, response.json())
+
+    def test_prefetched_instance(self):
+        """
+        Tests that the snapshot of an instance with prefetched relations contains the written related objects.
+        """
+        response = self.client.post(reverse('snapshot-book-list'), self.get_data(), format='json')
+        book = Book.objects.prefetch_related('chapters__pages', 'pages').get(pk=response.data['pk'])
+        chapter_pk = response.data['chapters'][0]['pk']
+
+        # a loose page of the first chapter, the chapters are not written
+        data = {'pages': [{'content': 'New page', 'order': 1, 'chapter': chapter_pk}]}
+        serializer = BookSnapshotSerializer(book, data=data, partial=True, context=response.renderer_context)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        serializer.save()
+
+        # Assert snapshot
+        book.refresh_from_db()
+        snapshot = json.loads(book.snapshot)['data']
+        self.assertEqual([page['content'] for page in snapshot['pages']], ['Loose page', 'New page'])
+        self.assertEqual([page['content'] for page in snapshot['chapters'][0]['pages']], ['Page 0', 'New page'])
+
+    def test_retrieve_snapshot(self):
+        """
+        Tests that the snapshot is served with a single query, objects without snapshot are retrieved as usual.
+        """
+        response = self.client.post(reverse('snapshot-book-list'), self.get_data(), format='json')
+        url = reverse('snapshot-book-detail', kwargs={'pk': response.data['pk']})
+        expected = self.client.get(reverse('book-detail', kwargs={'pk': response.data['pk']}), format='json').json()
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, format='json')
+
+        # Assert response
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(dict(response.json(), url=None), dict(expected, url=None))
+        self.assertEqual(len(queries.captured_queries), 1)
+
+        # Assert fallback
+        Book.objects.update(snapshot=None)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, format='json')
+        self.assertEqual(dict(response.json(), url=None), dict(expected, url=None))
+        self.assertGreater(len(queries.captured_queries), 1)
+
+    def test_stale_snapshot(self):
+        """
+        Tests that snapshots of an older version of the object are not served.
+        """
+        response = self.client.post(reverse('snapshot-book-list'), self.get_data(), format='json')
+        url = reverse('snapshot-book-detail', kwargs={'pk': response.data['pk']})
+        Book.objects.update(version=F('version') + 1)
+        Chapter.objects.filter(book_id=response.data['pk']).update(title='Chapter changed')
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, format='json')
+
+        # Assert response
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([chapter['title'] for chapter in response.data['chapters']], ['Chapter changed'] * 2)
+        self.assertGreater(len(queries.captured_queries), 1)
+
+    def test_shared_objects(self):
+        """
+        Tests that the snapshot of an object sharing a written related object with the written object is not served.
+        """
+        data = dict(self.get_data(title='Book B'), categories=[{'name': 'Category 1', 'children': []}])
+        response = self.client.post(reverse('snapshot-book-list'), data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        url = reverse('snapshot-book-detail', kwargs={'pk': response.data['pk']})
+        category = Category.objects.get()
+
+        response = self.client.post(reverse('snapshot-book-list'), self.get_data(title='Book A'), format='json')
+        Book.objects.get(pk=response.data['pk']).categories.add(category)
+        data = dict(response.data, categories=[{'pk': category.pk, 'name': 'Category 1 changed', 'children': []}])
+        response = self.client.put(reverse('snapshot-book-detail', kwargs={'pk': data['pk']}), data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+
+        # Assert response
+        response = self.client.get(url, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['categories'][0]['name'], 'Category 1 changed')
+
+    @override_settings(ALLOWED_HOSTS=['testserver', 'other.example.com'])
+    def test_other_origin(self):
+        """
+        Tests that snapshots are only served to requests of the origin their hyperlinks were built with.
+        """
+        response = self.client.post(reverse('snapshot-book-list'), self.get_data(), format='json')
+        url = reverse('snapshot-book-detail', kwargs={'pk': response.data['pk']})
+        self.assertEqual(json.loads(Book.objects.get().snapshot)['origin'], 'http://testserver/')
+
+        for kwargs in [{'HTTP_HOST': 'other.example.com'}, {'secure': True}]:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url, format='json', **kwargs)
+
+            # Assert response
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.data['url'], 'http{}://{}{}'.format(
+                's' if kwargs.get('secure') else '',
+                kwargs.get('HTTP_HOST', 'testserver'),
+                reverse('book-detail', kwargs={'pk': response.data['pk']}),
+            ))
+            self.assertGreater(len(queries.captured_queries), 1)
+
+    def test_write_without_request(self):
+        """
+        Tests that writes without request in the context are stored without snapshot.
+        """
+        serializer = BookSnapshotSerializer(data=self.get_data())
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        book = serializer.save()
+
+        # Assert data
+        book.refresh_from_db()
+        self.assertEqual(book.chapters.count(), 2)
+        self.assertIsNone(book.snapshot)
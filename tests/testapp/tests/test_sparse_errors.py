@@ -0,0 +1,63 @@
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APITestCase
+
+from testapp.models import Book, Chapter
+from testapp.tests.test_transactions import BatchedBookSerializer
+
+
+class SparseErrorBookSerializer(BatchedBookSerializer):
+
+    class Meta(BatchedBookSerializer.Meta):
+        nested_sparse_errors = True
+
+
+class SparseErrorTests(APITestCase):
+
+    def get_data(self, rejected_indices, count=10):
+        return {
+            'title': 'Book 1',
+            'chapters': [
+                {
+                    'title': 'Rejected {}'.format(index) if index in rejected_indices else 'Chapter {}'.format(index),
+                    'order': index,
+                    'pages': [],
+                }
+                for index in range(count)
+            ],
+            'pages': [],
+            'categories': [],
+        }
+
+    def test_write_errors_by_index(self):
+        """
+        Tests that the errors of failing related objects are reported as mapping by index, without entries for the
+        written related objects.
+        """
+        serializer = SparseErrorBookSerializer(data=self.get_data([2, 997], count=1000))
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+
+        with self.assertRaises(ValidationError) as context:
+            serializer.save()
+
+        errors = context.exception.detail['chapters']
+        self.assertEqual(list(errors), [2, 997])
+        self.assertIn('title', errors[997])
+
+        # Assert data
+        self.assertEqual(Book.objects.count(), 0)
+        self.assertEqual(Chapter.objects.count(), 0)
+
+    def test_validation_errors_by_index(self):
+        """
+        Tests that the validation errors of nested related objects are reported as mapping by index.
+        """
+        data = self.get_data([])
+        data['chapters'][8]['order'] = 'invalid'
+        data['chapters'][3]['pages'] = [{'content': 'Page 1', 'order': 1}, {'content': 'Page 2', 'order': 'invalid'}]
+        serializer = SparseErrorBookSerializer(data=data)
+
+        self.assertFalse(serializer.is_valid())
+        errors = serializer.errors['chapters']
+        self.assertEqual(list(errors), [3, 8])
+        self.assertIn('order', errors[8])
+        self.assertEqual(list(errors[3]['pages']), [1])
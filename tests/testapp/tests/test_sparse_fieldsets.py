@@ -0,0 +1,77 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from testapp.models import Book, Category, Chapter, Page
+
+
+class SparseFieldsetTests(APITestCase):
+
+    def setUp(self):
+        for book_index in range(3):
+            book = Book.objects.create(title='Book {}'.format(book_index))
+            for chapter_index in range(2):
+                chapter = Chapter.objects.create(
+                    book=book, title='Chapter {}'.format(chapter_index), order=chapter_index
+                )
+                Page.objects.create(book=book, chapter=chapter, content='Page', order=chapter_index)
+            category = Category.objects.create(name='Category {}'.format(book_index))
+            book.categories.add(category)
+
+    def test_fields(self):
+        """
+        Tests that only the requested fields are rendered and only their relations are queried.
+        """
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse('sparse-book-list'), {'fields': 'title,chapters.title'}, format='json')
+
+        # Assert response
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 3)
+        for book in response.data:
+            self.assertEqual(list(book), ['title', 'chapters'])
+            self.assertEqual([list(chapter) for chapter in book['chapters']], [['title'], ['title']])
+
+        # Assert queries: the books and the prefetched chapters
+        self.assertEqual(len(context.captured_queries), 2)
+
+    def test_expand(self):
+        """
+        Tests that nested serializers are only rendered if they are expanded, a nested serializer listed in `fields`
+        without subfields is rendered with all of its fields.
+        """
+        response = self.client.get(reverse('sparse-book-list'), {'expand': 'chapters'}, format='json')
+
+        # Assert response
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(list(response.data[0]), ['pk', 'url', 'title', 'chapters'])
+        self.assertNotIn('pages', response.data[0]['chapters'][0])
+
+        response = self.client.get(
+            reverse('sparse-book-list'), {'fields': 'title,categories', 'expand': 'chapters.pages'}, format='json'
+        )
+
+        # Assert response
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(list(response.data[0]), ['title', 'categories'])
+        self.assertEqual(response.data[0]['categories'][0]['name'], 'Category 0')
+
+    def test_unchanged_without_parameters(self):
+        """
+        Tests that all fields are rendered without query parameters and writes are not pruned.
+        """
+        response = self.client.get(reverse('sparse-book-list'), format='json')
+        expected = self.client.get(reverse('book-list'), format='json')
+        self.assertEqual(
+            [dict(book, url=None) for book in response.data], [dict(book, url=None) for book in expected.data]
+        )
+
+        response = self.client.post(
+            reverse('sparse-book-list') + '?fields=title',
+            {'title': 'Book 4', 'chapters': [{'title': 'Chapter', 'order': 0, 'pages': []}]},
+            format='json',
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        self.assertEqual(Chapter.objects.filter(book__title='Book 4').count(), 1)
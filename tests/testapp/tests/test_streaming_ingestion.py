@@ -0,0 +1,207 @@
+import io
+import json
+from unittest import mock
+
+from django.conf import settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.exceptions import ParseError
+from rest_framework.test import APITestCase
+
+from drf_nested_serializer.backends import SQLiteInsertBackend
+from drf_nested_serializer.parsers import JSONStreamReader, StreamedObject
+from testapp.models import Book, Chapter, Page
+from testapp.serializers import BookImportSerializer
+
+
+class OrderedBookImportSerializer(BookImportSerializer):
+
+    class Meta(BookImportSerializer.Meta):
+        nested_order_field = {'pages': 'order'}
+        nested_stream_chunk_size = 3
+
+
+class StreamingIngestionTests(APITestCase):
+
+    def get_streamed_data(self, data):
+        content = json.dumps(data).encode(settings.DEFAULT_CHARSET)
+        return StreamedObject(JSONStreamReader(io.BytesIO(content), settings.DEFAULT_CHARSET, 8), ['pages'])
+
+    def test_streamed_object_reads_arrays_lazily(self):
+        """
+        Tests that the members before a streamed array are decoded at once and the array items on iteration.
+        """
+        content = json.dumps({
+            'title': 'Book 1',
+            'number': 12345,
+            'pages': [{'content': 'Page {}'.format(index), 'order': index} for index in range(25)],
+        }).encode(settings.DEFAULT_CHARSET)
+        data = StreamedObject(JSONStreamReader(io.BytesIO(content), settings.DEFAULT_CHARSET, 8), ['pages'])
+
+        self.assertEqual(dict(data), {'title': 'Book 1', 'number': 12345})
+
+        streams = list((name, list(items)) for name, items in data.iter_streams())
+        self.assertEqual(len(streams), 1)
+        self.assertEqual(streams[0][0], 'pages')
+        self.assertEqual(len(streams[0][1]), 25)
+        self.assertEqual(streams[0][1][24], {'content': 'Page 24', 'order': 24})
+
+    def test_streamed_object_rejects_members_after_streamed_array(self):
+        """
+        Tests that the streamed arrays have to be the last members of the object.
+        """
+        content = b'{"pages": [{"order": 1}], "title": "Book 1"}'
+        data = StreamedObject(JSONStreamReader(io.BytesIO(content), settings.DEFAULT_CHARSET, 8), ['pages'])
+
+        with self.assertRaises(ParseError):
+            for name, items in data.iter_streams():
+                list(items)
+
+    def test_importing_book_with_streamed_pages(self):
+        """
+        Tests that the streamed pages are written in chunks together with the other nested relations.
+        """
+        url = reverse('book-import-list')
+        data = {
+            'title': 'Book 1',
+            'chapters': [
+                {'title': 'Chapter 1', 'order': 1, 'pages': [{'content': 'Chapter 1, page 1', 'order': 1}]},
+            ],
+            'pages': [{'content': 'Page {}'.format(index), 'order': index} for index in range(250)],
+        }
+        response = self.client.post(url, data, format='json')
+
+        # Assert response
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertNotIn('pages', response.data)
+        self.assertEqual(len(response.data['chapters']), 1)
+
+        # Assert data
+        book_object = Book.objects.get(title='Book 1')
+        self.assertEqual(Chapter.objects.count(), 1)
+        self.assertEqual(Page.objects.filter(book=book_object).count(), 250)
+        self.assertEqual(Page.objects.filter(chapter__book=book_object).count(), 1)
+
+    def test_streamed_pages_use_insert_backend(self):
+        """
+        Tests that the new pages of every chunk are inserted with the insert backend at once.
+        """
+        serializer = OrderedBookImportSerializer(data=self.get_streamed_data({
+            'title': 'Book 1',
+            'chapters': [],
+            'pages': [{'content': 'Page {}'.format(index)} for index in range(7)],
+        }))
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+
+        with mock.patch.object(SQLiteInsertBackend, 'insert', autospec=True, side_effect=SQLiteInsertBackend.insert) \
+                as insert:
+            book = serializer.save()
+
+        # Assert backend, the last chunk of a single page is created on its own
+        self.assertEqual([len(call.args[2]) for call in insert.call_args_list], [3, 3])
+
+        # Assert data
+        self.assertEqual(
+            list(Page.objects.filter(book=book).order_by('order').values_list('content', flat=True)),
+            ['Page {}'.format(index) for index in range(7)],
+        )
+
+    def test_streamed_pages_are_evicted_from_identity_map(self):
+        """
+        Tests that the written chunks of a streamed relation are not kept in the identity map of the nested write.
+        """
+        process_streamed_fields = BookImportSerializer.process_streamed_fields
+        map_sizes = []
+
+        def side_effect(serializer, instance, errors):
+            process_streamed_fields(serializer, instance, errors)
+            identity_map = serializer.root._nested_identity_map
+            map_sizes.append((len(identity_map.instances), len(identity_map.written), len(identity_map.journal)))
+
+        data = {
+            'title': 'Book 1',
+            'chapters': [{'title': 'Chapter 1', 'order': 1, 'pages': []}],
+            'pages': [{'content': 'Page {}'.format(index), 'order': index} for index in range(250)],
+        }
+        with mock.patch.object(
+            BookImportSerializer, 'process_streamed_fields', autospec=True, side_effect=side_effect
+        ):
+            response = self.client.post(reverse('book-import-list'), data, format='json')
+
+        # Assert response
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Page.objects.filter(book_id=response.data['pk']).count(), 250)
+
+        # Assert identity map, only the chapter is kept
+        self.assertEqual(map_sizes, [(1, 1, 1)])
+
+    def test_ordered_streamed_pages(self):
+        """
+        Tests that the positions of an ordered streamed relation continue across the chunks.
+        """
+        data = {'title': 'Book 1', 'pages': [{'content': 'Page {}'.format(index), 'order': 0} for index in range(7)]}
+        serializer = OrderedBookImportSerializer(data=self.get_streamed_data(data))
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        book = serializer.save()
+
+        # Assert data
+        pages = Page.objects.filter(book=book).order_by('pk')
+        self.assertEqual([page.order for page in pages], list(range(7)))
+
+        # Assert moved pages, one of them removed
+        pks = [page.pk for page in pages]
+        data['pages'] = [{'pk': pk, 'content': 'Page {}'.format(index), 'order': 0} for index, pk in enumerate(pks)]
+        data['pages'] = data['pages'][:0:-1]
+        serializer = OrderedBookImportSerializer(book, data=self.get_streamed_data(data))
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        serializer.save()
+        pages = Page.objects.filter(book=book).order_by('order')
+        self.assertEqual([page.pk for page in pages], pks[:0:-1])
+        self.assertEqual([page.order for page in pages], list(range(6)))
+
+    def test_updating_book_with_streamed_pages(self):
+        """
+        Tests that pages not specified in the streamed array are removed after the last chunk.
+        """
+        url = reverse('book-import-list')
+        data = {
+            'title': 'Book 1',
+            'pages': [{'content': 'Page {}'.format(index), 'order': index} for index in range(150)],
+        }
+        response = self.client.post(url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        book_object = Book.objects.get(title='Book 1')
+        pages = list(Page.objects.filter(book=book_object).order_by('order'))
+        url = reverse('book-import-detail', kwargs={'pk': book_object.pk})
+        data = {
+            'title': 'Book 1 update',
+            'pages': [{'pk': page.pk, 'content': page.content + ' update', 'order': page.order} for page in pages[50:]]
+            + [{'content': 'Page new', 'order': 150}],
+        }
+        response = self.client.put(url, data, format='json')
+
+        # Assert response
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['title'], 'Book 1 update')
+
+        # Assert data
+        self.assertEqual(Page.objects.filter(book=book_object).count(), 101)
+        self.assertFalse(Page.objects.filter(pk__in=[page.pk for page in pages[:50]], book=book_object).exists())
+        self.assertEqual(Page.objects.get(pk=pages[149].pk).content, 'Page 149 update')
+        self.assertTrue(Page.objects.filter(book=book_object, content='Page new').exists())
+
+    def test_importing_book_with_invalid_streamed_page(self):
+        """
+        Tests that validation errors of streamed entries are reported with the index of the entry.
+        """
+        url = reverse('book-import-list')
+        pages = [{'content': 'Page {}'.format(index), 'order': index} for index in range(250)]
+        pages[150]['order'] = 'invalid'
+        response = self.client.post(url, {'title': 'Book 1', 'pages': pages}, format='json')
+
+        # Assert response
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(len(response.data['pages']), 151)
+        self.assertIn('order', response.data['pages'][150])
+        self.assertEqual(response.data['pages'][149], {})
@@ -0,0 +1,55 @@
+import json
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from testapp.models import Book, Category, Chapter, Page
+from testapp.serializers import BookSerializer
+
+
+class StreamingListTests(APITestCase):
+
+    def setUp(self):
+        for book_index in range(5):
+            book = Book.objects.create(title='Book {}'.format(book_index))
+            for chapter_index in range(2):
+                chapter = Chapter.objects.create(book=book, title='Chapter', order=chapter_index)
+                Page.objects.create(book=book, chapter=chapter, content='Page', order=chapter_index)
+            category = Category.objects.create(name='Category {}'.format(book_index))
+            Category.objects.create(name='Category {}.1'.format(book_index), parent=category)
+            book.categories.add(category)
+
+    def test_prefetch_lookups(self):
+        """
+        Tests that the nested relations of the serializer are prefetched, recursive serializers for one level.
+        """
+        self.assertEqual(
+            BookSerializer().get_prefetch_lookups(),
+            ['chapters', 'chapters__pages', 'categories', 'categories__children', 'pages'],
+        )
+
+    def test_streamed_list(self):
+        """
+        Tests that the streamed list contains the same objects as the regular list.
+        """
+        expected = self.client.get(reverse('book-list'), format='json').json()
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse('book-export-list'), format='json')
+            content = b''.join(response.streaming_content)
+
+        # Assert response
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        data = json.loads(content)
+        self.assertEqual(
+            [dict(book, url=None) for book in data],
+            [dict(book, url=None) for book in expected],
+        )
+
+        # Assert queries: the books in chunks of two, five prefetch queries per chunk and the grandchildren of the
+        # categories per book
+        self.assertEqual(len(context.captured_queries), 1 + 3 * 5 + 5)
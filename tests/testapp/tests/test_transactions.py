@@ -0,0 +1,75 @@
+from unittest import mock
+
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APITestCase
+
+from testapp.models import Book, Chapter
+from testapp.serializers import BookSerializer, BookChapterSerializer
+
+
+class RejectingChapterSerializer(BookChapterSerializer):
+
+    def create(self, validated_data):
+        if validated_data['title'].startswith('Rejected'):
+            raise ValidationError({'title': ['Rejected while writing.']})
+        return super().create(validated_data)
+
+
+class BatchedBookSerializer(BookSerializer):
+    chapters = RejectingChapterSerializer(many=True, required=False)
+
+    class Meta(BookSerializer.Meta):
+        nested_savepoint_batch_size = 4
+
+
+class TransactionTests(APITestCase):
+
+    def get_data(self, rejected_indices):
+        return {
+            'title': 'Book 1',
+            'chapters': [
+                {
+                    'title': 'Rejected {}'.format(index) if index in rejected_indices else 'Chapter {}'.format(index),
+                    'order': index,
+                }
+                for index in range(10)
+            ],
+            'pages': [],
+            'categories': [],
+        }
+
+    def test_failing_write_rolls_back_nested_write(self):
+        """
+        Tests that nothing is stored if a related object fails while writing and that the errors are reported with
+        the exact indices of the failing related objects.
+        """
+        serializer = BatchedBookSerializer(data=self.get_data([2, 7]))
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+
+        with self.assertRaises(ValidationError) as context:
+            serializer.save()
+
+        errors = context.exception.detail['chapters']
+        self.assertEqual(len(errors), 8)
+        self.assertIn('title', errors[2])
+        self.assertIn('title', errors[7])
+        self.assertEqual([index for index, error in enumerate(errors) if error], [2, 7])
+
+        # Assert data
+        self.assertEqual(Book.objects.count(), 0)
+        self.assertEqual(Chapter.objects.count(), 0)
+
+    def test_savepoints_per_batch(self):
+        """
+        Tests that the related objects are written in a savepoint per batch and not per related object.
+        """
+        serializer = BatchedBookSerializer(data=self.get_data([]))
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+
+        with mock.patch('django.db.backends.base.base.BaseDatabaseWrapper.savepoint_commit') as savepoint_commit:
+            serializer.save()
+
+        # 10 chapters in batches of 4: one savepoint for the nested write (within the test case transaction)
+        # and three savepoints for the chapters
+        self.assertEqual(savepoint_commit.call_count, 4)
+        self.assertEqual(Chapter.objects.count(), 10)
@@ -0,0 +1,89 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory, APITestCase
+
+from drf_nested_serializer import NestedValuesListSerializer
+from testapp.models import Book, Category, Chapter, Page
+from testapp.serializers import BookSerializer, CategorySerializer
+
+
+class ValuesBookSerializer(BookSerializer):
+
+    class Meta(BookSerializer.Meta):
+        list_serializer_class = NestedValuesListSerializer
+
+
+class ValuesCategorySerializer(CategorySerializer):
+
+    class Meta(CategorySerializer.Meta):
+        list_serializer_class = NestedValuesListSerializer
+
+
+class AttachmentBookSerializer(BookSerializer):
+
+    class Meta(BookSerializer.Meta):
+        fields = BookSerializer.Meta.fields + ['attachment']
+
+
+class ValuesAttachmentBookSerializer(AttachmentBookSerializer):
+
+    class Meta(AttachmentBookSerializer.Meta):
+        list_serializer_class = NestedValuesListSerializer
+
+
+class ValuesRepresentationTests(APITestCase):
+
+    def setUp(self):
+        self.context = {'request': APIRequestFactory().get('/')}
+        for book_index in range(5):
+            book = Book.objects.create(title='Book {}'.format(book_index))
+            for chapter_index in range(3):
+                chapter = Chapter.objects.create(book=book, title='Chapter', order=chapter_index)
+                Page.objects.create(book=book, chapter=chapter, content='Page', order=chapter_index)
+            Page.objects.create(book=book, content='Loose page', order=10)
+            category = Category.objects.create(name='Category {}'.format(book_index))
+            child = Category.objects.create(name='Category {}.1'.format(book_index), parent=category)
+            Category.objects.create(name='Category {}.1.1'.format(book_index), parent=child)
+            book.categories.add(category)
+        Book.objects.first().categories.add(Category.objects.get(name='Category 4'))
+
+    def test_output_identical(self):
+        """
+        Tests that reading the books with values() produces the same output as reading model instances.
+        """
+        expected = BookSerializer(Book.objects.order_by('pk'), many=True, context=self.context).data
+        data = ValuesBookSerializer(Book.objects.order_by('pk'), many=True, context=self.context).data
+
+        self.assertEqual(data, expected)
+        self.assertEqual(len(data[0]['categories']), 2)
+        self.assertEqual(data[0]['categories'][0]['children'][0]['children'][0]['name'], 'Category 0.1.1')
+
+    def test_query_per_level(self):
+        """
+        Tests that every level of nested objects is read with a single query, independent of the number of books.
+        """
+        with CaptureQueriesContext(connection) as context:
+            ValuesBookSerializer(Book.objects.all(), many=True, context=self.context).data
+
+        # books, chapters, chapter pages, category links, categories, three levels of children, pages
+        self.assertEqual(len(context.captured_queries), 9)
+
+    def test_unsupported_fields(self):
+        """
+        Tests that serializers with fields that cannot be read with values() are represented as usual.
+        """
+        expected = CategorySerializer(Category.objects.order_by('pk'), many=True, context=self.context).data
+        data = ValuesCategorySerializer(Category.objects.order_by('pk'), many=True, context=self.context).data
+
+        self.assertEqual(data, expected)
+
+    def test_file_fields(self):
+        """
+        Tests that file fields are represented with their url like reading model instances.
+        """
+        Book.objects.filter(title='Book 0').update(attachment='x/report.pdf')
+        expected = AttachmentBookSerializer(Book.objects.order_by('pk'), many=True, context=self.context).data
+        data = ValuesAttachmentBookSerializer(Book.objects.order_by('pk'), many=True, context=self.context).data
+
+        self.assertEqual(data, expected)
+        self.assertEqual(data[0]['attachment'], 'http://testserver/x/report.pdf')
@@ -0,0 +1,232 @@
+from unittest import mock
+
+from django.db import OperationalError, connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import serializers, status
+from rest_framework.test import APITestCase, APITransactionTestCase
+
+from drf_nested_serializer import NestedSerializer
+from testapp.models import Book, Category
+from testapp.serializers import BookVersionSerializer
+
+
+class VersionedCategorySerializer(NestedSerializer):
+    pk = serializers.IntegerField(read_only=False, required=False, allow_null=True)
+
+    class Meta:
+        model = Category
+        fields = ['pk', 'name', 'children']
+        one_to_many_fields = ['children']
+        nested_version_field = 'version'
+
+
+VersionedCategorySerializer._declared_fields['children'] = VersionedCategorySerializer(many=True, required=False)
+
+
+class VersionedCategoryBookSerializer(BookVersionSerializer):
+    categories = VersionedCategorySerializer(many=True, required=False)
+
+
+class RetryingBookVersionSerializer(BookVersionSerializer):
+
+    class Meta(BookVersionSerializer.Meta):
+        nested_retry_attempts = 1
+        nested_retry_backoff = 0.01
+
+
+class VersionTestMixin:
+
+    def get_data(self, title='Book 1'):
+        return {
+            'title': title,
+            'chapters': [{'title': 'Chapter 1', 'order': 0, 'pages': [{'content': 'Page 1', 'order': 0}]}],
+            'pages': [],
+            'categories': [],
+        }
+
+    def write(self, book, title, serializer_class=BookVersionSerializer):
+        serializer = serializer_class(book, data={'title': title}, partial=True)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        return serializer.save()
+
+
+class VersionTests(VersionTestMixin, APITestCase):
+
+    def get_versions(self, *categories):
+        return [Category.objects.get(pk=category.pk).version for category in categories]
+
+    def test_nested_write(self):
+        """
+        Tests that every nested write increments the version of the top-level object.
+        """
+        response = self.client.post(reverse('versioned-book-list'), self.get_data(), format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        book = Book.objects.get(pk=response.data['pk'])
+        self.assertEqual(book.version, 1)
+
+        data = self.get_data()
+        data['chapters'][0]['pages'][0]['content'] = 'Page 1 changed'
+        response = self.client.put(reverse('versioned-book-detail', kwargs={'pk': book.pk}), data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        book.refresh_from_db()
+        self.assertEqual(book.version, 2)
+
+    def test_ancestors(self):
+        """
+        Tests that the written objects of a recursive tree and their ancestors are incremented.
+        """
+        root = Category.objects.create(name='Root')
+        child = Category.objects.create(name='Child', parent=root)
+        grandchild = Category.objects.create(name='Grandchild', parent=child)
+        other = Category.objects.create(name='Other')
+
+        serializer = VersionedCategorySerializer(grandchild, data={'name': 'Grandchild 1'}, partial=True)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        serializer.save()
+        self.assertEqual(self.get_versions(root, child, grandchild, other), [1, 1, 1, 0])
+
+        data = {'name': 'Root', 'children': [{'pk': child.pk, 'name': 'Child', 'children': []}]}
+        serializer = VersionedCategorySerializer(root, data=data)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        serializer.apply(serializer.plan())
+        self.assertEqual(self.get_versions(root, child), [2, 2])
+
+    def test_etag(self):
+        """
+        Tests that requests with a matching `If-None-Match` header are answered with 304 from the version only.
+        """
+        response = self.client.post(reverse('versioned-book-list'), self.get_data(), format='json')
+        url = reverse('versioned-book-detail', kwargs={'pk': response.data['pk']})
+
+        response = self.client.get(url, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response['ETag']
+        self.assertEqual(etag, '"1"')
+
+        # Assert not modified
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, format='json', HTTP_IF_NONE_MATCH='W/"0", ' + etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(len(queries.captured_queries), 1)
+
+        # Assert modified
+        self.client.put(url, self.get_data(title='Book 2'), format='json')
+        response = self.client.get(url, format='json', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['ETag'], '"2"')
+        self.assertEqual(response.data['title'], 'Book 2')
+
+    def test_shared_objects(self):
+        """
+        Tests that writing an object shared through a many to many relation increments the versions of the other
+        objects reaching it, directly or through the ancestors in a recursive tree.
+        """
+        root = Category.objects.create(name='Root')
+        shared = Category.objects.create(name='Shared', parent=root)
+        child = Category.objects.create(name='Child', parent=shared)
+        book_a = Book.objects.create(title='Book A')
+        book_b = Book.objects.create(title='Book B')
+        book_c = Book.objects.create(title='Book C')
+        book_d = Book.objects.create(title='Book D')
+        book_a.categories.add(shared)
+        book_b.categories.add(shared)
+        book_c.categories.add(root)
+        book_d.categories.add(Category.objects.create(name='Other'))
+
+        url = reverse('versioned-book-detail', kwargs={'pk': book_b.pk})
+        etag = self.client.get(url, format='json')['ETag']
+        self.assertEqual(etag, '"0"')
+
+        data = {
+            'title': 'Book A',
+            'categories': [{
+                'pk': shared.pk,
+                'name': 'Shared 1',
+                'children': [{'pk': child.pk, 'name': 'Child', 'children': []}],
+            }],
+        }
+        response = self.client.put(reverse('versioned-book-detail', kwargs={'pk': book_a.pk}), data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+
+        # Assert versions, the books sharing the category directly or through its ancestors
+        self.assertEqual(
+            [Book.objects.get(pk=book.pk).version for book in [book_a, book_b, book_c, book_d]], [1, 1, 1, 0]
+        )
+
+        # Assert modified
+        response = self.client.get(url, format='json', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['categories'][0]['name'], 'Shared 1')
+
+    def test_shared_nested_objects(self):
+        """
+        Tests that writing a nested object of a shared tree increments the versions of the other objects reaching it,
+        and of its ancestors of a versioned recursive serializer.
+        """
+        root = Category.objects.create(name='Root')
+        child = Category.objects.create(name='Child', parent=root)
+        grandchild = Category.objects.create(name='Grandchild', parent=child)
+        book_a = Book.objects.create(title='Book A')
+        book_b = Book.objects.create(title='Book B')
+        book_a.categories.add(child)
+        book_b.categories.add(root)
+
+        data = {
+            'title': 'Book A',
+            'categories': [{
+                'pk': child.pk,
+                'name': 'Child',
+                'children': [{'pk': grandchild.pk, 'name': 'Grandchild 1', 'children': []}],
+            }],
+        }
+        serializer = VersionedCategoryBookSerializer(book_a, data=data)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        serializer.save()
+
+        # Assert versions, every object is incremented once
+        self.assertEqual(self.get_versions(root, child, grandchild), [1, 1, 1])
+        self.assertEqual([Book.objects.get(pk=book.pk).version for book in [book_a, book_b]], [1, 1])
+
+        # Assert versions of a plan
+        serializer = VersionedCategoryBookSerializer(book_a, data=data)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        serializer.apply(serializer.plan())
+        self.assertEqual(self.get_versions(root, child, grandchild), [2, 2, 2])
+        self.assertEqual([Book.objects.get(pk=book.pk).version for book in [book_a, book_b]], [2, 2])
+
+    def test_stale_instances(self):
+        """
+        Tests that writes of stale instances increment the version in the database and get distinct ETags.
+        """
+        response = self.client.post(reverse('versioned-book-list'), self.get_data(), format='json')
+        url = reverse('versioned-book-detail', kwargs={'pk': response.data['pk']})
+        stale_books = [Book.objects.get(pk=response.data['pk']), Book.objects.get(pk=response.data['pk'])]
+
+        etags = []
+        for index, stale_book in enumerate(stale_books):
+            book = self.write(stale_book, 'Book {}'.format(index))
+            self.assertEqual(book.version, index + 2)
+            etags.append(self.client.get(url, format='json')['ETag'])
+        self.assertEqual(etags, ['"2"', '"3"'])
+
+
+class VersionRetryTests(VersionTestMixin, APITransactionTestCase):
+
+    @mock.patch('drf_nested_serializer.serializers.time.sleep')
+    def test_retry(self, sleep):
+        """
+        Tests that a retried write increments the version once.
+        """
+        serializer = BookVersionSerializer(data=self.get_data())
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        book = serializer.save()
+
+        side_effect = [OperationalError('database is locked'), None]
+        with mock.patch.object(RetryingBookVersionSerializer, 'bump_shared_versions', side_effect=side_effect):
+            book = self.write(book, 'Book 2', serializer_class=RetryingBookVersionSerializer)
+
+        self.assertEqual(sleep.call_count, 1)
+        self.assertEqual(book.version, 2)
+        book.refresh_from_db()
+        self.assertEqual(book.version, 2)
@@ -0,0 +1,123 @@
+from unittest import mock
+
+from django.db.models import QuerySet
+from rest_framework.test import APITestCase
+
+from testapp.models import Book, Chapter, Category, Page
+from testapp.serializers import BookSerializer, BookChapterSerializer, BookCategorySerializer
+
+
+class LockingBookSerializer(BookSerializer):
+
+    class Meta(BookSerializer.Meta):
+        nested_select_for_update = True
+
+
+class WriteOrderingTests(APITestCase):
+
+    def create_book(self):
+        serializer = BookSerializer(data={
+            'title': 'Book 1',
+            'chapters': [{'title': 'Chapter {}'.format(index), 'order': index, 'pages': []} for index in range(4)],
+            'pages': [],
+            'categories': [{'name': 'Category {}'.format(index), 'children': []} for index in range(3)],
+        })
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        return serializer.save()
+
+    def get_reversed_data(self, book):
+        return {
+            'title': 'Book 1',
+            'chapters': [
+                {'pk': chapter.pk, 'title': chapter.title, 'order': chapter.order, 'pages': []}
+                for chapter in book.chapters.order_by('-pk')
+            ] + [{'title': 'Chapter new', 'order': 10, 'pages': []}],
+            'pages': [],
+            'categories': [
+                {'pk': category.pk, 'name': category.name, 'children': []}
+                for category in book.categories.order_by('-pk')
+            ],
+        }
+
+    def test_writes_in_pk_order(self):
+        """
+        Tests that existing related objects are updated in pk order regardless of the request order, new related
+        objects are created afterwards.
+        """
+        book = self.create_book()
+        existing_chapter_pks = sorted(book.chapters.values_list('pk', flat=True))
+        existing_category_pks = sorted(book.categories.values_list('pk', flat=True))
+        serializer = BookSerializer(instance=book, data=self.get_reversed_data(book))
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+
+        chapter_update = BookChapterSerializer.update
+        category_update = BookCategorySerializer.update
+        with mock.patch.object(BookChapterSerializer, 'update', autospec=True, side_effect=chapter_update) as chapters,\
+                mock.patch.object(BookCategorySerializer, 'update', autospec=True, side_effect=category_update) \
+                as categories:
+            serializer.save()
+
+        chapter_pks = [call.kwargs['instance'].pk for call in chapters.call_args_list]
+        self.assertEqual(chapter_pks, existing_chapter_pks)
+        category_pks = [call.kwargs['instance'].pk for call in categories.call_args_list]
+        self.assertEqual(category_pks, existing_category_pks)
+
+        # Assert data
+        self.assertEqual(Chapter.objects.count(), 5)
+        self.assertEqual(Book.objects.get(pk=book.pk).categories.count(), 3)
+
+    def test_select_for_update(self):
+        """
+        Tests that `Meta.nested_select_for_update` locks the existing related objects while prefetching them.
+        """
+        book = self.create_book()
+        serializer = LockingBookSerializer(instance=book, data=self.get_reversed_data(book))
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+
+        with mock.patch.object(QuerySet, 'select_for_update', autospec=True,
+                               side_effect=QuerySet.select_for_update) as select_for_update:
+            serializer.save()
+
+        locked_models = [call.args[0].model for call in select_for_update.call_args_list]
+        self.assertIn(Chapter, locked_models)
+        self.assertIn(Category, locked_models)
+        self.assertEqual(Chapter.objects.count(), 5)
+
+    def test_select_for_update_of_nested_levels(self):
+        """
+        Tests that the option of the root serializer locks the related objects of nested serializers as well.
+        """
+        book = self.create_book()
+        for chapter in book.chapters.all():
+            Page.objects.create(book=book, chapter=chapter, content='Page', order=0)
+        data = self.get_reversed_data(book)
+        for chapter in data['chapters'][:-1]:
+            chapter['pages'] = [
+                {'pk': page.pk, 'content': 'Page update', 'order': 0}
+                for page in Page.objects.filter(chapter=chapter['pk'])
+            ]
+        serializer = LockingBookSerializer(instance=book, data=data)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+
+        with mock.patch.object(QuerySet, 'select_for_update', autospec=True,
+                               side_effect=QuerySet.select_for_update) as select_for_update:
+            serializer.save()
+
+        locked_models = [call.args[0].model for call in select_for_update.call_args_list]
+        # the pages of the book and of the five chapters
+        self.assertEqual(locked_models.count(Page), 6)
+        self.assertEqual(Page.objects.filter(content='Page update').count(), 4)
+
+    def test_no_select_for_update_by_default(self):
+        """
+        Tests that related objects are not locked without `Meta.nested_select_for_update`.
+        """
+        book = self.create_book()
+        serializer = BookSerializer(instance=book, data=self.get_reversed_data(book))
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+
+        with mock.patch.object(QuerySet, 'select_for_update', autospec=True,
+                               side_effect=QuerySet.select_for_update) as select_for_update:
+            serializer.save()
+
+        self.assertEqual(select_for_update.call_count, 0)
@@ -1,8 +1,11 @@
 from rest_framework import viewsets, permissions
 
+from drf_nested_serializer import NestedETagMixin, NestedPrefetchMixin, NestedSnapshotRetrieveMixin, \
+    NestedStreamingJSONParser, NestedStreamingListMixin
+
 from .models import Book, Author, Chapter, Page, AuthorBook, Category
 from .serializers import BookSerializer, AuthorSerializer, ChapterSerializer, PageSerializer, AuthorBookSerializer, \
-    CategorySerializer
+    CategorySerializer, BookImportSerializer, BookSparseSerializer, BookSnapshotSerializer, BookVersionSerializer
 
 
 class BaseViewSet(viewsets.ModelViewSet):
@@ -14,6 +17,33 @@ class BookViewSet(BaseViewSet):
     serializer_class = BookSerializer
 
 
+class BookImportViewSet(BaseViewSet):
+    queryset = Book.objects.all()
+    serializer_class = BookImportSerializer
+    parser_classes = [NestedStreamingJSONParser]
+
+
+class BookExportViewSet(NestedStreamingListMixin, BaseViewSet):
+    queryset = Book.objects.all()
+    serializer_class = BookSerializer
+    stream_chunk_size = 2
+
+
+class BookSparseViewSet(NestedPrefetchMixin, BaseViewSet):
+    queryset = Book.objects.all()
+    serializer_class = BookSparseSerializer
+
+
+class BookSnapshotViewSet(NestedSnapshotRetrieveMixin, NestedPrefetchMixin, BaseViewSet):
+    queryset = Book.objects.all()
+    serializer_class = BookSnapshotSerializer
+
+
+class BookVersionViewSet(NestedETagMixin, BaseViewSet):
+    queryset = Book.objects.all()
+    serializer_class = BookVersionSerializer
+
+
 class AuthorViewSet(BaseViewSet):
     queryset = Author.objects.all()
     serializer_class = AuthorSerializer